@@ -1,14 +1,72 @@
+import time
+
+_import_started = time.perf_counter()
+
 import streamlit as st
-import google.generativeai as genai
-from PIL import Image
-import os
 from dotenv import load_dotenv
+
+# Load environment variables once per process, before config reads them
+@st.cache_resource
+def _load_env():
+    load_dotenv()
+    return True
+
+_load_env()
+
 import io
-import requests
-from typing import Dict, Any
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from PIL import Image
 
-# Load environment variables
-load_dotenv()
+import gemini_client
+from batch import (
+    get_gemini_rate_limiter,
+    iter_uploaded_images,
+    rows_to_csv,
+    rows_to_jsonl,
+    run_batch,
+    run_local_batch,
+)
+from cache import ResultCache, facts_key, image_key
+from history import HistoryStore
+from config import (
+    BATCH_MAX_CONCURRENCY,
+    DUPLICATE_SIMILARITY_THRESHOLD,
+    ENABLE_HISTORY,
+    ENABLE_SIMILARITY_INDEX,
+    GEMINI_FALLBACK_TO_LOCAL,
+    HISTORY_PAGE_SIZE,
+    PREDICTOR_BACKEND,
+    SIMILAR_RESULTS,
+    STREAM_RESPONSES,
+    WARMUP_MODELS,
+)
+from metrics import REQUESTS, configure_logging, profile_request, record_import_time, span, start_metrics_server
+from predictors import GeminiPredictor, HybridPredictor
+from predictors import load_local_predictor as build_local_predictor
+from report import parse_markdown_report, parse_report, section_complete
+from resilience import ResilientCaller
+from samples import SAMPLE_SOURCES, load_manifest, sample_path
+from similarity import EmbeddingExtractor, EmbeddingIndex
+
+# Only the first run pays for imports; underscore arguments are not hashed, so this records it once
+@st.cache_resource
+def _record_startup(_seconds):
+    record_import_time("app", _seconds)
+    return True
+
+_record_startup(time.perf_counter() - _import_started)
+
+# Logging and the Prometheus endpoint are process-wide, so set them up once
+@st.cache_resource
+def _start_observability():
+    configure_logging()
+    return start_metrics_server()
+
+_start_observability()
 
 # Configure page
 st.set_page_config(
@@ -17,71 +75,448 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize Gemini API
+# Only the key is checked here; the Gemini SDK is imported and configured on first use
 def configure_genai():
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
+    if not os.getenv("GEMINI_API_KEY"):
         st.error("Please set GEMINI_API_KEY in your .env file")
         st.stop()
-    genai.configure(api_key=api_key)
 
-configure_genai()
+# The local backend runs fully offline and needs no API key
+if PREDICTOR_BACKEND != "local":
+    configure_genai()
+
+# One cache per process, shared by every session and rerun
+@st.cache_resource
+def get_result_cache():
+    return ResultCache()
+
+result_cache = get_result_cache()
+
+# Every analyzed image and its result, kept across runs; None when disabled
+@st.cache_resource
+def get_history():
+    return HistoryStore() if ENABLE_HISTORY else None
+
+history = get_history()
+
+# The Gemini quota is per API key, so every session and batch run shares one rate limiter
+rate_limiter = get_gemini_rate_limiter()
+
+# Deadlines, retries, hedging and the circuit breaker are shared by every session
+@st.cache_resource
+def get_gemini_caller():
+    return ResilientCaller()
+
+gemini_caller = get_gemini_caller()
 
-# Function to get Gemini response
-def get_gemini_response(image, prompt):
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    response = model.generate_content([image, prompt])
-    return response.text
+def resilient_identify(image):
+    report, _ = gemini_caller.call(gemini_client.identify_animal_breed, image, rate_limiter=rate_limiter)
+    return report
 
 # Function to identify animal breed
-def identify_animal_breed(image):
-    prompt = """
-    Analyze this image and identify the animal and its specific breed. 
-    Provide a detailed response in the following format:
-    
-    **Animal:** [Animal type]
-    **Breed:** [Specific breed if identifiable]
-    
-    **Physical Characteristics:**
-    - [Characteristic 1]
-    - [Characteristic 2]
-    - [Characteristic 3]
-    
-    **Temperament:**
-    - [Temperament trait 1]
-    - [Temperament trait 2]
-    
-    **Care Requirements:**
-    - [Care requirement 1]
-    - [Care requirement 2]
-    
-    **Safety Assessment:**
-    - [Danger level: Low/Medium/High]
-    - [Potential risks]
-    - [Safety precautions]
-    
-    **Additional Information:**
-    [Any other relevant information about this animal breed]
-    
-    If the image doesn't contain a recognizable animal, please state that clearly.
-    """
-    return get_gemini_response(image, prompt)
+def identify_animal_breed(image, fetch=None):
+    key = image_key(image)
+    cached = result_cache.get("identify", key)
+    if cached is not None:
+        # Entries written before structured output hold markdown, which parse_report still understands
+        return parse_report(cached)
+    report = (fetch or resilient_identify)(image)
+    result_cache.set("identify", key, report.to_dict())
+    return report
+
+# Stream the analysis into the tabs, filling each one as soon as its section is complete
+def stream_animal_breed(image, breed_area, safety_area):
+    text = ""
+    safety_shown = False
+    # Partial output is already on screen, so streams go through the breaker but are not retried
+    with gemini_caller.guard():
+        rate_limiter.acquire()
+        for chunk in gemini_client.stream_identify_animal_breed(image):
+            text += chunk
+            breed_area.markdown(text + "▌")
+            if not safety_shown and section_complete(text, "safety assessment"):
+                safety_area.markdown(parse_markdown_report(text).safety_markdown())
+                safety_shown = True
+    return parse_report(text)
 
 # Function to get animal facts
 def get_animal_facts(animal_type):
-    prompt = f"""
-    Provide interesting facts about {animal_type} in a bullet point format.
-    Include information about their:
-    - Natural habitat
-    - Diet
-    - Social behavior
-    - Unique adaptations
-    - Conservation status (if applicable)
-    """
-    # For text-only prompts, we can use a different approach
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    response = model.generate_content(prompt)
-    return response.text
+    key = facts_key(animal_type)
+    cached = result_cache.get("facts", key)
+    if cached is not None:
+        return cached
+    with span("facts"):
+        facts, _ = gemini_caller.call(gemini_client.get_animal_facts, animal_type, rate_limiter=rate_limiter)
+    result_cache.set("facts", key, facts)
+    return facts
+
+# Gemini attempts of the batch image being identified on the current worker thread
+_batch_attempts = threading.local()
+
+# The configured backend for batch mode; only Gemini cache misses take a rate-limit token
+def get_batch_predictor():
+    def fetch(img):
+        report, _batch_attempts.count = gemini_caller.call(gemini_client.identify_animal_breed, img,
+                                                           rate_limiter=rate_limiter)
+        return report
+
+    return get_predictor(identify_fn=partial(identify_animal_breed, fetch=fetch))
+
+# Identify one batch image, returning the prediction and how many Gemini attempts it took
+def identify_for_batch(image, predictor):
+    _batch_attempts.count = 0
+    prediction = predictor.predict(image)
+    return prediction, _batch_attempts.count
+
+# Batch mode: identify many images or a zip archive concurrently
+def render_batch_mode():
+    uploaded_files = st.file_uploader(
+        "Choose images or a zip archive...",
+        type=["jpg", "jpeg", "png", "zip"],
+        accept_multiple_files=True,
+    )
+    max_workers = st.slider("Concurrent requests", 1, 16, BATCH_MAX_CONCURRENCY)
+    
+    if uploaded_files and st.button("Identify all"):
+        items = list(iter_uploaded_images(uploaded_files))
+        try:
+            # Worker threads have no Streamlit context, so resolve the predictor here
+            predictor = get_batch_predictor()
+        except Exception as e:
+            st.error(f"Could not load the {PREDICTOR_BACKEND} backend: {e}")
+            return
+        progress = st.progress(0.0, text=f"0 / {len(items)} images")
+        table = st.empty()
+        rows = []
+        if hasattr(predictor, "predict_many"):
+            # An in-process local model classifies the whole upload in fixed-size batches
+            results = run_local_batch(items, predictor)
+        else:
+            results = run_batch(items, partial(identify_for_batch, predictor=predictor), max_workers)
+        for index, row in results:
+            rows.append(row)
+            if history is not None and row["status"] == "ok":
+                history.record(items[index][1], row["report"], backend=row["backend"],
+                               latency_ms=row["latency_ms"], confidence=row["confidence"], name=row["file"])
+            progress.progress(len(rows) / len(items), text=f"{len(rows)} / {len(items)} images")
+            table.dataframe([{k: v for k, v in r.items() if k != "report"} for r in rows], use_container_width=True)
+        st.session_state["batch_rows"] = rows
+    elif st.session_state.get("batch_rows"):
+        rows = st.session_state["batch_rows"]
+        st.dataframe([{k: v for k, v in r.items() if k != "report"} for r in rows], use_container_width=True)
+    
+    rows = st.session_state.get("batch_rows")
+    if rows:
+        errors = sum(r["status"] == "error" for r in rows)
+        st.write(f"{len(rows)} images processed, {errors} failed")
+        col1, col2 = st.columns(2)
+        col1.download_button("Download CSV", rows_to_csv(rows), "batch_results.csv", "text/csv")
+        col2.download_button("Download JSONL", rows_to_jsonl(rows), "batch_results.jsonl", "application/jsonl")
+
+# Heavy models load in background threads while the landing page renders
+@st.cache_resource
+def _start_warmup():
+    warmups = {}
+    if not WARMUP_MODELS:
+        return warmups
+    executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="warmup")
+    if PREDICTOR_BACKEND != "gemini":
+        warmups["local"] = executor.submit(build_local_predictor)
+    if PREDICTOR_BACKEND != "local":
+        warmups["gemini"] = executor.submit(gemini_client.get_model,
+                                            generation_config=gemini_client.IDENTIFY_GENERATION_CONFIG)
+    if ENABLE_SIMILARITY_INDEX:
+        warmups["embedding"] = executor.submit(EmbeddingExtractor)
+    executor.shutdown(wait=False)
+    return warmups
+
+def _warmed(name, build):
+    future = _start_warmup().get(name)
+    if future is not None:
+        try:
+            return future.result()
+        except Exception:
+            pass  # built again below so the error surfaces on the calling path
+    return build()
+
+_start_warmup()
+
+# Load the local model once per process
+@st.cache_resource
+def load_local_predictor():
+    return _warmed("local", build_local_predictor)
+
+# Pick the prediction backend from config
+def get_predictor(backend=PREDICTOR_BACKEND, identify_fn=identify_animal_breed):
+    gemini = GeminiPredictor(identify_fn)
+    if backend == "gemini":
+        return gemini
+    local = load_local_predictor()
+    if backend == "local":
+        return local
+    if backend == "hybrid":
+        return HybridPredictor(local, gemini)
+    raise ValueError(f"Unknown predictor backend: {backend}")
+
+# The local classifier stands in while Gemini is failing, if a trained model is available
+def get_fallback_predictor():
+    if not GEMINI_FALLBACK_TO_LOCAL:
+        return None
+    try:
+        return load_local_predictor()
+    except Exception:
+        return None
+
+# Embedding model and nearest-neighbor index over past uploads, shared by every session
+@st.cache_resource
+def get_embedding_extractor():
+    return _warmed("embedding", EmbeddingExtractor)
+
+@st.cache_resource
+def get_embedding_index():
+    return EmbeddingIndex()
+
+# Show thumbnails of the most similar earlier uploads
+def render_similar_animals(neighbors):
+    neighbors = [(score, entry) for score, entry in neighbors if entry.get("thumbnail")]
+    if not neighbors:
+        st.info("No similar animals have been uploaded yet.")
+        return
+    columns = st.columns(3)
+    for i, (score, entry) in enumerate(neighbors):
+        with columns[i % 3]:
+            st.image(entry["thumbnail"], caption=f"{entry['label']} ({score:.0%} similar)", use_column_width=True)
+
+# Sample gallery files are small and never change while the app runs, so read them once
+@st.cache_data
+def load_sample_manifest():
+    return load_manifest()
+
+@st.cache_data
+def load_sample_file(filename):
+    with open(sample_path(filename), 'rb') as f:
+        return f.read()
+
+def _select_sample(sample_id):
+    st.session_state["sample"] = sample_id
+    st.session_state.pop("history_entry", None)
+
+# Locally stored sample thumbnails; clicking one analyzes it with its precomputed result
+def render_sample_gallery():
+    samples = load_sample_manifest()
+    st.subheader("Try with these sample images:")
+    if not samples:
+        # Until `python samples.py` has built the local gallery, show the source images as before
+        columns = st.columns(len(SAMPLE_SOURCES))
+        for column, (caption, url) in zip(columns, SAMPLE_SOURCES.values()):
+            column.image(url, caption=caption, use_column_width=True)
+        return
+    columns = st.columns(len(samples))
+    for column, sample in zip(columns, samples):
+        with column:
+            st.image(load_sample_file(sample["thumbnail"]), caption=sample["caption"], use_column_width=True)
+            st.button("Identify", key=f"sample_{sample['id']}", on_click=_select_sample, args=(sample["id"],))
+
+# Thumbnails are content-addressed, so a cached copy never goes stale
+@st.cache_data(max_entries=256)
+def load_history_thumbnail(thumbnail_hash):
+    return history.thumbnail(thumbnail_hash)
+
+def _select_history(image_hash):
+    st.session_state["history_entry"] = image_hash
+    st.session_state.pop("sample", None)
+
+def _set_history_page(page):
+    st.session_state["history_page"] = page
+
+# Paginated earlier analyses; each page only reads its own rows and thumbnails
+def render_history():
+    if history is None:
+        return
+    total = history.count()
+    if not total:
+        return
+    with st.sidebar:
+        st.header("History")
+        pages = (total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+        page = min(st.session_state.get("history_page", 0), pages - 1)
+        for entry in history.page(page * HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE):
+            col1, col2 = st.columns([1, 2])
+            col1.image(load_history_thumbnail(entry["thumbnail_hash"]))
+            col2.write(" · ".join(part for part in (entry["animal"], entry["breed"]) if part) or "No animal")
+            col2.button("Open", key=f"history_{entry['image_hash']}", on_click=_select_history,
+                        args=(entry["image_hash"],))
+        col1, col2, col3 = st.columns(3)
+        col1.button("◀", key="history_prev", disabled=page == 0, on_click=_set_history_page, args=(page - 1,))
+        col2.caption(f"Page {page + 1} of {pages}")
+        col3.button("▶", key="history_next", disabled=page >= pages - 1, on_click=_set_history_page,
+                    args=(page + 1,))
+        # Exports are only built when a download button is clicked
+        st.download_button("Export results (JSONL)", history.export_jsonl, "history.jsonl", "application/jsonl")
+        st.download_button("Export images and results (zip)", history.export_zip, "history.zip", "application/zip")
+
+# Show cache hit/miss counters in the sidebar
+def render_cache_stats():
+    with st.sidebar:
+        st.header("Cache")
+        stats = result_cache.stats
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Memory hits", stats["memory_hits"])
+        col2.metric("Disk hits", stats["disk_hits"])
+        col3.metric("Misses", stats["misses"])
+        if st.button("Clear cache"):
+            result_cache.clear()
+
+# Show circuit breaker state, retries and hedged requests of the resilient Gemini caller
+def render_resilience_stats():
+    summary = gemini_caller.summary()
+    if not summary["calls"] and not summary["rejected"]:
+        return
+    with st.sidebar:
+        st.header("Gemini Health")
+        st.metric("Circuit breaker", summary["breaker_state"].replace("_", "-"), f"{summary['breaker_trips']} trips",
+                  delta_color="off")
+        col1, col2 = st.columns(2)
+        col1.metric("Retries", summary["retries"])
+        col2.metric("Hedged", summary["hedged"])
+        col1.metric("Timeouts", summary["timeouts"])
+        col2.metric("Short-circuited", summary["rejected"])
+
+# Show payload size and latency of recent Gemini image requests
+def render_upload_stats():
+    summary = gemini_client.request_summary()
+    if summary is None:
+        return
+    with st.sidebar:
+        st.header("Gemini Requests")
+        col1, col2 = st.columns(2)
+        col1.metric("Mean payload", f"{summary['mean_payload_kb']} KB")
+        col2.metric("Mean encode", f"{summary['mean_encode_ms']} ms")
+        col1.metric("p50 latency", f"{summary['p50_latency_ms']} ms")
+        col2.metric("p95 latency", f"{summary['p95_latency_ms']} ms")
+        if "p50_ttft_ms" in summary:
+            col1.metric("p50 first token", f"{summary['p50_ttft_ms']} ms")
+            col2.metric("p95 first token", f"{summary['p95_ttft_ms']} ms")
+        st.caption(f"Over the last {summary['requests']} requests")
+
+# Identify one image and fill the result tabs. Uploads pass their bytes and are remembered in the
+# history and similarity index; stored results (samples, history entries) are shown as they are.
+def analyze_image(image, data=None, name=None, stored=None):
+    # Process the image
+    with st.spinner("Analyzing image..."), profile_request("single_image") as profile:
+        try:
+            # Near-duplicates of earlier uploads reuse their stored result
+            use_index = ENABLE_SIMILARITY_INDEX and data is not None
+            embedding, neighbors, duplicate = None, [], None
+            if use_index:
+                with span("embed"):
+                    embedding = get_embedding_extractor().embed(image)
+                neighbors = get_embedding_index().search(embedding, SIMILAR_RESULTS)
+                if neighbors and neighbors[0][0] >= DUPLICATE_SIMILARITY_THRESHOLD:
+                    duplicate = neighbors[0]
+            
+            # Status sits above the tabs but is only filled once the analysis finishes
+            status_area = st.container()
+            
+            # Create tabs for different information sections
+            tab_names = ["Breed Information", "Safety Assessment", "Animal Facts"]
+            if use_index:
+                tab_names.append("Similar Animals")
+            tab1, tab2, tab3, *tab4 = st.tabs(tab_names)
+            with tab1:
+                st.subheader("Breed Identification & Characteristics")
+                breed_area = st.empty()
+            with tab2:
+                safety_area = st.empty()
+            with tab3:
+                facts_area = st.container()
+            
+            # Identify animal breed; Gemini misses stream into the tabs as they are generated
+            started = time.perf_counter()
+            backend, confidence = PREDICTOR_BACKEND, None
+            with span("identify", backend=PREDICTOR_BACKEND):
+                if stored is not None:
+                    report = parse_report(stored["report"])
+                    backend_caption = stored["caption"]
+                elif duplicate is not None:
+                    report = parse_report(duplicate[1]["report"])
+                    backend = "duplicate"
+                    backend_caption = f"Near-duplicate of an earlier upload ({duplicate[0]:.1%} similar)"
+                elif PREDICTOR_BACKEND == "gemini":
+                    key = image_key(image)
+                    cached = result_cache.get("identify", key)
+                    if cached is not None:
+                        report = parse_report(cached)
+                        backend_caption = "Backend: gemini (cached)"
+                    else:
+                        try:
+                            if STREAM_RESPONSES:
+                                report = stream_animal_breed(image, breed_area, safety_area)
+                            else:
+                                report = resilient_identify(image)
+                            result_cache.set("identify", key, report.to_dict())
+                            backend_caption = "Backend: gemini"
+                        except Exception as e:
+                            fallback = get_fallback_predictor()
+                            if fallback is None:
+                                raise
+                            prediction = fallback.predict(image)
+                            report = prediction["report"]
+                            backend, confidence = prediction["backend"], prediction["confidence"]
+                            backend_caption = (f"Backend: {prediction['backend']} (fallback, Gemini unavailable: {e})"
+                                               f" · confidence {prediction['confidence']:.1%}")
+                else:
+                    prediction = get_predictor().predict(image)
+                    report = prediction["report"]
+                    backend, confidence = prediction["backend"], prediction["confidence"]
+                    backend_caption = f"Backend: {prediction['backend']}"
+                    if prediction["confidence"] is not None:
+                        backend_caption += f" · confidence {prediction['confidence']:.1%}"
+            REQUESTS.labels(PREDICTOR_BACKEND, "ok").inc()
+            
+            # Every widget interaction reruns this for the same upload; keep the first analysis
+            if history is not None and data is not None:
+                latency_ms = round((time.perf_counter() - started) * 1000, 1)
+                history.record(data, report, backend, latency_ms, confidence, name, replace=False)
+            
+            if embedding is not None and duplicate is None and report.is_animal:
+                summary = report.summary()
+                label = " · ".join(part for part in (summary["animal"], summary["breed"]) if part)
+                get_embedding_index().add(embedding, {"label": label, "report": report.to_dict()}, thumbnail=image)
+            
+            # Display results
+            status_area.success("Analysis Complete!")
+            status_area.caption(backend_caption)
+            breed_area.markdown(report.breed_markdown())
+            
+            if report.is_animal:
+                safety_area.markdown(report.safety_markdown())
+            else:
+                safety_area.info("Safety assessment information not available for this animal.")
+            
+            with facts_area:
+                if not report.is_animal:
+                    st.info("Animal facts not available.")
+                else:
+                    st.subheader(f"Interesting Facts About {report.animal}s")
+                    if report.facts:
+                        st.markdown(report.facts_markdown())
+                    elif PREDICTOR_BACKEND == "local":
+                        st.info("Animal facts need the Gemini backend.")
+                    else:
+                        # Local predictions and older cached reports come without facts
+                        st.markdown(get_animal_facts(report.animal))
+            
+            if tab4:
+                with tab4[0]:
+                    render_similar_animals(neighbors)
+        
+        except Exception as e:
+            REQUESTS.labels(PREDICTOR_BACKEND, "error").inc()
+            st.error(f"An error occurred: {str(e)}")
+            st.info("Please try again with a different image.")
+    if profile["path"]:
+        st.caption(f"Profile written to {profile['path']}")
 
 # Main app
 def main():
@@ -99,69 +534,59 @@ def main():
         
         st.header("Supported Animals")
         st.write("Dogs, Cats, Birds, Exotic Pets, and more!")
+        
+        mode = st.radio("Mode", ["Single image", "Batch"])
+    
+    if mode == "Batch":
+        render_batch_mode()
+        render_history()
+        render_cache_stats()
+        render_resilience_stats()
+        render_upload_stats()
+        return
     
     # File upload
     uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png"])
     
     if uploaded_file is not None:
         # Display the uploaded image
-        image = Image.open(uploaded_file)
+        with span("decode"):
+            image = Image.open(uploaded_file)
+            image.load()
         st.image(image, caption="Uploaded Image", use_column_width=True)
-        
-        # Process the image
-        with st.spinner("Analyzing image..."):
-            try:
-                # Identify animal breed
-                response = identify_animal_breed(image)
-                
-                # Display results
-                st.success("Analysis Complete!")
-                
-                # Create tabs for different information sections
-                tab1, tab2, tab3 = st.tabs(["Breed Information", "Safety Assessment", "Animal Facts"])
-                
-                with tab1:
-                    st.subheader("Breed Identification & Characteristics")
-                    st.markdown(response)
-                
-                with tab2:
-                    # Extract safety information
-                    if "**Safety Assessment:**" in response:
-                        safety_section = response.split("**Safety Assessment:**")[1].split("**Additional Information:**")[0]
-                        st.markdown(safety_section)
-                    else:
-                        st.info("Safety assessment information not available for this animal.")
-                
-                with tab3:
-                    # Extract animal type for facts
-                    if "**Animal:**" in response:
-                        animal_type = response.split("**Animal:**")[1].split("**Breed:**")[0].strip()
-                        st.subheader(f"Interesting Facts About {animal_type}s")
-                        facts = get_animal_facts(animal_type)
-                        st.markdown(facts)
-                    else:
-                        st.info("Animal facts not available.")
-            
-            except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
-                st.info("Please try again with a different image.")
-
+        analyze_image(image, data=uploaded_file.getvalue(), name=uploaded_file.name)
     else:
-        # Show sample images
-        st.subheader("Try with these sample images:")
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.image("https://upload.wikimedia.org/wikipedia/commons/thumb/4/4d/Cat_November_2010-1a.jpg/800px-Cat_November_2010-1a.jpg", 
-                    caption="Sample Cat", use_column_width=True)
-        
-        with col2:
-            st.image("https://imgs.search.brave.com/8UIgd2rGu-w5WNHs1LSAieexcDqKt4liuafSLSDQwHk/rs:fit:860:0:0:0/g:ce/aHR0cHM6Ly9pbWFn/ZXMuZnJlZWltYWdl/cy5jb20vaW1hZ2Vz/L2xhcmdlLXByZXZp/ZXdzL2NlNy9oYXBw/eS1ibGFjay1kb2ct/MDQxMC01NzAxNTc5/LmpwZz9mbXQ", 
-                    caption="Sample Dog", use_column_width=True)
-        
-        with col3:
-            st.image("https://imgs.search.brave.com/Pgcb9_lcz5h2RJHmkh0swRhKkdKQsfqRGeYICMzK1qg/rs:fit:860:0:0:0/g:ce/aHR0cHM6Ly9tZWRp/YS5nZXR0eWltYWdl/cy5jb20vaWQvNDgy/NTMwMTE5L3Bob3Rv/L29wZXJhLWJpcmQt/MS5qcGc_cz02MTJ4/NjEyJnc9MCZrPTIw/JmM9Q2E1bi0wOEZO/OW9YZExrM1Vza2lx/ZmpnbXZiXzQ2RHU0/ZlJZQkRGR3UyUT0", 
-                    caption="Sample Bird", use_column_width=True)
+        render_sample_gallery()
+        sample = next((entry for entry in load_sample_manifest()
+                       if entry["id"] == st.session_state.get("sample")), None)
+        entry = None
+        if history is not None and st.session_state.get("history_entry"):
+            entry = history.get(st.session_state["history_entry"])
+        if sample is not None:
+            st.subheader(sample["caption"])
+            image = Image.open(io.BytesIO(load_sample_file(sample["image"])))
+            st.image(image, use_column_width=True)
+            stored = None
+            if sample.get("report"):
+                stored = {"report": sample["report"],
+                          "caption": f"Precomputed sample result (backend: {sample.get('backend', 'gemini')})"}
+            analyze_image(image, stored=stored)
+        elif entry is not None:
+            # Earlier analyses come back instantly from the history instead of being run again
+            st.subheader(entry["name"] or "Earlier analysis")
+            image = Image.open(io.BytesIO(history.image(entry["image_hash"])))
+            st.image(image, use_column_width=True)
+            analyzed_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["created_at"]))
+            analyze_image(image, stored={"report": entry["report"],
+                                         "caption": f"From history · backend: {entry['backend']} · {analyzed_at}"})
+
+    # Rendered last so the counters include this run's lookups
+    render_history()
+    render_cache_stats()
+    render_resilience_stats()
+    render_upload_stats()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Every widget interaction reruns the script, so this span is the per-interaction cost
+    with span("rerun"):
+        main()
\ No newline at end of file
@@ -0,0 +1,180 @@
+import csv
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PIL import Image
+
+from config import BATCH_SIZE, GEMINI_REQUESTS_PER_MINUTE
+# Retry helpers live in resilience; re-exported here for existing callers
+from resilience import call_with_backoff, is_retryable  # noqa: F401
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+EXPORT_FIELDS = ["file", "status", "animal", "breed", "danger_level", "backend", "confidence", "latency_ms", "attempts",
+                 "error", "report"]
+
+
+class TokenBucket:
+    """Thread-safe token bucket that paces calls to a requests-per-minute quota
+
+    A full bucket lets `capacity` calls through at once. Every call in that burst beyond the first
+    comes out of the refill rate, so no 60-second window sees more than requests_per_minute calls.
+    """
+
+    def __init__(self, requests_per_minute, capacity=1):
+        if not 1 <= capacity <= requests_per_minute:
+            raise ValueError("capacity must be between 1 and requests_per_minute")
+        self.rate = (requests_per_minute - capacity + 1) / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """Take a token if one is available right now, without waiting"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+_gemini_limiter = None
+_gemini_limiter_lock = threading.Lock()
+
+
+def get_gemini_rate_limiter():
+    """Return the process-wide TokenBucket for GEMINI_REQUESTS_PER_MINUTE
+
+    The quota belongs to the API key, so single-image analyses, batch mode and classify all draw
+    from this one bucket.
+    """
+    global _gemini_limiter
+    with _gemini_limiter_lock:
+        if _gemini_limiter is None:
+            _gemini_limiter = TokenBucket(GEMINI_REQUESTS_PER_MINUTE)
+        return _gemini_limiter
+
+
+def iter_uploaded_images(uploaded_files):
+    """Yield (name, bytes) for each uploaded image, expanding zip archives"""
+    for uploaded in uploaded_files:
+        name = uploaded.name
+        data = uploaded.getvalue()
+        if not name.lower().endswith(".zip"):
+            yield name, data
+            continue
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                member = info.filename
+                if info.is_dir() or member.startswith("__MACOSX/") or os.path.basename(member).startswith("."):
+                    continue
+                if member.lower().endswith(IMAGE_EXTENSIONS):
+                    yield f"{name}/{member}", archive.read(info)
+
+
+def _new_row(name):
+    return {"file": name, "status": "ok", "animal": "", "breed": "", "danger_level": "", "backend": "",
+            "confidence": None, "latency_ms": 0.0, "attempts": 0, "error": "", "report": None}
+
+
+def _fill_row(row, prediction, attempts=0):
+    report = prediction["report"]
+    row.update(report.summary(), report=report.to_dict(), backend=prediction["backend"],
+               confidence=prediction["confidence"], attempts=attempts)
+
+
+def _identify_one(index, name, data, identify_fn):
+    started = time.perf_counter()
+    row = _new_row(name)
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        prediction, attempts = identify_fn(image)
+        _fill_row(row, prediction, attempts)
+    except Exception as e:
+        row.update(status="error", error=str(e))
+    row["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return index, row
+
+
+def run_batch(items, identify_fn, max_workers):
+    """Identify (name, bytes) items concurrently and yield (index, row) pairs as they complete
+
+    identify_fn takes a PIL image and returns a (prediction, attempts) tuple, where prediction is
+    a Predictor.predict() result dict. index is the item's position, since names may repeat.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_identify_one, index, name, data, identify_fn)
+                   for index, (name, data) in enumerate(items)]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_local_batch(items, predictor, batch_size=BATCH_SIZE):
+    """Classify (name, bytes) items with an in-process local model and yield (index, row) pairs
+
+    Instead of one model call per image, images are decoded in a thread pool straight into
+    fixed-size batch buffers and predictor.predict_many runs the model once per batch. Files that
+    are not images are reported up front; latency_ms is the running average per image.
+    """
+    valid = []
+    for index, (name, data) in enumerate(items):
+        try:
+            # Only reads the header; the pixels are decoded into the batch buffer later
+            Image.open(io.BytesIO(data))
+        except Exception as e:
+            yield index, {**_new_row(name), "status": "error", "error": str(e)}
+        else:
+            valid.append(index)
+
+    started = time.perf_counter()
+    predictions = predictor.predict_many((items[index][1] for index in valid), batch_size)
+    done = 0
+    try:
+        for prediction in predictions:
+            index = valid[done]
+            done += 1
+            row = _new_row(items[index][0])
+            _fill_row(row, prediction)
+            row["latency_ms"] = round((time.perf_counter() - started) * 1000 / done, 1)
+            yield index, row
+    except Exception as e:
+        # A file that fails to decode stops the batch pipeline, so the rest are reported as failed
+        for index in valid[done:]:
+            yield index, {**_new_row(items[index][0]), "status": "error", "error": str(e)}
+
+
+def rows_to_csv(rows):
+    """Serialize batch results as CSV"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({**row, "report": json.dumps(row["report"]) if row["report"] else ""})
+    return buffer.getvalue()
+
+
+def rows_to_jsonl(rows):
+    """Serialize batch results as JSON Lines"""
+    return "".join(json.dumps(row) + "\n" for row in rows)
@@ -0,0 +1,37 @@
+"""
+Offline benchmark suite: python -m benchmarks.run --help
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+
+def latency_summary(samples_ms):
+    """p50/p95/p99, mean and max of a list of latencies in milliseconds"""
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "count": int(samples.size),
+        "mean_ms": round(float(samples.mean()), 2),
+        "p50_ms": round(float(np.percentile(samples, 50)), 2),
+        "p95_ms": round(float(np.percentile(samples, 95)), 2),
+        "p99_ms": round(float(np.percentile(samples, 99)), 2),
+        "max_ms": round(float(samples.max()), 2),
+    }
+
+
+def synthetic_image(size, seed=0):
+    """A photo-like RGB test image: smooth gradients plus mild noise, so JPEG sizes are realistic"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([x / width * 255, y / height * 255, (x + y) / (width + height) * 255], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    return Image.fromarray(pixels, "RGB")
+
+
+def jpeg_bytes(image, quality=90):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
@@ -0,0 +1,44 @@
+"""
+End-to-end identify latency against the stub Gemini server at increasing concurrency
+
+Each request goes through the same path as the app: upload preparation, the SDK's REST transport
+and the ResilientCaller, so client-side overhead and queueing show up on top of the stub latency.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import latency_summary, synthetic_image
+from benchmarks.stub_gemini import StubGeminiServer
+
+
+def run(concurrency=(1, 4, 16), requests_per_level=48, latency_ms=300.0, jitter=0.3, image_size=(1600, 1200)):
+    import gemini_client
+    from resilience import ResilientCaller
+
+    image = synthetic_image(image_size)
+    results = {"stub_latency_ms": latency_ms, "stub_jitter": jitter, "image_size": list(image_size), "levels": {}}
+    with StubGeminiServer(latency_ms=latency_ms, jitter=jitter) as stub:
+        gemini_client.configure_genai("benchmark", api_endpoint=stub.url, transport="rest")
+        # Warm up the client connection and model registry outside the measurement
+        gemini_client.identify_animal_breed(image)
+        for level in concurrency:
+            caller = ResilientCaller(hedge=False)
+
+            def timed(_):
+                started = time.perf_counter()
+                caller.call(gemini_client.identify_animal_breed, image)
+                return (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(level) as executor:
+                latencies = list(executor.map(timed, range(requests_per_level)))
+            elapsed = time.perf_counter() - started
+            summary = latency_summary(latencies)
+            summary["requests_per_sec"] = round(requests_per_level / elapsed, 2)
+            # Client overhead: what the app adds on top of the stub's own median latency
+            summary["overhead_p50_ms"] = round(summary["p50_ms"] - latency_ms, 2)
+            results["levels"][f"c{level}"] = summary
+            print(f"  identify c={level}: p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, "
+                  f"p99 {summary['p99_ms']} ms, {summary['requests_per_sec']} req/s")
+    return results
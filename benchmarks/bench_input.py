@@ -0,0 +1,26 @@
+"""
+Training input pipeline throughput: a cold epoch that fills the tf.data cache, then warm epochs
+"""
+
+import glob
+import os
+
+from config import IMAGES_DIR, TF_CACHE_DIR
+
+
+def run(epochs=2, max_batches=50):
+    if not os.path.isdir(IMAGES_DIR) or not any(os.scandir(IMAGES_DIR)):
+        return {"skipped": f"no training images in {IMAGES_DIR}"}
+    import train_model
+
+    # Start from an empty cache so the first epoch is a true cold read on every run
+    for path in glob.glob(os.path.join(TF_CACHE_DIR, "benchmark*")):
+        os.remove(path)
+    (train_paths, train_labels), _, _ = train_model.list_image_files()
+    dataset = train_model.build_dataset(train_paths, train_labels, "benchmark", training=True)
+    results = {"images": len(train_paths), "max_batches": max_batches}
+    for epoch in range(1, epochs + 1):
+        rate = train_model.measure_throughput(dataset, max_batches)
+        results[f"epoch{epoch}_images_per_sec"] = round(rate, 1)
+        print(f"  input pipeline epoch {epoch}: {rate:.1f} images/sec")
+    return results
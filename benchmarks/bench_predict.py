@@ -0,0 +1,47 @@
+"""
+Local classifier throughput (images/sec) across batch sizes and model formats
+
+Runs on uint8 batches already at IMG_SIZE so only preprocessing and the forward pass are timed.
+Formats whose model file or runtime is missing are reported as skipped.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from config import IMG_SIZE, MODEL_PATH, ONNX_MODEL_PATH, TFLITE_MODEL_PATH
+
+BATCH_SIZES = (1, 8, 32)
+FORMATS = {"keras": MODEL_PATH, "tflite": TFLITE_MODEL_PATH, "onnx": ONNX_MODEL_PATH}
+
+
+def run(batch_sizes=BATCH_SIZES, formats=tuple(FORMATS), min_images=256, seed=0):
+    from predictors import LOCAL_PREDICTORS
+
+    rng = np.random.default_rng(seed)
+    results = {}
+    for model_format in formats:
+        path = FORMATS[model_format]
+        if not os.path.exists(path):
+            results[model_format] = {"skipped": f"{path} not found"}
+            continue
+        try:
+            predictor = LOCAL_PREDICTORS[model_format](model_path=path)
+        except ImportError as e:
+            results[model_format] = {"skipped": str(e)}
+            continue
+        results[model_format] = {"model_mb": round(os.path.getsize(path) / 1e6, 1)}
+        for batch_size in batch_sizes:
+            batch = rng.integers(0, 256, (batch_size, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.uint8)
+            predictor.predict_arrays(batch)  # graph tracing and allocation happen on the first call
+            iterations = max(3, min_images // batch_size)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                predictor.predict_arrays(batch)
+            elapsed = time.perf_counter() - started
+            results[model_format][f"b{batch_size}_images_per_sec"] = round(iterations * batch_size / elapsed, 1)
+            results[model_format][f"b{batch_size}_batch_ms"] = round(elapsed / iterations * 1000, 2)
+            print(f"  predict {model_format} batch {batch_size}: "
+                  f"{results[model_format][f'b{batch_size}_images_per_sec']} images/sec")
+    return results
@@ -0,0 +1,45 @@
+"""
+preprocess_image cost per input resolution, from a decoded image and from JPEG bytes
+"""
+
+import io
+import time
+
+from PIL import Image
+
+from benchmarks import jpeg_bytes, latency_summary, synthetic_image
+
+RESOLUTIONS = ((640, 480), (1280, 960), (1920, 1080), (4032, 3024))
+
+
+def _time(fn, repeats):
+    fn()  # first call pays for imports and allocator warm-up
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return latency_summary(samples)
+
+
+def run(resolutions=RESOLUTIONS, repeats=30):
+    from utils import preprocess_image
+
+    results = {}
+    for size in resolutions:
+        image = synthetic_image(size)
+        data = jpeg_bytes(image)
+        name = f"{size[0]}x{size[1]}"
+        decoded = _time(lambda: preprocess_image(image), repeats)
+        # Bytes include JPEG decode, which the draft-mode decoder shortcuts for large inputs
+        from_bytes = _time(lambda: preprocess_image(data), repeats)
+        full_decode = _time(lambda: Image.open(io.BytesIO(data)).convert("RGB"), repeats)
+        results[name] = {
+            "decoded_p50_ms": decoded["p50_ms"],
+            "bytes_p50_ms": from_bytes["p50_ms"],
+            "full_decode_p50_ms": full_decode["p50_ms"],
+            "jpeg_kb": round(len(data) / 1024, 1),
+        }
+        print(f"  preprocess {name}: {decoded['p50_ms']} ms decoded, {from_bytes['p50_ms']} ms from JPEG "
+              f"(full decode alone {full_decode['p50_ms']} ms)")
+    return results
@@ -0,0 +1,143 @@
+"""
+Run the benchmark suites, write JSON results and compare them against a stored baseline
+
+    python -m benchmarks.run                                  # all suites
+    python -m benchmarks.run --suite identify preprocess      # a subset
+    python -m benchmarks.run --save-baseline                  # record benchmarks/baseline.json
+    python -m benchmarks.run --fail-on-regression             # exit 1 if a metric regressed
+
+Suites whose dependencies are missing (TensorFlow, trained models, training images) are skipped.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+SUITES = {
+    "identify": "benchmarks.bench_identify",
+    "predict": "benchmarks.bench_predict",
+    "preprocess": "benchmarks.bench_preprocess",
+    "input": "benchmarks.bench_input",
+}
+# Only these metrics are compared; the suffix says which direction is better
+LOWER_IS_BETTER = ("_ms",)
+HIGHER_IS_BETTER = ("_per_sec",)
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=BENCHMARKS_DIR, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_suites(names, quick=False):
+    results = {}
+    for name in names:
+        print(f"[{name}]")
+        options = {}
+        if quick:
+            options = {"identify": {"requests_per_level": 12, "latency_ms": 100.0},
+                       "preprocess": {"repeats": 5},
+                       "predict": {"min_images": 32},
+                       "input": {"max_batches": 5}}[name]
+        try:
+            module = importlib.import_module(SUITES[name])
+            results[name] = module.run(**options)
+        except ImportError as e:
+            results[name] = {"skipped": f"missing dependency: {e}"}
+        if "skipped" in results[name]:
+            print(f"  skipped: {results[name]['skipped']}")
+        for part, value in results[name].items():
+            if isinstance(value, dict) and "skipped" in value:
+                print(f"  {part} skipped: {value['skipped']}")
+    return results
+
+
+def flatten(results, prefix=""):
+    """Turn nested results into {"suite.level.metric": value} for comparable numeric metrics"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) \
+                and key.endswith(LOWER_IS_BETTER + HIGHER_IS_BETTER):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    """Return rows of (metric, baseline, current, change, status) for metrics present in both"""
+    current, previous = flatten(results), flatten(baseline)
+    rows = []
+    for metric in sorted(current.keys() & previous.keys()):
+        old, new = previous[metric], current[metric]
+        if not old:
+            continue
+        change = (new - old) / abs(old)
+        worse = change > tolerance if metric.endswith(LOWER_IS_BETTER) else change < -tolerance
+        better = change < -tolerance if metric.endswith(LOWER_IS_BETTER) else change > tolerance
+        rows.append((metric, old, new, change, "REGRESSION" if worse else "improved" if better else "ok"))
+    return rows
+
+
+def print_comparison(rows):
+    width = max((len(row[0]) for row in rows), default=10)
+    print(f"\n{'metric':<{width}} {'baseline':>11} {'current':>11} {'change':>8}  status")
+    for metric, old, new, change, status in rows:
+        print(f"{metric:<{width}} {old:>11.2f} {new:>11.2f} {change:>+8.1%}  {status}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--suite", nargs="+", choices=list(SUITES), default=list(SUITES))
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change treated as noise")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for smoke tests")
+    args = parser.parse_args(argv)
+
+    report = {"environment": environment(), "results": run_suites(args.suite, args.quick)}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    rows = compare(report["results"], baseline["results"], args.tolerance)
+    print_comparison(rows)
+    regressions = [row for row in rows if row[4] == "REGRESSION"]
+    print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} against baseline "
+          f"from {baseline['environment'].get('timestamp', 'unknown')}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Stub of the Gemini REST API that replays recorded responses at a configurable latency
+
+    python -m benchmarks.stub_gemini --port 8600 --latency-ms 800 --jitter 0.3
+
+Point the SDK at it with GEMINI_TRANSPORT=rest GEMINI_API_ENDPOINT=http://127.0.0.1:8600 (any API key).
+Structured (JSON) requests get a recorded identify report, streamed requests the markdown layout,
+and text-only requests the recorded facts.
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RECORDINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings", "responses.json")
+
+
+def load_recordings(path=RECORDINGS_PATH):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _response_body(text):
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {"promptTokenCount": 300, "candidatesTokenCount": len(text) // 4,
+                          "totalTokenCount": 300 + len(text) // 4},
+    }
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    # Concurrency sweeps open many connections at once; the default backlog of 5 would reset them
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class StubGeminiServer:
+    """Threaded HTTP server answering generateContent and streamGenerateContent"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=800.0, jitter=0.3, error_rate=0.0,
+                 stream_chunks=8, recordings=None, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stream_chunks = stream_chunks
+        self.recordings = recordings or load_recordings()
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = _StubHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _draw(self, kind):
+        """Pick a recording and a latency; lognormal jitter gives the long tail real APIs have"""
+        with self._lock:
+            self.requests += 1
+            latency = self.latency_ms * self._random.lognormvariate(0, self.jitter) if self.jitter else self.latency_ms
+            failed = self._random.random() < self.error_rate
+            text = self._random.choice(self.recordings[kind])
+        return text, latency / 1000, failed
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status, body, content_type="application/json"):
+                data = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                streaming = ":streamGenerateContent" in self.path
+                config = payload.get("generationConfig") or payload.get("generation_config") or {}
+                has_image = any("inlineData" in part or "inline_data" in part
+                                for content in payload.get("contents", []) for part in content.get("parts", []))
+                if streaming:
+                    kind = "stream_identify"
+                elif config.get("responseMimeType", config.get("response_mime_type")) == "application/json":
+                    kind = "identify"
+                else:
+                    kind = "stream_identify" if has_image else "facts"
+                text, latency, failed = stub._draw(kind)
+                if failed:
+                    time.sleep(latency / 4)
+                    self._send(503, {"error": {"code": 503, "message": "stub overloaded", "status": "UNAVAILABLE"}})
+                elif streaming:
+                    self._stream(text, latency)
+                else:
+                    time.sleep(latency)
+                    self._send(200, _response_body(text))
+
+            def _stream(self, text, latency):
+                # The REST transport streams one JSON array of responses; the first element
+                # arrives after a third of the latency, the rest are spread over the remainder
+                size = max(1, len(text) // stub.stream_chunks)
+                chunks = [text[i:i + size] for i in range(0, len(text), size)]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                time.sleep(latency / 3)
+                for i, chunk in enumerate(chunks):
+                    piece = ("[" if i == 0 else ",") + json.dumps(_response_body(chunk))
+                    self._write_chunk(piece.encode())
+                    time.sleep(latency * 2 / 3 / len(chunks))
+                self._write_chunk(b"]")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded Gemini responses at a configurable latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="median response latency")
+    parser.add_argument("--jitter", type=float, default=0.3, help="lognormal sigma of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args(argv)
+    stub = StubGeminiServer(args.host, args.port, args.latency_ms, args.jitter, args.error_rate)
+    print(f"Stub Gemini API on {stub.url} (GEMINI_TRANSPORT=rest GEMINI_API_ENDPOINT={stub.url})")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
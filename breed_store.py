@@ -0,0 +1,275 @@
+"""
+Breed knowledge store: the breed catalog compiled once into an in-memory index
+
+data/breed_info.json stays the editable source. It is compiled into a pickled index (normalized
+lookup keys, class order and fully defaulted feature records) that is loaded once per process and
+rebuilt whenever the JSON file changes on disk.
+"""
+
+import difflib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+
+from config import BREED_INDEX_PATH, BREED_INFO_PATH, BREED_MATCH_CUTOFF, BREED_RELOAD_INTERVAL, CLASS_NAMES_PATH
+
+INDEX_VERSION = 2
+# Free-text labels are unbounded, so the memo of resolved labels is reset when it grows this large
+MATCH_CACHE_SIZE = 4096
+
+# The 37 breeds in the Oxford-IIIT Pets dataset
+BREEDS = [
+    'Abyssinian', 'American Bulldog', 'American Pit Bull Terrier', 'Basset Hound',
+    'Beagle', 'Bengal', 'Birman', 'Bombay', 'Boxer', 'British Shorthair',
+    'Chihuahua', 'Egyptian Mau', 'English Cocker Spaniel', 'English Setter',
+    'German Shorthaired', 'Great Pyrenees', 'Havanese', 'Japanese Chin', 'Keeshond',
+    'Leonberger', 'Maine Coon', 'Miniature Pinscher', 'Newfoundland', 'Persian',
+    'Pomeranian', 'Pug', 'Ragdoll', 'Russian Blue', 'Saint Bernard', 'Samoyed',
+    'Scottish Terrier', 'Shiba Inu', 'Siamese', 'Sphynx', 'Staffordshire Bull Terrier',
+    'Wheaten Terrier', 'Yorkshire Terrier'
+]
+
+CAT_BREEDS = {
+    'Abyssinian', 'Bengal', 'Birman', 'Bombay', 'British Shorthair',
+    'Egyptian Mau', 'Maine Coon', 'Persian', 'Ragdoll', 'Russian Blue',
+    'Siamese', 'Sphynx'
+}
+
+SHORT_COAT_BREEDS = {'Bombay', 'Russian Blue', 'Sphynx'}
+
+# Common alternative names, as Gemini or other datasets tend to phrase them
+ALIASES = {
+    'pit bull': 'American Pit Bull Terrier',
+    'pitbull': 'American Pit Bull Terrier',
+    'american pit bull': 'American Pit Bull Terrier',
+    'basset': 'Basset Hound',
+    'cocker spaniel': 'English Cocker Spaniel',
+    'german shorthaired pointer': 'German Shorthaired',
+    'pyrenean mountain dog': 'Great Pyrenees',
+    'min pin': 'Miniature Pinscher',
+    'newfie': 'Newfoundland',
+    'st bernard': 'Saint Bernard',
+    'scottie': 'Scottish Terrier',
+    'shiba': 'Shiba Inu',
+    'sphinx': 'Sphynx',
+    'staffy': 'Staffordshire Bull Terrier',
+    'staffie': 'Staffordshire Bull Terrier',
+    'soft coated wheaten terrier': 'Wheaten Terrier',
+    'yorkie': 'Yorkshire Terrier',
+}
+
+# Fields every record has, and the values used when the source leaves them out
+DEFAULT_FEATURES = {
+    'animal_type': 'Unknown',
+    'origin': 'Not specified',
+    'size': 'Not specified',
+    'lifespan': 'Not specified',
+    'coat': 'Not specified',
+    'colors': 'Not specified',
+    'distinctive_features': 'Not specified',
+    'physical_traits': [],
+    'temperament': ['Information not available'],
+    'care_requirements': ['Information not available'],
+    'danger_level': 'Unknown',
+    'potential_risks': ['Information not available'],
+    'safety_precautions': ['Information not available']
+}
+
+# Words that qualify a label without changing which breed it names
+_FILLER_WORDS = {'cat', 'dog', 'breed', 'the', 'a', 'an', 'domestic'}
+
+
+def normalize(label):
+    """Lowercase a free-text label and collapse punctuation, underscores and spacing"""
+    label = re.sub(r"\bst\b\.?", "saint", label.lower().replace("'s", ""))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", label).split())
+
+
+def default_breed_record(breed):
+    """Placeholder record for a breed that has no curated entry yet"""
+    animal_type = "Cat" if breed in CAT_BREEDS else "Dog"
+    return {
+        "animal_type": animal_type,
+        "origin": "Various",
+        "size": "Medium" if animal_type == "Cat" else "Varies",
+        "lifespan": "12-15 years" if animal_type == "Cat" else "10-13 years",
+        "coat": "Short" if breed in SHORT_COAT_BREEDS else "Medium to Long",
+        "colors": "Varies",
+        "distinctive_features": "Varies by breed",
+        "physical_traits": ["Varies by breed"],
+        "temperament": ["Varies by breed"],
+        "care_requirements": ["Regular grooming", "Balanced diet", "Veterinary check-ups"],
+        "danger_level": "Low",
+        "potential_risks": ["Scratches", "Bites if provoked", "Allergies"],
+        "safety_precautions": ["Proper socialization", "Supervision with children", "Training"],
+        "description": f"The {breed} is a {'cat' if animal_type == 'Cat' else 'dog'} breed with unique characteristics."
+    }
+
+
+def generate_breed_info(file_path=BREED_INFO_PATH):
+    """Write placeholder breed information for every breed in BREEDS and return it"""
+    breed_info = {breed: default_breed_record(breed) for breed in BREEDS}
+    with open(file_path, 'w') as f:
+        json.dump(breed_info, f, indent=4)
+    return breed_info
+
+
+def compile_index(breed_info):
+    """Build the lookup index for a {breed: record} mapping"""
+    names = list(breed_info)
+    records = {name: {**DEFAULT_FEATURES, **breed_info[name]} for name in names}
+    lookup = {}
+    for name in names:
+        lookup[normalize(name)] = name
+    for alias, name in ALIASES.items():
+        if name in records:
+            lookup.setdefault(normalize(alias), name)
+    return {"version": INDEX_VERSION, "names": names, "records": records, "lookup": lookup}
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+class BreedStore:
+    """Read-only view of the breed catalog with exact, alias and fuzzy lookup"""
+
+    def __init__(self, source_path=BREED_INFO_PATH, index_path=BREED_INDEX_PATH,
+                 reload_interval=BREED_RELOAD_INTERVAL, class_names_path=CLASS_NAMES_PATH):
+        self.source_path = source_path
+        self.index_path = index_path
+        self.class_names_path = class_names_path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._source_mtime = None
+        self._checked_at = 0.0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.source_path):
+            generate_breed_info(self.source_path)
+        mtime = os.path.getmtime(self.source_path)
+        index = self._read_index(mtime)
+        if index is None:
+            try:
+                with open(self.source_path, 'r') as f:
+                    breed_info = json.load(f)
+            except json.JSONDecodeError:
+                breed_info = generate_breed_info(self.source_path)
+                mtime = os.path.getmtime(self.source_path)
+            index = compile_index(breed_info)
+            self._write_index(index, mtime)
+        self.names = index["names"]
+        self.records = index["records"]
+        self.lookup = index["lookup"]
+        self._keys = list(self.lookup)
+        self._matches = {}
+        self._source_mtime = mtime
+        self._load_class_names()
+
+    def _load_class_names(self):
+        # A trained model indexes classes in its own order, which need not match the JSON's
+        self._class_names_mtime = _mtime(self.class_names_path)
+        try:
+            with open(self.class_names_path, 'rb') as f:
+                self.class_names = list(pickle.load(f))
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.class_names = list(self.names)
+
+    def _read_index(self, mtime):
+        try:
+            with open(self.index_path, 'rb') as f:
+                index = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if index.get("version") != INDEX_VERSION or index.get("source_mtime") != mtime:
+            return None
+        return index
+
+    def _write_index(self, index, mtime):
+        # Write then rename so concurrent readers never see a partial index
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({**index, "source_mtime": mtime}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            # The index is only an optimization, a read-only data dir still works
+            pass
+
+    def refresh(self):
+        """Recompile if the source file changed, checking its mtime at most every reload_interval"""
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            mtime = _mtime(self.source_path)
+            if mtime is not None and mtime != self._source_mtime:
+                self._load()
+            elif _mtime(self.class_names_path) != self._class_names_mtime:
+                self._load_class_names()
+
+    def match(self, label):
+        """Resolve a free-text label to a catalog breed name, or None if nothing is close enough"""
+        if not label:
+            return None
+        self.refresh()
+        if label in self._matches:
+            return self._matches[label]
+        key = normalize(label)
+        name = self.lookup.get(key)
+        if name is None:
+            words = [word for word in key.split() if word not in _FILLER_WORDS]
+            name = self.lookup.get(" ".join(words))
+        if name is None and key:
+            close = difflib.get_close_matches(key, self._keys, n=1, cutoff=BREED_MATCH_CUTOFF)
+            name = self.lookup[close[0]] if close else None
+        if len(self._matches) >= MATCH_CACHE_SIZE:
+            self._matches.clear()
+        self._matches[label] = name
+        return name
+
+    def get(self, label):
+        """Return the record for a breed name or alias, or None"""
+        name = self.match(label)
+        return self.records[name] if name else None
+
+    def by_index(self, class_index):
+        """Return (name, record) for a model class index, in class_names.pkl order when it exists"""
+        self.refresh()
+        label = self.class_names[class_index]
+        name = self.match(label)
+        return (name, self.records[name]) if name else (label, dict(DEFAULT_FEATURES))
+
+    def features(self, label):
+        """Return the full feature record for a label, falling back to DEFAULT_FEATURES"""
+        record = self.get(label)
+        return dict(record if record else DEFAULT_FEATURES)
+
+    def __contains__(self, label):
+        return self.match(label) is not None
+
+    def __len__(self):
+        return len(self.names)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_breed_store(source_path=BREED_INFO_PATH):
+    """Return the process-wide BreedStore for a breed info file"""
+    with _stores_lock:
+        store = _stores.get(source_path)
+        if store is None:
+            index_path = BREED_INDEX_PATH if source_path == BREED_INFO_PATH else f"{source_path}.idx"
+            store = BreedStore(source_path, index_path)
+            _stores[source_path] = store
+        return store
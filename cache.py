@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+from config import CACHE_DB_PATH, CACHE_MAX_DISK_ENTRIES, CACHE_MAX_MEMORY_ENTRIES, CACHE_TTL_SECONDS
+from metrics import record_cache_lookup
+
+
+def perceptual_hash(img, hash_size=8):
+    """Compute a difference hash (dHash) of an image as a hex string"""
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def image_key(img):
+    """Build a cache key from the perceptual hash and SHA-256 of the decoded pixels"""
+    digest = hashlib.sha256()
+    digest.update(f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode())
+    digest.update(img.tobytes())
+    return f"{perceptual_hash(img)}:{digest.hexdigest()}"
+
+
+def facts_key(animal_type):
+    """Normalize an animal type so 'Dog', ' dog ' and 'dogs' share a cache entry"""
+    key = " ".join(animal_type.lower().split()).strip("*:. ")
+    if key.endswith("s") and not key.endswith("ss"):
+        key = key[:-1]
+    return key
+
+
+class ResultCache:
+    """Two-tier cache: an in-process LRU in front of an on-disk SQLite store"""
+
+    def __init__(self, db_path=CACHE_DB_PATH, ttl=CACHE_TTL_SECONDS,
+                 max_memory_entries=CACHE_MAX_MEMORY_ENTRIES,
+                 max_disk_entries=CACHE_MAX_DISK_ENTRIES):
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # Streamlit runs each session in its own thread, so the connection is shared under a lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)")
+        self._conn.commit()
+
+    def _expired(self, created_at, now):
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, namespace, key):
+        """Return the cached value or None, checking memory first and then disk"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get((namespace, key))
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end((namespace, key))
+                    self.stats["memory_hits"] += 1
+                    record_cache_lookup(namespace, "memory_hit")
+                    return value
+                del self._memory[(namespace, key)]
+
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                record_cache_lookup(namespace, "miss")
+                return None
+
+            value, created_at = json.loads(row[0]), row[1]
+            if self._expired(created_at, now):
+                self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+                self._conn.commit()
+                self.stats["misses"] += 1
+                record_cache_lookup(namespace, "miss")
+                return None
+
+            self._conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+            self._conn.commit()
+            self._remember(namespace, key, value, created_at)
+            self.stats["disk_hits"] += 1
+            record_cache_lookup(namespace, "disk_hit")
+            return value
+
+    def set(self, namespace, key, value):
+        """Store a JSON-serializable value in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._remember(namespace, key, value, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now, now),
+            )
+            self._evict_disk(now)
+            self._conn.commit()
+
+    def _remember(self, namespace, key, value, created_at):
+        self._memory[(namespace, key)] = (value, created_at)
+        self._memory.move_to_end((namespace, key))
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now):
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_disk_entries:
+            self._conn.execute(
+                "DELETE FROM cache WHERE rowid IN"
+                " (SELECT rowid FROM cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+
+    def clear(self):
+        """Drop every cached entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
@@ -0,0 +1,168 @@
+"""
+Calibrate the local model's confidence and choose when the hybrid backend escalates to Gemini
+
+    python calibrate.py                                          # current LOCAL_TTA / ENSEMBLE_MODELS
+    python calibrate.py --tta --ensemble models/mobilenet_v2.h5=mobilenet_v2
+    python calibrate.py --escalation-cost 1 --error-cost 20 --gemini-accuracy 0.97
+
+Runs the local predictor over the validation split used in training and fits the temperature that
+minimizes negative log-likelihood. Then, for a range of confidence thresholds, it reports the share
+of images that would escalate to Gemini, the accuracy of the answers kept locally, the overall
+accuracy and the expected cost per image. The cheapest threshold and the temperature are written to
+CALIBRATION_PATH, which the local and hybrid backends pick up. Rerun it whenever the model,
+ensemble or TTA setting changes.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+from config import (
+    CALIBRATION_PATH,
+    ENSEMBLE_MODELS,
+    ERROR_COST,
+    ESCALATION_COST,
+    LOCAL_MODEL_FORMAT,
+    LOCAL_TTA,
+)
+from predictors import IN_PROCESS_FORMATS, in_process_format, load_ensemble, temperature_scale
+
+THRESHOLDS = np.round(np.linspace(0.0, 1.0, 21), 2)
+
+
+def negative_log_likelihood(probs, labels):
+    return float(-np.mean(np.log(np.clip(probs[np.arange(len(labels)), labels], 1e-12, 1.0))))
+
+
+def expected_calibration_error(probs, labels, bins=15):
+    """Gap between confidence and accuracy, averaged over equal-width confidence bins"""
+    confidence = probs.max(axis=1)
+    correct = probs.argmax(axis=1) == labels
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    error = 0.0
+    for low, high in zip(edges[:-1], edges[1:]):
+        in_bin = (confidence > low) & (confidence <= high)
+        if in_bin.any():
+            error += in_bin.mean() * abs(confidence[in_bin].mean() - correct[in_bin].mean())
+    return float(error)
+
+
+def fit_temperature(probs, labels):
+    """Temperature minimizing validation NLL: a coarse log-spaced search, then a finer one around the best"""
+    candidates = np.geomspace(0.05, 20.0, 60)
+    best = min(candidates, key=lambda t: negative_log_likelihood(temperature_scale(probs, t), labels))
+    candidates = np.linspace(best / 1.15, best * 1.15, 41)
+    return float(min(candidates, key=lambda t: negative_log_likelihood(temperature_scale(probs, t), labels)))
+
+
+def gate_table(probs, labels, gemini_accuracy, escalation_cost, error_cost, thresholds=THRESHOLDS):
+    """One row per threshold: escalation rate, local and overall accuracy and expected cost per image"""
+    confidence = probs.max(axis=1)
+    correct = probs.argmax(axis=1) == labels
+    rows = []
+    for threshold in thresholds:
+        kept = confidence >= threshold
+        escalation_rate = 1.0 - kept.mean()
+        local_accuracy = correct[kept].mean() if kept.any() else float("nan")
+        # Escalated images are assumed to be answered at gemini_accuracy
+        accuracy = correct[kept].sum() / len(labels) + escalation_rate * gemini_accuracy
+        cost = escalation_rate * escalation_cost + (1.0 - accuracy) * error_cost
+        rows.append({"threshold": float(threshold), "escalation_rate": round(float(escalation_rate), 4),
+                     "local_accuracy": round(float(local_accuracy), 4), "accuracy": round(float(accuracy), 4),
+                     "cost": round(float(cost), 4)})
+    return rows
+
+
+def collect(predictor, paths, labels, dataset_classes):
+    """Uncalibrated probabilities and predictor class indices for every validation image"""
+    probs, targets = [], []
+    started = time.perf_counter()
+    for path, label in zip(paths, labels):
+        name = dataset_classes[label]
+        if name not in predictor.class_names:
+            continue
+        with Image.open(path) as image:
+            probs.append(predictor.predict_uncalibrated(image))
+        targets.append(predictor.class_names.index(name))
+        if len(targets) % 100 == 0:
+            print(f"  {len(targets)} / {len(paths)} images")
+    latency_ms = (time.perf_counter() - started) * 1000 / max(len(targets), 1)
+    return np.array(probs), np.array(targets), latency_ms
+
+
+def print_table(rows, chosen):
+    print(f"\n{'threshold':>9} {'escalated':>10} {'local acc':>10} {'overall acc':>12} {'cost':>8}")
+    for row in rows:
+        marker = "  <- chosen" if row is chosen else ""
+        print(f"{row['threshold']:>9.2f} {row['escalation_rate']:>10.1%} {row['local_accuracy']:>10.1%} "
+              f"{row['accuracy']:>12.1%} {row['cost']:>8.3f}{marker}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit temperature scaling and the hybrid confidence gate")
+    parser.add_argument("--format", default=in_process_format(LOCAL_MODEL_FORMAT), choices=IN_PROCESS_FORMATS)
+    parser.add_argument("--ensemble", default=ENSEMBLE_MODELS, help='extra models as "path=preprocessing,..."')
+    parser.add_argument("--tta", action=argparse.BooleanOptionalAction, default=LOCAL_TTA)
+    parser.add_argument("--limit", type=int, default=None, help="use at most this many validation images")
+    parser.add_argument("--escalation-cost", type=float, default=ESCALATION_COST)
+    parser.add_argument("--error-cost", type=float, default=ERROR_COST)
+    parser.add_argument("--gemini-accuracy", type=float, default=1.0,
+                        help="accuracy assumed for escalated images (1.0 gives an upper bound)")
+    parser.add_argument("--output", default=CALIBRATION_PATH)
+    args = parser.parse_args(argv)
+
+    from train_model import list_image_files
+
+    _, (paths, labels), dataset_classes = list_image_files()
+    paths, labels = paths[:args.limit], labels[:args.limit]
+    predictor = load_ensemble(args.format, args.ensemble, args.tta, calibration={})
+    print(f"Scoring {len(paths)} validation images with {len(predictor.members)} model(s), "
+          f"TTA {'on' if args.tta else 'off'}...")
+    probs, targets, latency_ms = collect(predictor, paths, labels, dataset_classes)
+    if not len(targets):
+        raise SystemExit("No validation images match the model's classes")
+
+    temperature = fit_temperature(probs, targets)
+    calibrated = temperature_scale(probs, temperature)
+    metrics = {
+        "images": int(len(targets)),
+        "accuracy": round(float((probs.argmax(axis=1) == targets).mean()), 4),
+        "nll_before": round(negative_log_likelihood(probs, targets), 4),
+        "nll_after": round(negative_log_likelihood(calibrated, targets), 4),
+        "ece_before": round(expected_calibration_error(probs, targets), 4),
+        "ece_after": round(expected_calibration_error(calibrated, targets), 4),
+        "latency_ms": round(latency_ms, 1),
+    }
+    print(f"Temperature {temperature:.3f}: NLL {metrics['nll_before']} -> {metrics['nll_after']}, "
+          f"ECE {metrics['ece_before']} -> {metrics['ece_after']}, top-1 accuracy {metrics['accuracy']:.1%}, "
+          f"{metrics['latency_ms']} ms/image")
+
+    rows = gate_table(calibrated, targets, args.gemini_accuracy, args.escalation_cost, args.error_cost)
+    chosen = min(rows, key=lambda row: (row["cost"], row["escalation_rate"]))
+    print_table(rows, chosen)
+    print(f"\nThreshold {chosen['threshold']:.2f}: {chosen['escalation_rate']:.1%} of images escalate to Gemini, "
+          f"{chosen['accuracy']:.1%} overall accuracy (assuming {args.gemini_accuracy:.0%} for Gemini)")
+
+    calibration = {
+        "temperature": temperature,
+        "threshold": chosen["threshold"],
+        "model_format": args.format,
+        "ensemble": args.ensemble,
+        "tta": args.tta,
+        "costs": {"escalation": args.escalation_cost, "error": args.error_cost,
+                  "gemini_accuracy": args.gemini_accuracy},
+        "metrics": metrics,
+        "gate": rows,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(calibration, f, indent=2)
+    print(f"Calibration written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
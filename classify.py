@@ -0,0 +1,243 @@
+"""
+Classify a directory, glob or tar archive of images without the Streamlit UI
+
+    python -m classify data/images --output predictions.jsonl
+    python -m classify "photos/**/*.jpg" --backend gemini
+    python -m classify intake.tar.gz --batch-size 64 --workers 8
+
+Each stage is a generator, so only a bounded window of images is in memory at any time.
+Results are appended to the JSONL output as they are produced; rerunning the same command
+skips every image already recorded there, so interrupted runs resume where they stopped.
+"""
+
+import argparse
+import glob
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tarfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+from PIL import Image, ImageOps
+
+from config import BATCH_MAX_CONCURRENCY, IMG_SIZE, TOP_K, UPLOAD_MAX_EDGE
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def discover(source, done=frozenset()):
+    """Lazily yield (item_id, path_or_bytes) for every image in a directory, glob or tar archive
+
+    Ids in done are skipped before anything is read, so resuming a tar run does not extract them again.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if name.lower().endswith(IMAGE_EXTENSIONS) and path not in done:
+                    yield path, path
+    elif os.path.isfile(source) and tarfile.is_tarfile(source):
+        # Stream mode reads members in order without building the full member index
+        with tarfile.open(source, "r|*") as archive:
+            for member in archive:
+                item_id = f"{source}::{member.name}"
+                if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS) and item_id not in done:
+                    yield item_id, archive.extractfile(member).read()
+    else:
+        for path in glob.iglob(source, recursive=True):
+            if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS) and path not in done:
+                yield path, path
+
+
+def decode(item, size, keep_aspect):
+    """Decode and resize one image in a worker process"""
+    item_id, ref = item
+    try:
+        img = Image.open(ref if isinstance(ref, str) else io.BytesIO(ref))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        if keep_aspect:
+            img.thumbnail(size)
+        else:
+            img = img.resize(size)
+        return item_id, np.asarray(img, dtype=np.uint8), None
+    except Exception as e:
+        return item_id, None, str(e)
+
+
+class _Decoder:
+    """Picklable decode callable for the process pool"""
+
+    def __init__(self, size, keep_aspect):
+        self.size = size
+        self.keep_aspect = keep_aspect
+
+    def __call__(self, item):
+        return decode(item, self.size, self.keep_aspect)
+
+
+def bounded_map(executor, fn, iterable, window):
+    """Like executor.map, but only keeps `window` tasks in flight so memory stays flat"""
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def batched(iterable, size):
+    """Group an iterable into lists of at most `size` items"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_checkpoint(output_path, retry_errors=False):
+    """Return the ids already written to output_path, dropping a torn final line"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        valid_end = 0
+        for line in iter(f.readline, b""):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            valid_end = f.tell()
+            if not (retry_errors and record.get("error")):
+                done.add(record["id"])
+        f.truncate(valid_end)
+    return done
+
+
+def infer_local(predictor, decoded):
+    """Run one batched forward pass through the local model"""
+    records = [{"id": item_id, "backend": "local", "error": error} for item_id, _, error in decoded if error]
+    ok = [(item_id, array) for item_id, array, error in decoded if not error]
+    if ok:
+        probs = predictor.predict_arrays(np.stack([array for _, array in ok]))
+        for (item_id, _), row in zip(ok, probs):
+            top_k = predictor.top_k_labels(row)
+            records.append({"id": item_id, "backend": "local", "breed": top_k[0][0],
+                            "confidence": top_k[0][1], "top_k": top_k})
+    return records
+
+
+def infer_gemini(executor, identify_fn, decoded):
+    """Send one batch of images to Gemini concurrently"""
+    def run(entry):
+        item_id, array, error = entry
+        if error:
+            return {"id": item_id, "backend": "gemini", "error": error}
+        try:
+            report, attempts = identify_fn(Image.fromarray(array))
+        except Exception as e:
+            return {"id": item_id, "backend": "gemini", "error": str(e)}
+        return {"id": item_id, "backend": "gemini", **report.summary(),
+                "attempts": attempts, "report": report.to_dict()}
+
+    return list(executor.map(run, decoded))
+
+
+def classify(source, output_path, backend="local", batch_size=32, workers=None,
+             top_k=TOP_K, resume=True, retry_errors=False, model_format=None):
+    """Run the discover -> decode -> infer -> write pipeline and return the number of new records
+
+    The local backend batches decoded arrays itself, so it loads model_format in process:
+    LOCAL_MODEL_FORMAT by default, or keras when that is "server".
+    """
+    done = load_checkpoint(output_path, retry_errors) if resume else set()
+    if not resume and os.path.exists(output_path):
+        os.remove(output_path)
+    workers = workers or os.cpu_count() or 1
+
+    # Spawned workers never inherit TensorFlow or gRPC state from the parent
+    decode_pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    if backend == "local":
+        from predictors import IN_PROCESS_FORMATS, in_process_format, load_local_predictor
+        model_format = model_format or in_process_format()
+        if model_format not in IN_PROCESS_FORMATS:
+            raise ValueError(f"Local classification needs one of {', '.join(IN_PROCESS_FORMATS)}, got {model_format}")
+        predictor = load_local_predictor(model_format, top_k=top_k)
+        size, keep_aspect = IMG_SIZE, False
+    elif backend == "gemini":
+        import gemini_client
+        from batch import get_gemini_rate_limiter
+        from resilience import ResilientCaller
+        gemini_client.configure_genai()
+        limiter = get_gemini_rate_limiter()
+        caller = ResilientCaller()
+        identify_fn = lambda img: caller.call(gemini_client.identify_animal_breed, img, rate_limiter=limiter)
+        request_pool = ThreadPoolExecutor(BATCH_MAX_CONCURRENCY)
+        size, keep_aspect = (UPLOAD_MAX_EDGE, UPLOAD_MAX_EDGE), True
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    pending = discover(source, done)
+    decode_fn = _Decoder(size, keep_aspect)
+    decoded = bounded_map(decode_pool, decode_fn, pending, window=workers * 4)
+
+    written = 0
+    started = time.perf_counter()
+    try:
+        with open(output_path, "a") as out:
+            for batch in batched(decoded, batch_size):
+                if backend == "local":
+                    records = infer_local(predictor, batch)
+                else:
+                    records = infer_gemini(request_pool, identify_fn, batch)
+                for record in records:
+                    out.write(json.dumps(record) + "\n")
+                # Flushing per batch makes the output file double as the resume checkpoint
+                out.flush()
+                os.fsync(out.fileno())
+                written += len(records)
+                rate = written / (time.perf_counter() - started)
+                print(f"\r{written} images classified ({rate:.1f} img/s)", end="", file=sys.stderr)
+    finally:
+        decode_pool.shutdown(cancel_futures=True)
+        if backend == "gemini":
+            request_pool.shutdown()
+        print(file=sys.stderr)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify a directory, glob or tar archive of animal images")
+    parser.add_argument("source", help="image directory, glob pattern or tar archive")
+    parser.add_argument("--output", default="predictions.jsonl", help="JSONL file to append results to")
+    parser.add_argument("--backend", choices=["local", "gemini"], default="local")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None, help="decode processes (default: CPU count)")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--format", choices=["keras", "tflite", "onnx"], default=None,
+                        help="local model format (default: LOCAL_MODEL_FORMAT, or keras when that is 'server')")
+    parser.add_argument("--no-resume", action="store_true", help="start over instead of skipping recorded images")
+    parser.add_argument("--retry-errors", action="store_true", help="reprocess images that previously failed")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    written = classify(args.source, args.output, backend=args.backend, batch_size=args.batch_size,
+                       workers=args.workers, top_k=args.top_k, resume=not args.no_resume,
+                       retry_errors=args.retry_errors, model_format=args.format)
+    print(f"Wrote {written} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,75 @@ ANNOTATIONS_URL = "https://www.robots.ox.ac.uk/~vgg/data/pets/data/annotations.t
 IMG_SIZE = (224, 224)
 BATCH_SIZE = 32
 EPOCHS = 50
+FINE_TUNE_LEARNING_RATE = 1e-5
 NUM_CLASSES = 37  # 37 pet breeds in Oxford-IIIT dataset
 
+# Prediction backend: "gemini", "local" or "hybrid" (local first, Gemini only when confidence is low)
+PREDICTOR_BACKEND = os.getenv("PREDICTOR_BACKEND", "gemini")
+TOP_K = 3
+LOCAL_MODEL_FORMAT = os.getenv("LOCAL_MODEL_FORMAT", "keras")  # "keras", "tflite", "onnx" or "server"
+LOCAL_TTA = os.getenv("LOCAL_TTA", "0") == "1"  # average full-frame and center-crop views, each also mirrored
+TTA_CROP = 0.875  # the center crop covers this fraction of each side
+# Extra Keras models averaged with the local model, as "path=preprocessing,..." (resnet50 or mobilenet_v2)
+ENSEMBLE_MODELS = os.getenv("ENSEMBLE_MODELS", "")
+# Relative costs the calibrated confidence gate trades off (python calibrate.py)
+ESCALATION_COST = float(os.getenv("ESCALATION_COST", 1.0))  # one Gemini call
+ERROR_COST = float(os.getenv("ERROR_COST", 10.0))  # one wrong local answer
+
+# Micro-batching inference server (python -m inference_server)
+INFERENCE_SERVER_HOST = os.getenv("INFERENCE_SERVER_HOST", "127.0.0.1")
+INFERENCE_SERVER_PORT = int(os.getenv("INFERENCE_SERVER_PORT", 8502))
+INFERENCE_SERVER_URL = os.getenv("INFERENCE_SERVER_URL", f"http://{INFERENCE_SERVER_HOST}:{INFERENCE_SERVER_PORT}")
+SERVER_MAX_BATCH_SIZE = int(os.getenv("SERVER_MAX_BATCH_SIZE", 32))
+SERVER_MAX_WAIT_MS = float(os.getenv("SERVER_MAX_WAIT_MS", 5))
+SERVER_MAX_QUEUE_DEPTH = int(os.getenv("SERVER_MAX_QUEUE_DEPTH", 256))
+SERVER_REQUEST_TIMEOUT = 30  # seconds
+LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_CONFIDENCE_THRESHOLD", 0.6))
+
+# Gemini client configuration
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-flash")
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT", "grpc")  # "grpc" or "rest"
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT") or None  # override the API host, e.g. a proxy
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", 30))  # seconds per request, capped at GEMINI_CALL_DEADLINE
+# SDK-level retries only apply to opening a stream; other calls are retried by resilience.ResilientCaller
+GEMINI_RETRY_INITIAL = 1.0  # seconds before the first retry of a transient error
+GEMINI_RETRY_MAXIMUM = 10.0  # cap on the delay between retries
+GEMINI_RETRY_DEADLINE = float(os.getenv("GEMINI_RETRY_DEADLINE", 30))  # 0 disables SDK retries
+
+# Stream Gemini responses into the UI as they are generated (single-image Gemini backend only).
+# Off by default: streamed output is markdown, which skips the JSON response_schema validation
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "0") == "1"
+
+# Images are downscaled and re-encoded before upload to Gemini
+UPLOAD_MAX_EDGE = int(os.getenv("UPLOAD_MAX_EDGE", 1024))
+UPLOAD_FORMAT = os.getenv("UPLOAD_FORMAT", "JPEG")  # "JPEG" or "WEBP"
+UPLOAD_QUALITY = int(os.getenv("UPLOAD_QUALITY", 85))
+REQUEST_LOG_SIZE = 1000
+
+# Batch mode configuration
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 4))
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 15))
+RETRY_MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY = 1.0  # seconds, doubled on every retry
+RETRY_MAX_DELAY = 30.0
+
+# Resilient Gemini calls: overall deadline, hedged requests and circuit breaker
+GEMINI_CALL_DEADLINE = float(os.getenv("GEMINI_CALL_DEADLINE", 45))  # seconds per call, retries included
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "0") == "1"  # send a duplicate request past the p95 latency
+HEDGE_QUANTILE = 95
+HEDGE_MIN_SAMPLES = 20  # latency samples needed before hedging starts
+BREAKER_FAILURE_RATE = 0.5  # trip when half of the recent calls failed
+BREAKER_WINDOW = 20  # recent calls considered
+BREAKER_MIN_CALLS = 5
+BREAKER_COOLDOWN = 30.0  # seconds before a probe call is let through
+GEMINI_FALLBACK_TO_LOCAL = os.getenv("GEMINI_FALLBACK_TO_LOCAL", "1") == "1"
+
+# Observability: Prometheus endpoint (needs prometheus_client), log format and per-request profiling
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))  # 0 disables the /metrics endpoint
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "")  # "", "cprofile" or "pyinstrument"
+
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -19,10 +86,63 @@ ANNOTATIONS_DIR = os.path.join(DATA_DIR, "annotations")
 MODEL_DIR = os.path.join(BASE_DIR, "models")
 MODEL_PATH = os.path.join(MODEL_DIR, "animal_classifier.h5")
 CLASS_NAMES_PATH = os.path.join(MODEL_DIR, "class_names.pkl")
+TFLITE_MODEL_PATH = os.path.join(MODEL_DIR, "animal_classifier_int8.tflite")
+ONNX_MODEL_PATH = os.path.join(MODEL_DIR, "animal_classifier.onnx")
+CALIBRATION_PATH = os.path.join(MODEL_DIR, "calibration.json")
 BREED_INFO_PATH = os.path.join(DATA_DIR, "breed_info.json")
+BREED_INDEX_PATH = os.path.join(DATA_DIR, "breed_index.pkl")
+TF_CACHE_DIR = os.path.join(DATA_DIR, "tf_cache")
+FEATURES_DIR = os.path.join(DATA_DIR, "features")
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "results.sqlite3")
+SIMILARITY_INDEX_DIR = os.path.join(CACHE_DIR, "similarity")
+PROFILE_DIR = os.path.join(BASE_DIR, "profiles")
+HISTORY_DIR = os.path.join(BASE_DIR, "history")
+HISTORY_DB_PATH = os.path.join(HISTORY_DIR, "history.sqlite3")
+SAMPLES_DIR = os.path.join(BASE_DIR, "samples")
+SAMPLES_MANIFEST_PATH = os.path.join(SAMPLES_DIR, "manifest.json")
+
+# Breed knowledge store configuration
+BREED_MATCH_CUTOFF = 0.85  # difflib similarity needed to accept a fuzzy breed match
+BREED_RELOAD_INTERVAL = 2.0  # seconds between mtime checks of breed_info.json
+
+# Near-duplicate detection and similar-image search (needs TensorFlow for embeddings)
+ENABLE_SIMILARITY_INDEX = os.getenv("ENABLE_SIMILARITY_INDEX", "0") == "1"
+DUPLICATE_SIMILARITY_THRESHOLD = float(os.getenv("DUPLICATE_SIMILARITY_THRESHOLD", 0.95))  # cosine similarity
+SIMILAR_RESULTS = 6
+SIMILARITY_SAVE_EVERY = 50  # inserts between saves of the HNSW graph
+SIMILARITY_THUMBNAIL_SIZE = (160, 160)
+
+# Training runtime (train_model.py); command-line flags override these
+TRAIN_INTRA_OP_THREADS = int(os.getenv("TRAIN_INTRA_OP_THREADS", 0))  # 0 lets TensorFlow use every core
+TRAIN_INTER_OP_THREADS = int(os.getenv("TRAIN_INTER_OP_THREADS", 0))
+TRAIN_MIXED_PRECISION = os.getenv("TRAIN_MIXED_PRECISION", "0") == "1"  # bfloat16 on CPUs with AVX512-BF16/AMX
+TRAIN_STRATEGY = os.getenv("TRAIN_STRATEGY", "default")  # "default" or "multi_worker" (cluster from TF_CONFIG)
+CHECKPOINT_DIR = os.path.join(MODEL_DIR, "checkpoints")
+CHECKPOINT_MAX_TO_KEEP = 3
+
+# Landing page sample gallery (python samples.py builds it)
+SAMPLE_THUMBNAIL_SIZE = (320, 320)
+SAMPLE_IMAGE_MAX_EDGE = UPLOAD_MAX_EDGE  # samples are stored at the size Gemini would receive anyway
+
+# App startup: load models in a background thread while the landing page renders
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "1") == "1"
+
+# Prediction history (original images, thumbnails and results of every analysis)
+ENABLE_HISTORY = os.getenv("ENABLE_HISTORY", "1") == "1"
+HISTORY_THUMBNAIL_SIZE = (128, 128)
+HISTORY_PAGE_SIZE = 8
+
+# Result cache configuration
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 7 * 24 * 3600))
+CACHE_MAX_MEMORY_ENTRIES = 256
+CACHE_MAX_DISK_ENTRIES = 10000
 
 # Create directories if they don't exist
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(IMAGES_DIR, exist_ok=True)
 os.makedirs(ANNOTATIONS_DIR, exist_ok=True)
-os.makedirs(MODEL_DIR, exist_ok=True)
\ No newline at end of file
+os.makedirs(MODEL_DIR, exist_ok=True)
+os.makedirs(TF_CACHE_DIR, exist_ok=True)
+os.makedirs(FEATURES_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
\ No newline at end of file
@@ -0,0 +1,118 @@
+# Export the trained classifier for fast CPU inference (TFLite int8 and, optionally, ONNX)
+import tensorflow as tf
+import numpy as np
+import argparse
+import os
+import sys
+import time
+
+# Add the parent directory to the path so we can import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import *
+from predictors import OnnxPredictor, TFLitePredictor
+from utils import preprocess_arrays
+from train_model import decode_image, list_image_files
+
+REPRESENTATIVE_SAMPLES = 200
+EVALUATION_SAMPLES = 500
+
+def load_images(paths, labels, limit):
+    """Decode up to `limit` images into a uint8 NHWC array for calibration and evaluation"""
+    dataset = tf.data.Dataset.from_tensor_slices((paths[:limit], labels[:limit]))
+    dataset = dataset.map(decode_image, num_parallel_calls=tf.data.AUTOTUNE)
+    images = np.stack([image.numpy() for image, _ in dataset])
+    return images, np.asarray(labels[:limit])
+
+def export_tflite(model, calibration_images, output_path=TFLITE_MODEL_PATH, quantize=True):
+    """Convert to TFLite with full-integer post-training quantization calibrated on real images"""
+    print("Converting to TFLite" + (" with int8 quantization..." if quantize else "..."))
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize:
+        def representative_dataset():
+            for image in calibration_images:
+                yield [preprocess_arrays(image[np.newaxis])]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        # Integer kernels throughout; input and output stay float32 so callers need no changes
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    print(f"TFLite model saved to: {output_path}")
+    return output_path
+
+def export_onnx(model, output_path=ONNX_MODEL_PATH):
+    """Convert to ONNX with tf2onnx, if it is installed"""
+    try:
+        import tf2onnx
+    except ImportError:
+        print("tf2onnx is not installed, skipping ONNX export (pip install tf2onnx onnxruntime)")
+        return None
+    print("Converting to ONNX...")
+    signature = [tf.TensorSpec((None, IMG_SIZE[0], IMG_SIZE[1], 3), tf.float32, name="input")]
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=13, output_path=output_path)
+    print(f"ONNX model saved to: {output_path}")
+    return output_path
+
+def evaluate(name, run_model, path, images, labels):
+    """Accuracy and single-image latency of one model format on the validation sample"""
+    correct = 0
+    latencies = []
+    for image, label in zip(images, labels):
+        batch = preprocess_arrays(image[np.newaxis])
+        started = time.perf_counter()
+        probs = run_model(batch)
+        latencies.append((time.perf_counter() - started) * 1000)
+        correct += int(np.argmax(probs[0]) == label)
+    # The first calls include one-off graph and allocation work
+    latencies = latencies[min(5, len(latencies) - 1):]
+    return {
+        "format": name,
+        "size_mb": os.path.getsize(path) / 1e6,
+        "accuracy": correct / len(labels),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+def report(results):
+    """Print size, accuracy delta and latency of each export next to the original model"""
+    baseline = results[0]
+    print(f"\n{'format':<8} {'size MB':>9} {'accuracy':>9} {'delta':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for result in results:
+        delta = result["accuracy"] - baseline["accuracy"]
+        print(f"{result['format']:<8} {result['size_mb']:>9.1f} {result['accuracy']:>9.2%} "
+              f"{delta:>+8.2%} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the breed classifier for CPU inference")
+    parser.add_argument("--model", default=MODEL_PATH, help="Keras .h5 model to export")
+    parser.add_argument("--onnx", action="store_true", help="also export to ONNX")
+    parser.add_argument("--no-quantize", action="store_true", help="export a float32 TFLite model")
+    parser.add_argument("--eval-samples", type=int, default=EVALUATION_SAMPLES)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print("Please train the model first by running: python train_model.py")
+        return
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    (train_paths, train_labels), (val_paths, val_labels), _ = list_image_files()
+    calibration_images, _ = load_images(train_paths, train_labels, REPRESENTATIVE_SAMPLES)
+    eval_images, eval_labels = load_images(val_paths, val_labels, args.eval_samples)
+
+    tflite_path = export_tflite(model, calibration_images, quantize=not args.no_quantize)
+    onnx_path = export_onnx(model) if args.onnx else None
+
+    print(f"\nEvaluating on {len(eval_labels)} validation images...")
+    results = [evaluate("keras", lambda batch: model(batch, training=False).numpy(),
+                        args.model, eval_images, eval_labels)]
+    results.append(evaluate("tflite", TFLitePredictor(tflite_path).run_model,
+                            tflite_path, eval_images, eval_labels))
+    if onnx_path:
+        results.append(evaluate("onnx", OnnxPredictor(onnx_path).run_model,
+                                onnx_path, eval_images, eval_labels))
+    report(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from config import (
+    GEMINI_API_ENDPOINT,
+    GEMINI_CALL_DEADLINE,
+    GEMINI_MODEL_NAME,
+    GEMINI_RETRY_DEADLINE,
+    GEMINI_RETRY_INITIAL,
+    GEMINI_RETRY_MAXIMUM,
+    GEMINI_TIMEOUT,
+    GEMINI_TRANSPORT,
+    REQUEST_LOG_SIZE,
+)
+from imaging import prepare_for_upload
+from metrics import UPLOAD_BYTES, lazy_import, log_event
+from report import REPORT_SCHEMA, parse_report
+
+# Payload size, encode time and latency of recent image requests
+request_log = deque(maxlen=REQUEST_LOG_SIZE)
+_request_log_lock = threading.Lock()
+
+# Process-wide GenerativeModel instances keyed by (model name, generation config)
+_models = {}
+_models_lock = threading.Lock()
+_configured_key = None
+
+IDENTIFY_PROMPT = """
+    Analyze this image and identify the animal and its specific breed.
+    Respond with a JSON object that follows the response schema:
+
+    - is_animal: false if the image doesn't contain a recognizable animal
+    - animal: the animal type, e.g. "Dog"
+    - breed: the specific breed if identifiable, otherwise an empty string
+    - physical_characteristics: at least three short items
+    - temperament: at least two short items
+    - care_requirements: at least two short items
+    - safety: danger_level (Low/Medium/High), potential_risks and safety_precautions
+    - additional_information: any other relevant information about this animal breed
+    - facts: interesting facts covering natural habitat, diet, social behavior,
+      unique adaptations and conservation status (if applicable)
+    """
+
+# Streaming keeps the markdown layout so partial output is readable as it arrives
+STREAM_IDENTIFY_PROMPT = """
+    Analyze this image and identify the animal and its specific breed.
+    Provide a detailed response in the following format:
+
+    **Animal:** [Animal type]
+    **Breed:** [Specific breed if identifiable]
+
+    **Physical Characteristics:**
+    - [Characteristic 1]
+    - [Characteristic 2]
+    - [Characteristic 3]
+
+    **Temperament:**
+    - [Temperament trait 1]
+    - [Temperament trait 2]
+
+    **Care Requirements:**
+    - [Care requirement 1]
+    - [Care requirement 2]
+
+    **Safety Assessment:**
+    - Danger level: [Low/Medium/High]
+
+    **Potential Risks:**
+    - [Risk 1]
+    - [Risk 2]
+
+    **Safety Precautions:**
+    - [Precaution 1]
+    - [Precaution 2]
+
+    **Additional Information:**
+    [Any other relevant information about this animal breed]
+
+    **Interesting Facts:**
+    - [Natural habitat]
+    - [Diet]
+    - [Social behavior]
+    - [Unique adaptations]
+    - [Conservation status (if applicable)]
+
+    If the image doesn't contain a recognizable animal, please state that clearly.
+    """
+
+# Ask for JSON constrained to the report schema instead of free-form markdown
+IDENTIFY_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": REPORT_SCHEMA,
+}
+
+FACTS_PROMPT = """
+    Provide interesting facts about {animal_type} in a bullet point format.
+    Include information about their:
+    - Natural habitat
+    - Diet
+    - Social behavior
+    - Unique adaptations
+    - Conservation status (if applicable)
+    """
+
+
+# Initialize Gemini API
+def configure_genai(api_key=None, api_endpoint=GEMINI_API_ENDPOINT, transport=GEMINI_TRANSPORT):
+    """Configure the Gemini SDK, raising RuntimeError when no API key is set
+
+    api_endpoint points the SDK at another host, e.g. a proxy or the benchmark stub server.
+    """
+    global _configured_key
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("Please set GEMINI_API_KEY in your .env file")
+    settings = (api_key, api_endpoint, transport)
+    with _models_lock:
+        # Reconfiguring drops the SDK's cached clients and their open channels, so only do it on change
+        if settings == _configured_key:
+            return
+        client_options = {"api_endpoint": api_endpoint} if api_endpoint else None
+        # The SDK takes most of a second to import, so it is only loaded once a client is needed
+        genai = lazy_import("google.generativeai")
+        genai.configure(api_key=api_key, transport=transport, client_options=client_options)
+        _models.clear()
+        _configured_key = settings
+
+
+def get_model(model_name=GEMINI_MODEL_NAME, generation_config=None):
+    """Return the shared GenerativeModel for this model name and generation config
+
+    All instances use the SDK's default client, so requests reuse one keep-alive channel.
+    The SDK is configured from the environment on first use if configure_genai was not called.
+    """
+    if _configured_key is None:
+        configure_genai()
+    key = (model_name, json.dumps(generation_config, sort_keys=True) if generation_config else None)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = lazy_import("google.generativeai").GenerativeModel(model_name, generation_config=generation_config)
+            _models[key] = model
+        return model
+
+
+def request_options(retry=False):
+    """Per-request timeout and, with retry, the SDK retry policy from config
+
+    Calls made through resilience.ResilientCaller must not retry inside the SDK: those retries
+    would bypass the rate limiter and metrics and keep running after the call deadline.
+    """
+    options = {"timeout": min(GEMINI_TIMEOUT, GEMINI_CALL_DEADLINE)}
+    if retry and GEMINI_RETRY_DEADLINE > 0:
+        api_retry = lazy_import("google.api_core.retry")
+        options["retry"] = api_retry.Retry(
+            predicate=api_retry.if_transient_error,
+            initial=GEMINI_RETRY_INITIAL,
+            maximum=GEMINI_RETRY_MAXIMUM,
+            timeout=min(GEMINI_RETRY_DEADLINE, GEMINI_CALL_DEADLINE),
+        )
+    return options
+
+
+# Function to get Gemini response
+def get_gemini_response(image, prompt, generation_config=None):
+    blob, stats = prepare_for_upload(image)
+    model = get_model(generation_config=generation_config)
+    started = time.perf_counter()
+    response = model.generate_content([blob, prompt], request_options=request_options())
+    stats["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    record_request(stats)
+    return response.text
+
+
+def stream_gemini_response(image, prompt):
+    """Yield response text chunks as they arrive, recording time-to-first-token separately"""
+    blob, stats = prepare_for_upload(image)
+    model = get_model()
+    started = time.perf_counter()
+    # Streams are only guarded by the circuit breaker, so opening one may retry in the SDK
+    response = model.generate_content([blob, prompt], stream=True, request_options=request_options(retry=True))
+    for chunk in response:
+        if "ttft_ms" not in stats:
+            stats["ttft_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        yield chunk.text
+    stats["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    record_request(stats)
+
+
+def record_request(stats):
+    """Keep per-request upload stats for the summary and log them"""
+    with _request_log_lock:
+        request_log.append(stats)
+    UPLOAD_BYTES.inc(stats["payload_bytes"])
+    log_event("gemini_request", **stats)
+
+
+def request_summary():
+    """Summarize recent image requests: count, mean payload, mean encode time and latency percentiles"""
+    with _request_log_lock:
+        entries = list(request_log)
+    if not entries:
+        return None
+    latencies = [entry["latency_ms"] for entry in entries]
+    summary = {
+        "requests": len(entries),
+        "mean_payload_kb": round(float(np.mean([entry["payload_bytes"] for entry in entries])) / 1024, 1),
+        "mean_encode_ms": round(float(np.mean([entry["encode_ms"] for entry in entries])), 1),
+        "p50_latency_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p95_latency_ms": round(float(np.percentile(latencies, 95)), 1),
+    }
+    ttfts = [entry["ttft_ms"] for entry in entries if "ttft_ms" in entry]
+    if ttfts:
+        summary["p50_ttft_ms"] = round(float(np.percentile(ttfts, 50)), 1)
+        summary["p95_ttft_ms"] = round(float(np.percentile(ttfts, 95)), 1)
+    return summary
+
+
+# Function to identify animal breed
+def identify_animal_breed(image):
+    """Identify the animal and return an AnimalReport, facts included, from one request"""
+    text = get_gemini_response(image, IDENTIFY_PROMPT, IDENTIFY_GENERATION_CONFIG)
+    return parse_report(text)
+
+
+# Stream the breed analysis as markdown text chunks
+def stream_identify_animal_breed(image):
+    return stream_gemini_response(image, STREAM_IDENTIFY_PROMPT)
+
+
+# Function to get animal facts, for reports that arrive without them
+def get_animal_facts(animal_type):
+    prompt = FACTS_PROMPT.format(animal_type=animal_type)
+    response = get_model().generate_content(prompt, request_options=request_options())
+    return response.text
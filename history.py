@@ -0,0 +1,190 @@
+"""
+Prediction history: every analyzed image with its result, for instant recall and offline evaluation
+
+Original bytes and thumbnails go into a content-addressed blob directory (blobs/ab/<sha256>), so an
+image analyzed twice is stored once. Parsed results live in an SQLite table keyed by the SHA-256 of
+the original bytes, indexed by time and by animal/breed. Listing pages only reads the summary
+columns; the full report and the image are loaded when an entry is opened.
+"""
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+
+from PIL import Image, ImageOps
+
+from config import HISTORY_DB_PATH, HISTORY_DIR, HISTORY_THUMBNAIL_SIZE
+
+SUMMARY_FIELDS = ["image_hash", "name", "created_at", "animal", "breed", "danger_level", "backend",
+                  "confidence", "latency_ms"]
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_thumbnail(data, size=HISTORY_THUMBNAIL_SIZE, quality=80):
+    """JPEG thumbnail of encoded image bytes, with the EXIF orientation applied"""
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data))).convert("RGB")
+    image.thumbnail(size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class BlobStore:
+    """Write-once files named by the SHA-256 of their content"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, digest):
+        # Two-character fan-out keeps directories small
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data):
+        """Store data unless an identical blob exists; returns its digest"""
+        digest = content_hash(data)
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest):
+        with open(self.path(digest), 'rb') as f:
+            return f.read()
+
+
+class HistoryStore:
+    """Analyzed images and their results, one row per distinct image"""
+
+    def __init__(self, history_dir=HISTORY_DIR, db_path=HISTORY_DB_PATH):
+        self.blobs = BlobStore(os.path.join(history_dir, "blobs"))
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # Shared by every Streamlit session thread under a lock, like the result cache
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " image_hash TEXT PRIMARY KEY,"
+            " thumbnail_hash TEXT NOT NULL,"
+            " name TEXT,"
+            " created_at REAL NOT NULL,"
+            " animal TEXT,"
+            " breed TEXT,"
+            " danger_level TEXT,"
+            " backend TEXT,"
+            " confidence REAL,"
+            " latency_ms REAL,"
+            " report TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_created ON history (created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_breed ON history (animal, breed)")
+        self._conn.commit()
+
+    def record(self, data, report, backend, latency_ms=None, confidence=None, name=None, replace=True):
+        """Store an analyzed image and its AnimalReport (or report dict); returns the image hash
+
+        Analyzing the same bytes again replaces the result and moves the entry to the top. With
+        replace=False an existing entry is kept as it is, e.g. when a rerun shows the same upload again.
+        """
+        image_hash = content_hash(data)
+        if not replace and self.contains(image_hash):
+            return image_hash
+        report = report if isinstance(report, dict) else report.to_dict()
+        self.blobs.put(data)
+        thumbnail_hash = self.blobs.put(make_thumbnail(data))
+        safety = report.get("safety") or {}
+        conflict = "REPLACE" if replace else "IGNORE"
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR {conflict} INTO history (image_hash, thumbnail_hash, name, created_at, animal, breed,"
+                " danger_level, backend, confidence, latency_ms, report) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (image_hash, thumbnail_hash, name, time.time(), report.get("animal", ""), report.get("breed", ""),
+                 safety.get("danger_level", ""), backend, confidence, latency_ms, json.dumps(report)),
+            )
+            self._conn.commit()
+        return image_hash
+
+    def contains(self, image_hash):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM history WHERE image_hash = ?", (image_hash,)).fetchone()
+        return row is not None
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def page(self, offset=0, limit=10):
+        """Newest-first summary rows, without the report, plus each row's thumbnail_hash"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(SUMMARY_FIELDS)}, thumbnail_hash FROM history"
+                " ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, image_hash):
+        """The full entry with its parsed report dict, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM history WHERE image_hash = ?", (image_hash,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["report"] = json.loads(entry["report"])
+        return entry
+
+    def image(self, image_hash):
+        return self.blobs.get(image_hash)
+
+    def thumbnail(self, thumbnail_hash):
+        return self.blobs.get(thumbnail_hash)
+
+    def iter_entries(self, batch_size=500):
+        """Yield every full entry, oldest first, reading batch_size rows at a time"""
+        # Replacing a row gives it a new rowid, so rowid order is also recency order
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, * FROM history WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                entry = dict(row)
+                del entry["rowid"]
+                entry["report"] = json.loads(entry["report"])
+                yield entry
+            last = rows[-1]["rowid"]
+
+    def export_jsonl(self):
+        """Every entry as JSON Lines"""
+        return "".join(json.dumps(entry) + "\n" for entry in self.iter_entries())
+
+    def export_zip(self):
+        """A zip of every original image plus results.jsonl, e.g. as training data for the local model"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            lines = []
+            for entry in self.iter_entries():
+                data = self.image(entry["image_hash"])
+                extension = (Image.open(io.BytesIO(data)).format or "bin").lower()
+                filename = f"images/{entry['image_hash']}.{extension}"
+                # Images are already compressed, so storing them is as small as deflating and faster
+                archive.writestr(zipfile.ZipInfo(filename), data)
+                lines.append(json.dumps({"file": filename, **entry}) + "\n")
+            archive.writestr("results.jsonl", "".join(lines), compress_type=zipfile.ZIP_DEFLATED)
+        return buffer.getvalue()
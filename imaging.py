@@ -0,0 +1,33 @@
+import io
+import time
+
+from PIL import Image, ImageOps
+
+from config import UPLOAD_FORMAT, UPLOAD_MAX_EDGE, UPLOAD_QUALITY
+
+
+def prepare_for_upload(img, max_edge=UPLOAD_MAX_EDGE, fmt=UPLOAD_FORMAT, quality=UPLOAD_QUALITY):
+    """Orient, downscale and re-encode an image before sending it to Gemini
+
+    Returns a (blob, stats) tuple where blob is an inline-data part for generate_content.
+    EXIF and other metadata are dropped because nothing is passed through to save().
+    """
+    started = time.perf_counter()
+    original_size = img.size
+    # exif_transpose always returns a copy, so the caller's image is never modified
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, quality=quality)
+    data = buffer.getvalue()
+
+    stats = {
+        "original_size": original_size,
+        "upload_size": img.size,
+        "payload_bytes": len(data),
+        "encode_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    return {"mime_type": f"image/{fmt.lower()}", "data": data}, stats
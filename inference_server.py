@@ -0,0 +1,207 @@
+"""
+Local inference service that coalesces concurrent requests into batched model calls
+
+    python -m inference_server --port 8502 --max-batch-size 32 --max-wait-ms 5
+
+POST /predict with raw image bytes (JPEG/PNG) as the body returns
+    {"breed": ..., "confidence": ..., "top_k": [[breed, probability], ...]}
+GET /healthz returns queue depth and batching statistics.
+
+Requests are decoded in their own handler threads, then queued. A single worker thread takes up to
+max_batch_size queued images, waiting at most max_wait_ms for the batch to fill, runs one forward
+pass and hands each caller its row. When the queue is full the server answers 503 with Retry-After
+instead of letting latency grow without bound.
+"""
+
+import argparse
+import io
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image
+
+from config import (
+    IMG_SIZE,
+    INFERENCE_SERVER_HOST,
+    INFERENCE_SERVER_PORT,
+    SERVER_MAX_BATCH_SIZE,
+    SERVER_MAX_QUEUE_DEPTH,
+    SERVER_MAX_WAIT_MS,
+    SERVER_REQUEST_TIMEOUT,
+)
+
+
+class QueueFullError(Exception):
+    """Raised when the request queue is at max depth"""
+
+
+class MicroBatcher:
+    """Collect individually submitted items into batches for one run_batch call"""
+
+    def __init__(self, run_batch, max_batch_size=SERVER_MAX_BATCH_SIZE,
+                 max_wait_ms=SERVER_MAX_WAIT_MS, max_queue_depth=SERVER_MAX_QUEUE_DEPTH):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue(maxsize=max_queue_depth)
+        self.stats = {"batches": 0, "items": 0, "rejected": 0, "max_batch": 0}
+        # rejected is counted on handler threads, the rest on the worker thread
+        self._stats_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """Queue one item and return a Future for its result"""
+        future = Future()
+        try:
+            self.queue.put_nowait((item, future))
+        except queue.Full:
+            with self._stats_lock:
+                self.stats["rejected"] += 1
+            raise QueueFullError("inference queue is full")
+        return future
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Drain whatever is already queued even after the deadline has passed
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.run_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._stats_lock:
+                self.stats["batches"] += 1
+                self.stats["items"] += len(batch)
+                self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def snapshot(self):
+        """A consistent copy of the batching statistics plus the current queue depth"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["queue_depth"] = self.queue.qsize()
+        stats["mean_batch"] = stats["items"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+
+class InferenceHTTPServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 resets connections long before the batch queue is full
+    request_queue_size = SERVER_MAX_QUEUE_DEPTH
+    daemon_threads = True
+
+
+def decode_request_image(data):
+    """Decode request bytes into a uint8 RGB array resized to IMG_SIZE"""
+    img = Image.open(io.BytesIO(data))
+    img.draft("RGB", IMG_SIZE)
+    return np.asarray(img.convert("RGB").resize(IMG_SIZE), dtype=np.uint8)
+
+
+def make_handler(batcher, predictor):
+    class InferenceHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/healthz":
+                self._send_json(404, {"error": "not found"})
+                return
+            self._send_json(200, batcher.snapshot())
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": "not found"})
+                return
+            data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                array = decode_request_image(data)
+            except Exception as e:
+                self._send_json(400, {"error": f"could not decode image: {e}"})
+                return
+            try:
+                probs = batcher.submit(array).result(timeout=SERVER_REQUEST_TIMEOUT)
+            except QueueFullError as e:
+                self._send_json(503, {"error": str(e)}, {"Retry-After": "1"})
+                return
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            top_k = predictor.top_k_labels(probs)
+            self._send_json(200, {"breed": top_k[0][0], "confidence": top_k[0][1], "top_k": top_k})
+
+        def log_message(self, format, *args):
+            # Per-request access logs would dominate output under load
+            pass
+
+    return InferenceHandler
+
+
+def serve(host=INFERENCE_SERVER_HOST, port=INFERENCE_SERVER_PORT, max_batch_size=SERVER_MAX_BATCH_SIZE,
+          max_wait_ms=SERVER_MAX_WAIT_MS, max_queue_depth=SERVER_MAX_QUEUE_DEPTH, model_format=None):
+    """Load the local model and serve it until interrupted
+
+    model_format defaults to LOCAL_MODEL_FORMAT, except that "server" (the app's setting for
+    using this server) loads the Keras model; the server must not forward to itself.
+    """
+    from predictors import IN_PROCESS_FORMATS, in_process_format, load_local_predictor
+
+    model_format = model_format or in_process_format()
+    if model_format not in IN_PROCESS_FORMATS:
+        raise ValueError(f"The inference server needs one of {', '.join(IN_PROCESS_FORMATS)}, got {model_format}")
+    predictor = load_local_predictor(model_format)
+    batcher = MicroBatcher(lambda arrays: predictor.predict_arrays(np.stack(arrays)),
+                           max_batch_size, max_wait_ms, max_queue_depth)
+    server = InferenceHTTPServer((host, port), make_handler(batcher, predictor))
+    print(f"Serving {type(predictor).__name__} on http://{host}:{port} "
+          f"(max batch {max_batch_size}, max wait {max_wait_ms} ms, queue depth {max_queue_depth})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-batching inference server for the breed classifier")
+    parser.add_argument("--host", default=INFERENCE_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=INFERENCE_SERVER_PORT)
+    parser.add_argument("--max-batch-size", type=int, default=SERVER_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=SERVER_MAX_WAIT_MS)
+    parser.add_argument("--max-queue-depth", type=int, default=SERVER_MAX_QUEUE_DEPTH)
+    parser.add_argument("--format", choices=["keras", "tflite", "onnx"], default=None,
+                        help="model to serve (default: LOCAL_MODEL_FORMAT, or keras when that is 'server')")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.max_batch_size, args.max_wait_ms, args.max_queue_depth, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Timing spans, Prometheus metrics, structured logs and per-request profiling
+
+    with span("identify", backend="gemini"):
+        ...
+
+Each span observes the animal_span_seconds histogram, counts errors and logs one DEBUG line (JSON
+when LOG_FORMAT=json). Metrics are served on METRICS_PORT when prometheus_client is installed and
+silently dropped otherwise. PROFILE_MODE=cprofile|pyinstrument writes one profile per request to
+PROFILE_DIR: .prof files for snakeviz/flameprof, speedscope .json for pyinstrument.
+"""
+
+import cProfile
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from config import LOG_FORMAT, LOG_LEVEL, METRICS_PORT, PROFILE_DIR, PROFILE_MODE
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+logger = logging.getLogger("animal.metrics")
+
+# Span durations run from sub-millisecond preprocessing to multi-second Gemini calls
+SPAN_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _NoopMetric:
+    """Stands in for a Prometheus metric when prometheus_client is not installed"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+def _metric(kind, name, documentation, labels=(), **kwargs):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return getattr(prometheus_client, kind)(name, documentation, labels, **kwargs)
+
+
+SPAN_SECONDS = _metric("Histogram", "animal_span_seconds", "Duration of instrumented stages", ["span"],
+                       buckets=SPAN_BUCKETS)
+SPAN_ERRORS = _metric("Counter", "animal_span_errors_total", "Instrumented stages that raised", ["span"])
+REQUESTS = _metric("Counter", "animal_requests_total", "Identification requests by backend and status",
+                   ["backend", "status"])
+CACHE_LOOKUPS = _metric("Counter", "animal_cache_lookups_total", "Result cache lookups by tier",
+                        ["namespace", "result"])
+UPLOAD_BYTES = _metric("Counter", "animal_upload_bytes_total", "Image bytes sent to Gemini")
+GEMINI_EVENTS = _metric("Counter", "animal_gemini_events_total",
+                        "Resilience events: calls, failures, retries, hedged, timeouts, rejected", ["event"])
+BREAKER_OPEN = _metric("Gauge", "animal_gemini_breaker_open", "1 while the Gemini circuit breaker is open")
+LOCAL_GATE = _metric("Counter", "animal_local_gate_total",
+                     "Hybrid backend decisions: answered locally, escalated, or escalation failed", ["decision"])
+IMPORT_SECONDS = _metric("Gauge", "animal_import_seconds", "Time taken by the first import of heavy modules",
+                         ["module"])
+
+_profile_lock = threading.Lock()
+_server_lock = threading.Lock()
+_server_started = False
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve /metrics on port once per process; returns False if disabled or unavailable"""
+    global _server_started
+    if prometheus_client is None or not port:
+        return False
+    with _server_lock:
+        if not _server_started:
+            try:
+                prometheus_client.start_http_server(port)
+            except OSError as e:
+                # Another process (e.g. a second app instance) already owns the port
+                logger.warning("metrics endpoint not started on port %s: %s", port, e)
+                return False
+            _server_started = True
+    return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any structured fields from log_event merged in"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(log_format=LOG_FORMAT, level=LOG_LEVEL):
+    """Install a root handler with JSON or plain-text formatting, once per process"""
+    root = logging.getLogger()
+    if any(getattr(handler, "_animal_handler", False) for handler in root.handlers):
+        return
+    handler = logging.StreamHandler()
+    handler._animal_handler = True
+    handler.setFormatter(JsonFormatter() if log_format == "json" else
+                         logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """Log a structured event; fields become JSON keys with LOG_FORMAT=json"""
+    if not logger.isEnabledFor(level):
+        return
+    text = " ".join(f"{key}={value}" for key, value in fields.items())
+    logger.log(level, "%s %s", event, text, extra={"fields": {"event": event, **fields}})
+
+
+def lazy_import(name):
+    """Import a module on first use and record how long the import took
+
+    Heavy dependencies (TensorFlow, the Gemini SDK) go through here so they only load on the code
+    paths that need them and their cost shows up in animal_import_seconds.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    record_import_time(name, time.perf_counter() - started)
+    return module
+
+
+def record_import_time(name, seconds):
+    IMPORT_SECONDS.labels(name).set(seconds)
+    log_event("import", module=name, ms=round(seconds * 1000, 1))
+
+
+@contextmanager
+def span(name, **fields):
+    """Time a block, record it in the span histogram and log it"""
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        SPAN_ERRORS.labels(name).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        SPAN_SECONDS.labels(name).observe(elapsed)
+        # Spans fire per image in batch runs, so they are only logged at LOG_LEVEL=DEBUG
+        log_event("span", logging.DEBUG, span=name, ms=round(elapsed * 1000, 2), status=status, **fields)
+
+
+def record_cache_lookup(namespace, result):
+    """Count a result cache lookup; result is memory_hit, disk_hit or miss"""
+    CACHE_LOOKUPS.labels(namespace, result).inc()
+
+
+@contextmanager
+def profile_request(name, mode=PROFILE_MODE, output_dir=PROFILE_DIR):
+    """Profile a block with cProfile or pyinstrument when mode is set
+
+    Yields a dict whose "path" is filled in with the written profile once the block exits.
+    """
+    result = {"path": None}
+    # Only one profiler can be active per process, so concurrent sessions go unprofiled
+    if not mode or not _profile_lock.acquire(blocking=False):
+        yield result
+        return
+    try:
+        with _profile(name, mode, output_dir, result):
+            yield result
+    finally:
+        _profile_lock.release()
+    log_event("profile", name=name, path=result["path"])
+
+
+@contextmanager
+def _profile(name, mode, output_dir, result):
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.join(output_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{threading.get_ident()}")
+    if mode == "pyinstrument":
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield result
+        finally:
+            profiler.stop()
+            result["path"] = stem + ".speedscope.json"
+            with open(result["path"], "w") as f:
+                f.write(profiler.output(renderer=SpeedscopeRenderer()))
+    elif mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            result["path"] = stem + ".prof"
+            profiler.dump_stats(result["path"])
+    else:
+        raise ValueError(f"Unknown profile mode: {mode}")
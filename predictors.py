@@ -0,0 +1,408 @@
+import io
+import json
+import logging
+import os
+import pickle
+import threading
+
+import numpy as np
+
+from config import (
+    BATCH_SIZE,
+    BREED_INFO_PATH,
+    CALIBRATION_PATH,
+    CLASS_NAMES_PATH,
+    ENSEMBLE_MODELS,
+    IMG_SIZE,
+    INFERENCE_SERVER_URL,
+    LOCAL_CONFIDENCE_THRESHOLD,
+    LOCAL_MODEL_FORMAT,
+    LOCAL_TTA,
+    MODEL_PATH,
+    ONNX_MODEL_PATH,
+    SERVER_REQUEST_TIMEOUT,
+    TFLITE_MODEL_PATH,
+    TOP_K,
+)
+from metrics import LOCAL_GATE, lazy_import, log_event, span
+from report import AnimalReport, SafetyAssessment
+from utils import (
+    PREPROCESSORS,
+    get_animal_features,
+    image_array,
+    load_breed_info,
+    predict_batches,
+    preprocess_image,
+    tta_arrays,
+)
+
+
+def report_from_features(breed, features, top_k):
+    """Build an AnimalReport for a local prediction from the breed knowledge base"""
+    alternatives = ", ".join(f"{name} ({prob:.1%})" for name, prob in top_k[1:])
+    additional = f"Origin: {features['origin']}. Lifespan: {features['lifespan']}."
+    if alternatives:
+        additional += f" Other likely breeds: {alternatives}."
+    return AnimalReport(
+        animal=features['animal_type'],
+        breed=breed,
+        physical_characteristics=[
+            f"Size: {features['size']}",
+            f"Coat: {features['coat']}",
+            f"Colors: {features['colors']}",
+            *features['physical_traits'],
+        ],
+        temperament=list(features['temperament']),
+        care_requirements=list(features['care_requirements']),
+        safety=SafetyAssessment(
+            danger_level=features['danger_level'],
+            potential_risks=list(features['potential_risks']),
+            safety_precautions=list(features['safety_precautions']),
+        ),
+        additional_information=additional,
+    )
+
+
+def local_prediction(backend, top_k, breed_data):
+    """Wrap classifier top-k output in the predictor result dict"""
+    breed, confidence = top_k[0]
+    features = get_animal_features(breed, breed_data)
+    return {
+        "backend": backend,
+        "report": report_from_features(breed, features, top_k),
+        "confidence": confidence,
+        "top_k": top_k,
+    }
+
+
+def top_k_labels(probs, class_names, k):
+    """Return the top-k (label, probability) pairs for one softmax vector"""
+    top = np.argsort(probs)[::-1][:k]
+    return [(class_names[i], float(probs[i])) for i in top]
+
+
+def temperature_scale(probs, temperature):
+    """Soften (T > 1) or sharpen (T < 1) softmax rows, treating log-probabilities as logits"""
+    logits = np.log(np.clip(probs, 1e-12, 1.0)) / temperature
+    logits -= logits.max(axis=-1, keepdims=True)
+    scaled = np.exp(logits)
+    return scaled / scaled.sum(axis=-1, keepdims=True)
+
+
+def load_calibration(path=CALIBRATION_PATH, model_format=LOCAL_MODEL_FORMAT, ensemble=ENSEMBLE_MODELS,
+                     tta=LOCAL_TTA):
+    """Temperature and gate threshold written by calibrate.py for this model setup, or {}
+
+    A calibration fitted for another model format, ensemble or TTA setting would drive the gate
+    with the wrong numbers, so it is ignored with a warning until calibrate.py is rerun.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        calibration = json.load(f)
+    fitted = (calibration.get("model_format"), parse_ensemble(calibration.get("ensemble") or ""),
+              bool(calibration.get("tta")))
+    if fitted != (model_format, parse_ensemble(ensemble), bool(tta)):
+        log_event("calibration_ignored", logging.WARNING, path=path,
+                  fitted=f"format={fitted[0]} ensemble={calibration.get('ensemble') or ''!r} tta={fitted[2]}",
+                  current=f"format={model_format} ensemble={ensemble!r} tta={bool(tta)}")
+        return {}
+    return calibration
+
+
+class Predictor:
+    """Common interface for breed identification backends"""
+
+    name = "base"
+
+    def predict(self, image):
+        """Return a dict with the AnimalReport, backend name, confidence and top-k candidates"""
+        raise NotImplementedError
+
+
+class GeminiPredictor(Predictor):
+    """Identify breeds through the Gemini vision model"""
+
+    name = "gemini"
+
+    def __init__(self, identify_fn):
+        self.identify_fn = identify_fn
+
+    def predict(self, image):
+        return {
+            "backend": self.name,
+            "report": self.identify_fn(image),
+            "confidence": None,
+            "top_k": [],
+        }
+
+
+class LocalKerasPredictor(Predictor):
+    """Identify breeds offline with the trained Keras classifier"""
+
+    name = "local"
+
+    def __init__(self, model_path=MODEL_PATH, class_names_path=CLASS_NAMES_PATH,
+                 breed_info_path=BREED_INFO_PATH, top_k=TOP_K, preprocessing="resnet50"):
+        if preprocessing not in PREPROCESSORS:
+            raise ValueError(f"Unknown preprocessing: {preprocessing}")
+        self.preprocessing = preprocessing
+        with span("model_load", model=os.path.basename(model_path)):
+            self.load_model(model_path)
+        with open(class_names_path, 'rb') as f:
+            self.class_names = pickle.load(f)
+        self.breed_data = load_breed_info(breed_info_path)
+        self.top_k = top_k
+
+    def load_model(self, model_path):
+        # TensorFlow is only pulled in when the local backend is actually used
+        tf = lazy_import("tensorflow")
+        self.model = tf.keras.models.load_model(model_path, compile=False)
+
+    def run_model(self, batch):
+        """Return softmax rows for a preprocessed float32 NHWC batch"""
+        # Calling the model directly avoids the per-call setup cost of model.predict
+        return np.asarray(self.model(batch, training=False))
+
+    def predict_proba(self, image):
+        """Return the softmax vector for a single PIL image"""
+        if self.preprocessing != "resnet50":
+            return self.predict_arrays(image_array(image)[None])[0]
+        return self.run_model(preprocess_image(image))[0]
+
+    def predict_arrays(self, arrays):
+        """Return softmax rows for a uint8 NHWC batch already resized to IMG_SIZE"""
+        return self.run_model(PREPROCESSORS[self.preprocessing](arrays))
+
+    def predict_images(self, images, batch_size=BATCH_SIZE):
+        """Yield softmax rows for many PIL images, bytes or paths using fixed-size batches"""
+        # The ResNet50 path keeps the in-place BGR mean subtraction of the batch buffers
+        preprocess = None if self.preprocessing == "resnet50" else PREPROCESSORS[self.preprocessing]
+        return predict_batches(self.run_model, images, batch_size, preprocess=preprocess)
+
+    def predict_many(self, images, batch_size=BATCH_SIZE):
+        """Yield one predict() result dict per image, running the model on fixed-size batches"""
+        for probs in self.predict_images(images, batch_size):
+            yield local_prediction(self.name, self.top_k_labels(probs), self.breed_data)
+
+    def top_k_labels(self, probs):
+        """Return the top-k (breed, probability) pairs for one softmax vector"""
+        return top_k_labels(probs, self.class_names, self.top_k)
+
+    def predict(self, image):
+        top_k = self.top_k_labels(self.predict_proba(image))
+        return local_prediction(self.name, top_k, self.breed_data)
+
+
+class TFLitePredictor(LocalKerasPredictor):
+    """Run the exported (int8-quantized) TFLite model; works with tflite_runtime alone"""
+
+    def __init__(self, model_path=TFLITE_MODEL_PATH, **kwargs):
+        super().__init__(model_path, **kwargs)
+
+    def load_model(self, model_path):
+        try:
+            Interpreter = lazy_import("tflite_runtime.interpreter").Interpreter
+        except ImportError:
+            Interpreter = lazy_import("tensorflow").lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=os.cpu_count())
+        # One interpreter is shared by sessions and batch workers, and it is not thread-safe
+        self._lock = threading.Lock()
+        self.interpreter.allocate_tensors()
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+
+    def run_model(self, batch):
+        with self._lock:
+            return self._run_model(batch)
+
+    def _run_model(self, batch):
+        if self.interpreter.get_input_details()[0]["shape"][0] != len(batch):
+            self.interpreter.resize_tensor_input(self.input_detail["index"], batch.shape)
+            self.interpreter.allocate_tensors()
+        scale, zero_point = self.input_detail["quantization"]
+        if self.input_detail["dtype"] != np.float32 and scale:
+            batch = np.round(batch / scale + zero_point).astype(self.input_detail["dtype"])
+        self.interpreter.set_tensor(self.input_detail["index"], batch)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output_detail["index"])
+        scale, zero_point = self.output_detail["quantization"]
+        if self.output_detail["dtype"] != np.float32 and scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class OnnxPredictor(LocalKerasPredictor):
+    """Run the exported ONNX model with ONNX Runtime"""
+
+    def __init__(self, model_path=ONNX_MODEL_PATH, **kwargs):
+        super().__init__(model_path, **kwargs)
+
+    def load_model(self, model_path):
+        onnxruntime = lazy_import("onnxruntime")
+        self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def run_model(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class RemotePredictor(Predictor):
+    """Classify through the micro-batching inference server (python -m inference_server)"""
+
+    name = "local"
+
+    def __init__(self, url=INFERENCE_SERVER_URL, breed_info_path=BREED_INFO_PATH, top_k=TOP_K):
+        import requests
+
+        self.url = url.rstrip("/")
+        # A session keeps the connection to the server alive between requests
+        self.session = requests.Session()
+        self.breed_data = load_breed_info(breed_info_path)
+        self.top_k = top_k
+
+    def predict(self, image):
+        # The server works at IMG_SIZE anyway, so only send that many pixels
+        buffer = io.BytesIO()
+        image.convert("RGB").resize(IMG_SIZE).save(buffer, format="JPEG", quality=95)
+        response = self.session.post(f"{self.url}/predict", data=buffer.getvalue(),
+                                     headers={"Content-Type": "image/jpeg"}, timeout=SERVER_REQUEST_TIMEOUT)
+        if response.status_code == 503:
+            raise RuntimeError("The inference server is busy, please try again shortly.")
+        response.raise_for_status()
+        top_k = [tuple(pair) for pair in response.json()["top_k"][:self.top_k]]
+        return local_prediction(self.name, top_k, self.breed_data)
+
+
+class EnsemblePredictor(Predictor):
+    """Average test-time augmented softmax over one or more local models, then temperature-scale it
+
+    All views of an image go through each model as one batch. Temperature and gate threshold come
+    from the calibrate.py output in calibration; without one the averaged softmax is used as is.
+    """
+
+    name = "local"
+
+    def __init__(self, members, tta=LOCAL_TTA, calibration=None, top_k=TOP_K):
+        if any(member.class_names != members[0].class_names for member in members[1:]):
+            raise ValueError("Ensemble members must be trained on the same classes")
+        self.members = members
+        self.class_names = members[0].class_names
+        self.breed_data = members[0].breed_data
+        self.tta = tta
+        self.top_k = top_k
+        calibration = calibration or {}
+        self.temperature = calibration.get("temperature", 1.0)
+        self.threshold = calibration.get("threshold")
+
+    def _mean_proba(self, batch):
+        return np.mean([member.predict_arrays(batch) for member in self.members], axis=0)
+
+    def predict_uncalibrated(self, image):
+        """Softmax averaged over views and members, before temperature scaling"""
+        batch = tta_arrays(image) if self.tta else image_array(image)[None]
+        return self._mean_proba(batch).mean(axis=0)
+
+    def predict_proba(self, image):
+        return temperature_scale(self.predict_uncalibrated(image), self.temperature)
+
+    def predict_arrays(self, arrays):
+        """Calibrated softmax rows for a uint8 batch already resized to IMG_SIZE
+
+        Crops need the full-size source, so batched callers only get the mirrored view as TTA.
+        """
+        count = len(arrays)
+        batch = np.concatenate([arrays, arrays[:, :, ::-1]]) if self.tta else arrays
+        probs = self._mean_proba(batch)
+        probs = probs.reshape(-1, count, probs.shape[-1]).mean(axis=0)
+        return temperature_scale(probs, self.temperature)
+
+    def top_k_labels(self, probs):
+        return top_k_labels(probs, self.class_names, self.top_k)
+
+    def predict(self, image):
+        top_k = self.top_k_labels(self.predict_proba(image))
+        return local_prediction(self.name, top_k, self.breed_data)
+
+
+def parse_ensemble(spec):
+    """[(model_path, preprocessing)] from "path[=preprocessing],...", defaulting to resnet50"""
+    members = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        path, _, preprocessing = item.partition("=")
+        members.append((path, preprocessing or "resnet50"))
+    return members
+
+
+LOCAL_PREDICTORS = {
+    "keras": LocalKerasPredictor,
+    "tflite": TFLitePredictor,
+    "onnx": OnnxPredictor,
+    "server": RemotePredictor,
+}
+# Formats that run the model in this process and offer predict_arrays; "server" only forwards images
+IN_PROCESS_FORMATS = ["keras", "tflite", "onnx"]
+
+
+def in_process_format(model_format=LOCAL_MODEL_FORMAT):
+    """model_format, or keras when it is "server", for code that must load the model itself"""
+    return model_format if model_format in IN_PROCESS_FORMATS else "keras"
+
+
+def load_ensemble(model_format=LOCAL_MODEL_FORMAT, ensemble=ENSEMBLE_MODELS, tta=LOCAL_TTA, calibration=None,
+                  **kwargs):
+    """The local model for model_format plus the extra Keras models in ensemble, as an EnsemblePredictor"""
+    if calibration is None:
+        calibration = load_calibration(model_format=model_format, ensemble=ensemble, tta=tta)
+    members = [LOCAL_PREDICTORS[model_format](**kwargs)]
+    members += [LocalKerasPredictor(model_path=path, preprocessing=preprocessing)
+                for path, preprocessing in parse_ensemble(ensemble)]
+    return EnsemblePredictor(members, tta=tta, calibration=calibration, top_k=kwargs.get("top_k", TOP_K))
+
+
+def load_local_predictor(model_format=LOCAL_MODEL_FORMAT, ensemble=ENSEMBLE_MODELS, tta=LOCAL_TTA,
+                         calibration=None, **kwargs):
+    """Build the local predictor for a model format: keras, tflite, onnx or server
+
+    With test-time augmentation, extra ensemble members or a calibration file, the model is
+    wrapped in an EnsemblePredictor. The inference server only returns top-k, so it is never wrapped.
+    """
+    if model_format not in LOCAL_PREDICTORS:
+        raise ValueError(f"Unknown local model format: {model_format}")
+    if calibration is None:
+        calibration = load_calibration(model_format=model_format, ensemble=ensemble, tta=tta)
+    if model_format == "server" or not (ensemble or tta or calibration):
+        return LOCAL_PREDICTORS[model_format](**kwargs)
+    return load_ensemble(model_format, ensemble, tta, calibration, **kwargs)
+
+
+class HybridPredictor(Predictor):
+    """Answer locally and only escalate to Gemini when the local model is unsure"""
+
+    name = "hybrid"
+
+    def __init__(self, local, remote, threshold=None):
+        self.local = local
+        self.remote = remote
+        # A calibrated local model carries the threshold calibrate.py chose for it
+        if threshold is None:
+            threshold = getattr(local, "threshold", None)
+        if threshold is None:
+            threshold = LOCAL_CONFIDENCE_THRESHOLD
+        self.threshold = threshold
+
+    def predict(self, image):
+        result = self.local.predict(image)
+        if result["confidence"] >= self.threshold:
+            LOCAL_GATE.labels("local").inc()
+            return result
+        try:
+            escalated = self.remote.predict(image)
+        except Exception:
+            # A low-confidence local answer beats no answer while the remote model is failing
+            LOCAL_GATE.labels("escalation_failed").inc()
+            return result
+        LOCAL_GATE.labels("escalated").inc()
+        escalated["top_k"] = result["top_k"]
+        return escalated
@@ -0,0 +1,238 @@
+import json
+import re
+from dataclasses import asdict, dataclass, field
+
+DANGER_LEVELS = ["Low", "Medium", "High"]
+
+# JSON schema sent to Gemini as response_schema; mirrors AnimalReport
+REPORT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "is_animal": {"type": "boolean"},
+        "animal": {"type": "string"},
+        "breed": {"type": "string"},
+        "physical_characteristics": {"type": "array", "items": {"type": "string"}},
+        "temperament": {"type": "array", "items": {"type": "string"}},
+        "care_requirements": {"type": "array", "items": {"type": "string"}},
+        "safety": {
+            "type": "object",
+            "properties": {
+                "danger_level": {"type": "string", "format": "enum", "enum": DANGER_LEVELS},
+                "potential_risks": {"type": "array", "items": {"type": "string"}},
+                "safety_precautions": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["danger_level", "potential_risks", "safety_precautions"],
+        },
+        "additional_information": {"type": "string"},
+        "facts": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["is_animal", "animal", "breed", "physical_characteristics", "temperament",
+                 "care_requirements", "safety", "additional_information", "facts"],
+}
+
+
+def _string(data, key, default=""):
+    value = data.get(key, default)
+    if value is None:
+        return default
+    if not isinstance(value, (str, int, float)):
+        raise ValueError(f"{key} must be a string, got {type(value).__name__}")
+    return str(value).strip()
+
+
+def _string_list(data, key):
+    value = data.get(key) or []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(item, (str, int, float)) for item in value):
+        raise ValueError(f"{key} must be a list of strings")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def _bullets(items):
+    return "\n".join(f"- {item}" for item in items) or "- Information not available"
+
+
+@dataclass
+class SafetyAssessment:
+    danger_level: str = "Unknown"
+    potential_risks: list = field(default_factory=list)
+    safety_precautions: list = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict):
+            raise ValueError("safety must be an object")
+        return cls(
+            danger_level=_string(data, "danger_level", "Unknown").capitalize() or "Unknown",
+            potential_risks=_string_list(data, "potential_risks"),
+            safety_precautions=_string_list(data, "safety_precautions"),
+        )
+
+
+@dataclass
+class AnimalReport:
+    """Everything the app shows for one image, produced by a single model call"""
+
+    animal: str = ""
+    breed: str = ""
+    physical_characteristics: list = field(default_factory=list)
+    temperament: list = field(default_factory=list)
+    care_requirements: list = field(default_factory=list)
+    safety: SafetyAssessment = field(default_factory=SafetyAssessment)
+    additional_information: str = ""
+    facts: list = field(default_factory=list)
+    is_animal: bool = True
+
+    @classmethod
+    def from_dict(cls, data):
+        """Validate a decoded JSON object, raising ValueError on missing or mistyped fields"""
+        if not isinstance(data, dict):
+            raise ValueError("report must be a JSON object")
+        is_animal = data.get("is_animal", True)
+        if not isinstance(is_animal, bool):
+            raise ValueError("is_animal must be a boolean")
+        animal = _string(data, "animal")
+        safety = data.get("safety")
+        if is_animal and not animal:
+            raise ValueError("animal is required")
+        return cls(
+            animal=animal,
+            breed=_string(data, "breed"),
+            physical_characteristics=_string_list(data, "physical_characteristics"),
+            temperament=_string_list(data, "temperament"),
+            care_requirements=_string_list(data, "care_requirements"),
+            safety=SafetyAssessment.from_dict({} if safety is None else safety),
+            additional_information=_string(data, "additional_information"),
+            facts=_string_list(data, "facts"),
+            is_animal=is_animal,
+        )
+
+    def to_dict(self):
+        return asdict(self)
+
+    def summary(self):
+        """Flat fields used for tables and exports"""
+        return {"animal": self.animal, "breed": self.breed, "danger_level": self.safety.danger_level}
+
+    def breed_markdown(self):
+        if not self.is_animal:
+            return self.additional_information or "No recognizable animal was found in this image."
+        return f"""
+**Animal:** {self.animal}
+**Breed:** {self.breed or 'Not identifiable'}
+
+**Physical Characteristics:**
+{_bullets(self.physical_characteristics)}
+
+**Temperament:**
+{_bullets(self.temperament)}
+
+**Care Requirements:**
+{_bullets(self.care_requirements)}
+
+**Additional Information:**
+{self.additional_information or 'None'}
+"""
+
+    def safety_markdown(self):
+        return f"""
+- **Danger level:** {self.safety.danger_level}
+
+**Potential risks:**
+{_bullets(self.safety.potential_risks)}
+
+**Safety precautions:**
+{_bullets(self.safety.safety_precautions)}
+"""
+
+    def facts_markdown(self):
+        return _bullets(self.facts)
+
+
+# Markdown section headers used by the original free-form prompt
+_SECTION_PATTERN = re.compile(r"\*\*\s*([A-Za-z ]+?)\s*:\s*\*\*")
+# Headers that appear inside the safety assessment rather than starting a new section
+_NESTED_SECTIONS = {"danger level", "potential risks", "safety precautions"}
+_LIST_SECTIONS = {
+    "physical characteristics": "physical_characteristics",
+    "temperament": "temperament",
+    "care requirements": "care_requirements",
+    "interesting facts": "facts",
+}
+
+
+def _section_items(text):
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith(("-", "*", "•")):
+            items.append(line.lstrip("-*• ").strip())
+    return [item for item in items if item]
+
+
+def parse_markdown_report(text):
+    """Fallback parser for free-form markdown responses in the original **Header:** layout"""
+    parts = _SECTION_PATTERN.split(text)
+    if len(parts) < 3:
+        return AnimalReport(is_animal=False, additional_information=text.strip())
+
+    sections = {}
+    for name, body in zip(parts[1::2], parts[2::2]):
+        sections[name.strip().lower()] = body.strip()
+    if "animal" not in sections:
+        return AnimalReport(is_animal=False, additional_information=text.strip())
+
+    report = AnimalReport(
+        animal=sections["animal"].splitlines()[0].strip(),
+        breed=sections.get("breed", "").splitlines()[0].strip() if sections.get("breed") else "",
+        additional_information=sections.get("additional information", ""),
+    )
+    for header, attribute in _LIST_SECTIONS.items():
+        if header in sections:
+            setattr(report, attribute, _section_items(sections[header]))
+
+    # "- **Danger level:** High" is split out as a section of its own
+    danger = sections.get("danger level", "")
+    if danger:
+        report.safety.danger_level = danger.split()[0].strip(".,").capitalize()
+    report.safety.potential_risks = _section_items(sections.get("potential risks", ""))
+    report.safety.safety_precautions = _section_items(sections.get("safety precautions", ""))
+    # Older responses list risks as unlabeled bullets under the assessment itself
+    for item in _section_items(sections.get("safety assessment", "") + "\n" + danger):
+        match = re.match(r"danger level\W*(\w+)", item, re.IGNORECASE)
+        if match and report.safety.danger_level == "Unknown":
+            report.safety.danger_level = match.group(1).capitalize()
+        elif not match:
+            report.safety.potential_risks.append(item)
+    return report
+
+
+def section_complete(text, name):
+    """While streaming, True once the named section is followed by the next top-level header"""
+    headers = [header.strip().lower() for header in _SECTION_PATTERN.findall(text)]
+    if name not in headers:
+        return False
+    return any(header not in _NESTED_SECTIONS for header in headers[headers.index(name) + 1:])
+
+
+def parse_report(value):
+    """Build an AnimalReport from a JSON response, a cached dict, or an older markdown response
+
+    Raises ValueError when the text is JSON but does not match the report schema.
+    """
+    if isinstance(value, AnimalReport):
+        return value
+    if isinstance(value, dict):
+        return AnimalReport.from_dict(value)
+    text = value.strip()
+    # Models sometimes wrap JSON in a ```json fence even when asked for raw JSON
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return parse_markdown_report(value)
+    # Valid JSON that fails validation is an error, not a "no animal" report worth caching
+    return AnimalReport.from_dict(data)
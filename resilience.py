@@ -0,0 +1,299 @@
+"""
+Fault tolerance for remote model calls: deadlines, backoff, hedged requests and a circuit breaker
+
+ResilientCaller.call(fn, *args) runs fn on a worker thread so a stalled request can be abandoned at
+its deadline. Retryable failures are retried with full-jitter backoff inside that same deadline.
+Once enough latency samples exist, a duplicate request is optionally sent when the first one
+passes the p95 mark. A circuit breaker watches the error rate and rejects calls outright while the
+provider is unhealthy, so callers can fall back to the local classifier instead of waiting.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from config import (
+    BREAKER_COOLDOWN,
+    BREAKER_FAILURE_RATE,
+    BREAKER_MIN_CALLS,
+    BREAKER_WINDOW,
+    GEMINI_CALL_DEADLINE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_QUANTILE,
+    HEDGE_REQUESTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY,
+)
+from metrics import BREAKER_OPEN, GEMINI_EVENTS
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Calls run here so the caller can stop waiting at its deadline; abandoned calls finish in the background
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="remote-call")
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call does not finish within its deadline"""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+
+def is_retryable(exc):
+    """Return True for rate limiting (429), server errors (5xx) and transient network failures"""
+    # google.api_core exceptions carry the HTTP status as .code, requests errors on .response
+    code = getattr(exc, "code", None)
+    if code is None and getattr(exc, "response", None) is not None:
+        code = getattr(exc.response, "status_code", None)
+    if callable(code):
+        code = None
+    return code in RETRYABLE_STATUS_CODES or isinstance(exc, (TimeoutError, ConnectionError))
+
+
+def call_with_backoff(fn, *args, rate_limiter=None, max_attempts=RETRY_MAX_ATTEMPTS,
+                      base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY, deadline=None):
+    """Call fn, retrying retryable errors with full-jitter exponential backoff
+
+    Returns a (result, attempts) tuple. Every attempt takes a token from rate_limiter. With a
+    deadline (a time.monotonic() value), no retry is started that would sleep past it.
+    """
+    for attempt in range(1, max_attempts + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return fn(*args), attempt
+        except Exception as e:
+            if attempt == max_attempts or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            time.sleep(delay)
+
+
+class LatencyTracker:
+    """Rolling window of call latencies for percentile estimates"""
+
+    def __init__(self, size=200, min_samples=HEDGE_MIN_SAMPLES):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q):
+        """Return the q-th percentile in seconds, or None until min_samples calls were seen"""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            return float(np.percentile(self.samples, q))
+
+
+def hedged_call(fn, *args, timeout, hedge_after=None, on_hedge=None):
+    """Run fn on the worker pool and return the first successful result within timeout
+
+    If hedge_after seconds pass without a result, a second identical request is started and
+    whichever succeeds first wins. on_hedge is called just before the duplicate is sent; if it
+    returns False the hedge is skipped.
+    """
+    deadline = time.monotonic() + timeout
+    pending = {_executor.submit(fn, *args)}
+    hedged = hedge_after is None or hedge_after >= timeout
+    error = None
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        wait_for = remaining if hedged else min(remaining, hedge_after)
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+        if not hedged and not done:
+            hedged = True
+            if on_hedge is None or on_hedge() is not False:
+                pending.add(_executor.submit(fn, *args))
+    if error is not None and not pending:
+        raise error
+    raise DeadlineExceeded(f"no response within {timeout:.1f}s")
+
+
+class CircuitBreaker:
+    """Open after the failure rate over the last calls spikes; probe again after a cooldown"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_rate=BREAKER_FAILURE_RATE, window=BREAKER_WINDOW,
+                 min_calls=BREAKER_MIN_CALLS, cooldown=BREAKER_COOLDOWN):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.outcomes = deque(maxlen=window)
+        self.trips = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Return True if a call may go ahead; in half-open state only one probe at a time"""
+        state = self.state
+        with self._lock:
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.outcomes.append(True)
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self.outcomes.clear()
+                BREAKER_OPEN.set(0)
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.outcomes.append(False)
+            failures = self.outcomes.count(False)
+            tripped = len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_rate
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and tripped):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self.trips += 1
+                BREAKER_OPEN.set(1)
+            self._probing = False
+
+
+class ResilientCaller:
+    """Deadline, retry, hedging and circuit breaking around calls to one remote provider"""
+
+    def __init__(self, breaker=None, deadline=GEMINI_CALL_DEADLINE, max_attempts=RETRY_MAX_ATTEMPTS,
+                 hedge=HEDGE_REQUESTS, hedge_quantile=HEDGE_QUANTILE):
+        self.breaker = breaker or CircuitBreaker()
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.latency = LatencyTracker()
+        self.stats = {"calls": 0, "failures": 0, "retries": 0, "hedged": 0, "timeouts": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+        GEMINI_EVENTS.labels(name).inc(amount)
+
+    def _attempt(self, fn, deadline, rate_limiter, *args):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("call deadline exceeded before the attempt started")
+        hedge_after = self.latency.percentile(self.hedge_quantile) if self.hedge else None
+
+        def on_hedge():
+            # A hedge costs quota too, so it is skipped when no rate-limit token is free right now
+            if rate_limiter is not None and not rate_limiter.try_acquire():
+                return False
+            self._count("hedged")
+            return True
+
+        started = time.monotonic()
+        try:
+            result = hedged_call(fn, *args, timeout=remaining, hedge_after=hedge_after, on_hedge=on_hedge)
+        except DeadlineExceeded:
+            self._count("timeouts")
+            raise
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    def call(self, fn, *args, rate_limiter=None):
+        """Call fn(*args) under the policy and return a (result, attempts) tuple
+
+        Raises CircuitOpenError without calling fn while the breaker is open.
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError("Gemini is temporarily unavailable (circuit breaker open)")
+        self._count("calls")
+        deadline = time.monotonic() + self.deadline
+        attempts = 0
+
+        def attempt(*call_args):
+            nonlocal attempts
+            attempts += 1
+            return self._attempt(fn, deadline, rate_limiter, *call_args)
+
+        try:
+            result, _ = call_with_backoff(attempt, *args, rate_limiter=rate_limiter,
+                                          max_attempts=self.max_attempts, deadline=deadline)
+        except Exception as e:
+            self._count("failures")
+            # Only provider-side trouble counts against the breaker; a bad request means it is up
+            if is_retryable(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        finally:
+            self._count("retries", max(attempts - 1, 0))
+        self.breaker.record_success()
+        return result, attempts
+
+    def guard(self):
+        """Context manager that applies only the circuit breaker, for calls like streams that
+        cannot be retried or hedged once output has been shown"""
+        return _BreakerGuard(self)
+
+    def summary(self):
+        """Counters, breaker state and latency percentiles for display and export"""
+        with self._lock:
+            summary = dict(self.stats)
+        summary["breaker_state"] = self.breaker.state
+        summary["breaker_trips"] = self.breaker.trips
+        p50, p95 = self.latency.percentile(50), self.latency.percentile(95)
+        summary["p50_ms"] = round(p50 * 1000, 1) if p50 is not None else None
+        summary["p95_ms"] = round(p95 * 1000, 1) if p95 is not None else None
+        return summary
+
+
+class _BreakerGuard:
+    def __init__(self, caller):
+        self.caller = caller
+
+    def __enter__(self):
+        if not self.caller.breaker.allow():
+            self.caller._count("rejected")
+            raise CircuitOpenError("Gemini is temporarily unavailable (circuit breaker open)")
+        self.caller._count("calls")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Stream durations are not recorded, they would skew the hedging percentile
+        if exc is None:
+            self.caller.breaker.record_success()
+        else:
+            self.caller._count("failures")
+            if is_retryable(exc):
+                self.caller.breaker.record_failure()
+            else:
+                self.caller.breaker.record_success()
+        return False
@@ -0,0 +1,138 @@
+"""
+Build the landing page sample gallery from a few source images
+
+    python samples.py                      # fetch, resize and precompute results with Gemini
+    python samples.py --no-precompute      # images only; clicking a sample then calls the backend
+    python samples.py --source cat=~/cat.jpg --source dog=https://example.com/dog.jpg
+
+Each sample is stored as a resized image and a thumbnail in SAMPLES_DIR. The manifest holds the
+caption, file names, the source and, when precomputed, the identification report. The app serves
+these files itself and reuses the stored reports, so the landing page makes no external fetches
+and demo clicks make no API calls.
+"""
+
+import argparse
+import io
+import json
+import os
+
+from PIL import Image, ImageOps
+
+from config import SAMPLE_IMAGE_MAX_EDGE, SAMPLE_THUMBNAIL_SIZE, SAMPLES_DIR, SAMPLES_MANIFEST_PATH
+
+# The images the landing page used to hotlink
+SAMPLE_SOURCES = {
+    "cat": ("Sample Cat", "https://upload.wikimedia.org/wikipedia/commons/thumb/4/4d/"
+                          "Cat_November_2010-1a.jpg/800px-Cat_November_2010-1a.jpg"),
+    "dog": ("Sample Dog", "https://imgs.search.brave.com/8UIgd2rGu-w5WNHs1LSAieexcDqKt4liuafSLSDQwHk/rs:fit:860:0:0:0/"
+                          "g:ce/aHR0cHM6Ly9pbWFn/ZXMuZnJlZWltYWdl/cy5jb20vaW1hZ2Vz/L2xhcmdlLXByZXZp/"
+                          "ZXdzL2NlNy9oYXBw/eS1ibGFjay1kb2ct/MDQxMC01NzAxNTc5/LmpwZz9mbXQ"),
+    "bird": ("Sample Bird", "https://imgs.search.brave.com/Pgcb9_lcz5h2RJHmkh0swRhKkdKQsfqRGeYICMzK1qg/rs:fit:860:0:0:0/"
+                            "g:ce/aHR0cHM6Ly9tZWRp/YS5nZXR0eWltYWdl/cy5jb20vaWQvNDgy/NTMwMTE5L3Bob3Rv/"
+                            "L29wZXJhLWJpcmQt/MS5qcGc_cz02MTJ4/NjEyJnc9MCZrPTIw/JmM9Q2E1bi0wOEZO/"
+                            "OW9YZExrM1Vza2lx/ZmpnbXZiXzQ2RHU0/ZlJZQkRGR3UyUT0"),
+}
+
+
+def load_manifest(path=SAMPLES_MANIFEST_PATH):
+    """Return the list of sample entries, or an empty list if the gallery has not been built"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)["samples"]
+
+
+def sample_path(filename, samples_dir=SAMPLES_DIR):
+    return os.path.join(samples_dir, filename)
+
+
+def fetch_image(source):
+    """Open a source image from a URL or a local path"""
+    if source.startswith(("http://", "https://")):
+        import requests
+
+        response = requests.get(source, timeout=30, headers={"User-Agent": "animal-breed-identifier/1.0"})
+        response.raise_for_status()
+        image = Image.open(io.BytesIO(response.content))
+    else:
+        image = Image.open(os.path.expanduser(source))
+    # Bake the EXIF orientation in, since the stored copies carry no metadata
+    return ImageOps.exif_transpose(image).convert("RGB")
+
+
+def save_jpeg(image, path, quality=85):
+    tmp_path = path + ".tmp"
+    image.save(tmp_path, format="JPEG", quality=quality, optimize=True)
+    os.replace(tmp_path, path)
+
+
+def identify(image, backend):
+    """Run the configured backend once so the app can serve the result without calling it"""
+    if backend == "gemini":
+        import gemini_client
+        from resilience import call_with_backoff
+
+        gemini_client.configure_genai()
+        report, _ = call_with_backoff(gemini_client.identify_animal_breed, image)
+        return report.to_dict(), "gemini"
+    from predictors import load_local_predictor
+
+    prediction = load_local_predictor().predict(image)
+    return prediction["report"].to_dict(), prediction["backend"]
+
+
+def build_samples(sources=SAMPLE_SOURCES, samples_dir=SAMPLES_DIR, precompute="gemini",
+                  max_edge=SAMPLE_IMAGE_MAX_EDGE, thumbnail_size=SAMPLE_THUMBNAIL_SIZE):
+    """Fetch, resize and optionally identify every source image, then write the manifest
+
+    sources maps a sample id to (caption, URL or path). Returns the manifest entries.
+    """
+    os.makedirs(samples_dir, exist_ok=True)
+    entries = []
+    for sample_id, (caption, source) in sources.items():
+        image = fetch_image(source)
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        save_jpeg(image, sample_path(f"{sample_id}.jpg", samples_dir))
+        thumbnail = ImageOps.fit(image, thumbnail_size, Image.LANCZOS)
+        save_jpeg(thumbnail, sample_path(f"{sample_id}_thumb.jpg", samples_dir), quality=80)
+
+        entry = {"id": sample_id, "caption": caption, "source": source,
+                 "image": f"{sample_id}.jpg", "thumbnail": f"{sample_id}_thumb.jpg"}
+        if precompute:
+            entry["report"], entry["backend"] = identify(image, precompute)
+        entries.append(entry)
+        print(f"{sample_id}: {image.size[0]}x{image.size[1]}" + (f", identified with {entry['backend']}"
+                                                                  if precompute else ""))
+
+    manifest_path = os.path.join(samples_dir, os.path.basename(SAMPLES_MANIFEST_PATH))
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"samples": entries}, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    print(f"Manifest written to {manifest_path}")
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the landing page sample gallery")
+    parser.add_argument("--source", action="append", default=[], metavar="ID=URL_OR_PATH",
+                        help="sample to include instead of the defaults; may be repeated")
+    parser.add_argument("--backend", choices=["gemini", "local"], default="gemini",
+                        help="backend used to precompute the sample results")
+    parser.add_argument("--no-precompute", action="store_true", help="store images only")
+    parser.add_argument("--output", default=SAMPLES_DIR, help="directory for images and manifest")
+    args = parser.parse_args(argv)
+
+    sources = SAMPLE_SOURCES
+    if args.source:
+        sources = {}
+        for item in args.source:
+            sample_id, _, source = item.partition("=")
+            if not source:
+                parser.error(f"--source expects ID=URL_OR_PATH, got {item!r}")
+            sources[sample_id] = (f"Sample {sample_id.replace('_', ' ').title()}", source)
+    build_samples(sources, args.output, precompute=None if args.no_precompute else args.backend)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Image embeddings and a persistent nearest-neighbor index over past uploads
+
+Embeddings come from the classifier's own ResNet50 backbone (cut at its GlobalAveragePooling2D
+layer) so no second network is loaded. The index keeps an append-only float32 vector file and a
+JSONL metadata file as the source of truth. When hnswlib is installed an HNSW graph is built on
+top and saved periodically; otherwise search is an exact NumPy dot product, which is fast enough
+for tens of thousands of entries.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+from config import (
+    MODEL_PATH,
+    SIMILARITY_INDEX_DIR,
+    SIMILARITY_SAVE_EVERY,
+    SIMILARITY_THUMBNAIL_SIZE,
+)
+from metrics import lazy_import
+from utils import preprocess_image
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+class EmbeddingExtractor:
+    """L2-normalized image embeddings from the classifier backbone"""
+
+    def __init__(self, model_path=MODEL_PATH):
+        # TensorFlow is only pulled in when the similarity index is enabled
+        tf = lazy_import("tensorflow")
+        if os.path.exists(model_path):
+            model = tf.keras.models.load_model(model_path, compile=False)
+            pooling = next(layer for layer in model.layers
+                           if isinstance(layer, tf.keras.layers.GlobalAveragePooling2D))
+            self.model = tf.keras.Model(model.input, pooling.output)
+        else:
+            # No trained model yet: the ImageNet backbone create_model starts from
+            self.model = tf.keras.applications.ResNet50(weights='imagenet', include_top=False, pooling='avg')
+        self.dim = int(self.model.output_shape[-1])
+
+    def run_model(self, batch):
+        vectors = np.asarray(self.model(batch, training=False), dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def embed(self, image):
+        """Return the embedding of one PIL image"""
+        return self.run_model(preprocess_image(image))[0]
+
+
+class EmbeddingIndex:
+    """Append-only store of (embedding, metadata) pairs with cosine-similarity search"""
+
+    def __init__(self, index_dir=SIMILARITY_INDEX_DIR, dim=None, save_every=SIMILARITY_SAVE_EVERY):
+        self.index_dir = index_dir
+        self.save_every = save_every
+        self.vectors_path = os.path.join(index_dir, "vectors.f32")
+        self.metadata_path = os.path.join(index_dir, "metadata.jsonl")
+        self.hnsw_path = os.path.join(index_dir, "hnsw.bin")
+        self.info_path = os.path.join(index_dir, "info.json")
+        self.thumbnails_dir = os.path.join(index_dir, "thumbnails")
+        os.makedirs(self.thumbnails_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self.dim = dim or self._load_dim()
+        self.metadata = self._load_metadata()
+        if self.dim and os.path.exists(self.vectors_path):
+            vectors = np.fromfile(self.vectors_path, dtype=np.float32)
+            vectors = vectors[:vectors.size // self.dim * self.dim].reshape(-1, self.dim)
+        else:
+            vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+        # Entries are only complete when both their vector and metadata line were written
+        count = min(len(vectors), len(self.metadata))
+        vectors_size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        if self._torn or count != len(self.metadata) or vectors_size != count * (self.dim or 0) * 4:
+            self._truncate(count)
+        self.metadata = self.metadata[:count]
+        # Grown by doubling so inserts don't copy the whole matrix each time
+        self._buffer = np.array(vectors[:count], dtype=np.float32)
+        self._hnsw = self._load_hnsw() if hnswlib is not None and self.dim else None
+        self._unsaved = 0
+
+    def _load_dim(self):
+        try:
+            with open(self.info_path, 'r') as f:
+                return json.load(f)["dim"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _truncate(self, count):
+        # Drop the half-written tail of an interrupted add so later appends stay aligned
+        if os.path.exists(self.vectors_path):
+            os.truncate(self.vectors_path, count * self.dim * 4 if self.dim else 0)
+        with open(self.metadata_path, 'w') as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in self.metadata[:count])
+
+    def _load_metadata(self):
+        self._torn = False
+        entries = []
+        if os.path.exists(self.metadata_path):
+            with open(self.metadata_path, 'r') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn final line from an interrupted write
+                        self._torn = True
+                        break
+        return entries
+
+    def _load_hnsw(self):
+        index = hnswlib.Index(space='ip', dim=self.dim)
+        saved = 0
+        if os.path.exists(self.hnsw_path):
+            try:
+                index.load_index(self.hnsw_path, max_elements=max(len(self.vectors), 1024))
+                saved = index.get_current_count()
+            except RuntimeError:
+                saved = 0
+        if saved == 0 or saved > len(self.vectors):
+            index = hnswlib.Index(space='ip', dim=self.dim)
+            index.init_index(max_elements=max(len(self.vectors), 1024), ef_construction=200, M=16)
+            saved = 0
+        # Catch up on entries appended after the graph was last saved
+        if saved < len(self.vectors):
+            index.add_items(self.vectors[saved:], np.arange(saved, len(self.vectors)))
+        index.set_ef(64)
+        return index
+
+    def __len__(self):
+        return len(self.metadata)
+
+    @property
+    def vectors(self):
+        return self._buffer[:len(self.metadata)]
+
+    def _append_vector(self, vector):
+        count = len(self.metadata)
+        if count >= len(self._buffer):
+            grown = np.zeros((max(2 * len(self._buffer), 1024), self.dim), dtype=np.float32)
+            grown[:count] = self._buffer[:count]
+            self._buffer = grown
+        self._buffer[count] = vector[0]
+
+    def add(self, vector, metadata, thumbnail=None):
+        """Append one embedding with its metadata (and an optional PIL thumbnail); returns its id"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vector.shape[1]
+                with open(self.info_path, 'w') as f:
+                    json.dump({"dim": self.dim}, f)
+                self._buffer = np.zeros((0, self.dim), dtype=np.float32)
+                if hnswlib is not None:
+                    self._hnsw = self._load_hnsw()
+            entry_id = len(self.metadata)
+            metadata = dict(metadata, id=entry_id)
+            if thumbnail is not None:
+                path = os.path.join(self.thumbnails_dir, f"{entry_id}.jpg")
+                image = thumbnail.convert("RGB")
+                image.thumbnail(SIMILARITY_THUMBNAIL_SIZE)
+                image.save(path, format="JPEG", quality=80)
+                metadata["thumbnail"] = path
+            with open(self.vectors_path, 'ab') as f:
+                f.write(vector.tobytes())
+            with open(self.metadata_path, 'a') as f:
+                f.write(json.dumps(metadata) + "\n")
+            self._append_vector(vector)
+            self.metadata.append(metadata)
+            if self._hnsw is not None:
+                if entry_id >= self._hnsw.get_max_elements():
+                    self._hnsw.resize_index(2 * self._hnsw.get_max_elements())
+                self._hnsw.add_items(vector, [entry_id])
+                self._unsaved += 1
+                if self._unsaved >= self.save_every:
+                    self._save_hnsw()
+            return entry_id
+
+    def _save_hnsw(self):
+        tmp_path = self.hnsw_path + ".tmp"
+        self._hnsw.save_index(tmp_path)
+        os.replace(tmp_path, self.hnsw_path)
+        self._unsaved = 0
+
+    def save(self):
+        """Persist the HNSW graph; vectors and metadata are already written on every add"""
+        with self._lock:
+            if self._hnsw is not None and self._unsaved:
+                self._save_hnsw()
+
+    def search(self, vector, k=5):
+        """Return up to k (similarity, metadata) pairs, most similar first"""
+        with self._lock:
+            count = len(self.metadata)
+            if count == 0:
+                return []
+            k = min(k, count)
+            vector = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+            if self._hnsw is not None:
+                ids, distances = self._hnsw.knn_query(vector, k=k)
+                # hnswlib's inner-product space reports 1 - dot
+                pairs = [(1.0 - float(d), int(i)) for i, d in zip(ids[0], distances[0])]
+            else:
+                scores = self.vectors @ vector[0]
+                top = np.argpartition(-scores, k - 1)[:k] if k < count else np.arange(count)
+                top = top[np.argsort(-scores[top])]
+                pairs = [(float(scores[i]), int(i)) for i in top]
+            return [(score, self.metadata[i]) for score, i in pairs]
+
@@ -0,0 +1,155 @@
+import csv
+import io
+import zipfile
+
+import pytest
+
+from PIL import Image
+
+import batch
+from batch import (
+    TokenBucket,
+    call_with_backoff,
+    get_gemini_rate_limiter,
+    iter_uploaded_images,
+    rows_to_csv,
+    run_batch,
+    run_local_batch,
+)
+from report import AnimalReport, SafetyAssessment
+
+
+class ServerError(Exception):
+    code = 503
+
+
+class Uploaded:
+    def __init__(self, name, data):
+        self.name = name
+        self._data = data
+
+    def getvalue(self):
+        return self._data
+
+
+def png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def identify_by_color(image):
+    red = image.getpixel((0, 0))[0]
+    report = AnimalReport(animal="Cat" if red > 128 else "Dog", safety=SafetyAssessment(danger_level="Low"))
+    return {"report": report, "backend": "local", "confidence": 0.9, "top_k": []}, 1
+
+
+def test_backoff_retries_server_errors():
+    outcomes = [ServerError(), "ok"]
+
+    def fn():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert call_with_backoff(fn, base_delay=0) == ("ok", 2)
+
+
+def test_backoff_does_not_retry_client_errors():
+    calls = []
+
+    def fn():
+        calls.append(None)
+        raise ValueError("bad request")
+
+    try:
+        call_with_backoff(fn)
+    except ValueError:
+        pass
+    assert len(calls) == 1
+
+
+def test_zip_uploads_are_expanded():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("cats/a.png", png((255, 0, 0)))
+        archive.writestr("__MACOSX/cats/._a.png", b"")
+        archive.writestr("notes.txt", b"")
+    names = [name for name, _ in iter_uploaded_images([Uploaded("pets.zip", buffer.getvalue()),
+                                                       Uploaded("b.jpg", b"")])]
+    assert names == ["pets.zip/cats/a.png", "b.jpg"]
+
+
+def test_rows_are_keyed_by_index_when_names_repeat():
+    items = [("photo.png", png((255, 0, 0))), ("photo.png", png((0, 0, 255))), ("broken.png", b"not an image")]
+    results = dict(run_batch(items, identify_by_color, max_workers=3))
+    assert sorted(results) == [0, 1, 2]
+    assert (results[0]["animal"], results[1]["animal"]) == ("Cat", "Dog")
+    assert results[0]["danger_level"] == "Low"
+    assert results[0]["backend"] == "local" and results[0]["confidence"] == 0.9
+    assert results[2]["status"] == "error"
+
+
+def test_csv_export_has_backend_columns():
+    rows = [row for _, row in run_batch([("a.png", png((255, 0, 0)))], identify_by_color, max_workers=1)]
+    record = next(csv.DictReader(io.StringIO(rows_to_csv(rows))))
+    assert record["backend"] == "local"
+    assert record["animal"] == "Cat"
+
+
+class ColorModel:
+    """predict_many stand-in that classifies by the red channel of each encoded image"""
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+
+    def predict_many(self, images, batch_size):
+        for count, data in enumerate(images):
+            if count == self.fail_after:
+                raise OSError("image file is truncated")
+            yield identify_by_color(Image.open(io.BytesIO(data)))[0]
+
+
+def test_local_batch_reports_undecodable_files_and_keeps_indices():
+    items = [("red.png", png((255, 0, 0))), ("broken.png", b"not an image"), ("blue.png", png((0, 0, 255)))]
+    results = dict(run_local_batch(items, ColorModel(), batch_size=2))
+    assert (results[0]["animal"], results[2]["animal"]) == ("Cat", "Dog")
+    assert results[1]["status"] == "error"
+    assert results[0]["backend"] == "local" and results[0]["attempts"] == 0
+
+
+def test_local_batch_failure_marks_remaining_images():
+    items = [("a.png", png((255, 0, 0))), ("b.png", png((0, 0, 255))), ("c.png", png((0, 0, 255)))]
+    results = dict(run_local_batch(items, ColorModel(fail_after=1)))
+    assert results[0]["status"] == "ok"
+    assert [results[i]["status"] for i in (1, 2)] == ["error", "error"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.mark.parametrize("capacity", [1, 4])
+def test_token_bucket_never_exceeds_quota_in_any_minute(monkeypatch, capacity):
+    clock = FakeClock()
+    monkeypatch.setattr(batch.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(batch.time, "sleep", clock.sleep)
+    bucket = TokenBucket(15, capacity=capacity)
+    times = []
+    for _ in range(60):
+        bucket.acquire()
+        times.append(clock.now)
+    assert times[:capacity] == [0.0] * capacity
+    assert max(sum(start <= t < start + 60 for t in times) for start in times) <= 15
+
+
+def test_gemini_rate_limiter_is_shared():
+    assert get_gemini_rate_limiter() is get_gemini_rate_limiter()
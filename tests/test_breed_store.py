@@ -0,0 +1,64 @@
+import json
+import os
+import pickle
+
+from breed_store import BreedStore, default_breed_record, normalize
+
+
+def make_store(tmp_path, breeds, class_names=None):
+    source = tmp_path / "breed_info.json"
+    source.write_text(json.dumps({breed: default_breed_record(breed) for breed in breeds}))
+    class_names_path = tmp_path / "class_names.pkl"
+    if class_names is not None:
+        class_names_path.write_bytes(pickle.dumps(class_names))
+    return BreedStore(str(source), str(tmp_path / "breed_index.pkl"), reload_interval=0,
+                      class_names_path=str(class_names_path))
+
+
+def test_normalize_collapses_punctuation_and_case():
+    assert normalize("St. Bernard") == "saint bernard"
+    assert normalize("Yorkshire_Terrier's") == "yorkshire terrier"
+
+
+def test_normalize_only_expands_standalone_st():
+    assert normalize("st bernard") == "saint bernard"
+    assert normalize("Best.") == "best"
+    assert normalize("Staffordshire Bull Terrier") == "staffordshire bull terrier"
+
+
+def test_match_exact_alias_filler_and_fuzzy(tmp_path):
+    store = make_store(tmp_path, ["Beagle", "Saint Bernard", "Yorkshire Terrier"])
+    assert store.match("beagle") == "Beagle"
+    assert store.match("Yorkie") == "Yorkshire Terrier"
+    assert store.match("St. Bernard dog") == "Saint Bernard"
+    assert store.match("Yorkshire Terier") == "Yorkshire Terrier"
+    assert store.match("Giraffe") is None
+
+
+def test_features_fill_defaults(tmp_path):
+    store = make_store(tmp_path, ["Beagle"])
+    assert store.features("beagle")["animal_type"] == "Dog"
+    assert store.features("Giraffe")["animal_type"] == "Unknown"
+
+
+def test_compiled_index_is_reused_and_rebuilt_on_change(tmp_path):
+    store = make_store(tmp_path, ["Beagle"])
+    assert os.path.exists(store.index_path)
+    assert len(BreedStore(store.source_path, store.index_path)) == 1
+
+    source = tmp_path / "breed_info.json"
+    source.write_text(json.dumps({breed: default_breed_record(breed) for breed in ["Beagle", "Pug"]}))
+    mtime = os.path.getmtime(source) + 10
+    os.utime(source, (mtime, mtime))
+    assert store.match("pug") == "Pug"
+
+
+def test_by_index_follows_model_class_order(tmp_path):
+    store = make_store(tmp_path, ["Beagle", "Abyssinian", "Pug"], class_names=["abyssinian", "beagle", "pug"])
+    assert [store.by_index(i)[0] for i in range(3)] == ["Abyssinian", "Beagle", "Pug"]
+    assert store.by_index(0)[1]["animal_type"] == "Cat"
+
+
+def test_by_index_without_trained_model_uses_catalog_order(tmp_path):
+    store = make_store(tmp_path, ["Beagle", "Abyssinian"])
+    assert store.by_index(0)[0] == "Beagle"
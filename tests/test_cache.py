@@ -0,0 +1,51 @@
+from PIL import Image
+
+from cache import ResultCache, facts_key, image_key
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResultCache(db_path=str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_image_key_depends_on_pixels_not_object():
+    red = Image.new("RGB", (16, 16), (255, 0, 0))
+    assert image_key(red) == image_key(red.copy())
+    assert image_key(red) != image_key(Image.new("RGB", (16, 16), (0, 0, 255)))
+
+
+def test_facts_key_normalizes_animal_type():
+    assert facts_key(" Dogs ") == facts_key("dog") == "dog"
+    assert facts_key("Grass") == "grass"
+
+
+def test_hits_memory_then_disk(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get("identify", "k") is None
+    cache.set("identify", "k", "report")
+    assert cache.get("identify", "k") == "report"
+    assert make_cache(tmp_path).get("identify", "k") == "report"
+    assert cache.stats["memory_hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_memory_tier_is_bounded_lru(tmp_path):
+    cache = make_cache(tmp_path, max_memory_entries=2)
+    for key in "abc":
+        cache.set("identify", key, key)
+    assert list(cache._memory) == [("identify", "b"), ("identify", "c")]
+    assert cache.get("identify", "a") == "a"
+    assert cache.stats["disk_hits"] == 1
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_disk_entries=2)
+    for key in "abc":
+        cache.set("facts", key, key)
+    assert make_cache(tmp_path).get("facts", "a") is None
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = make_cache(tmp_path, ttl=0)
+    cache.set("identify", "k", "report")
+    cache._memory.clear()
+    cache._conn.execute("UPDATE cache SET created_at = created_at - 10")
+    assert cache.get("identify", "k") is None
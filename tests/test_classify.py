@@ -0,0 +1,39 @@
+import io
+import tarfile
+
+from classify import discover, load_checkpoint
+
+
+def add_member(archive, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    archive.addfile(info, io.BytesIO(data))
+
+
+def test_tar_resume_skips_done_members_without_extracting(tmp_path, monkeypatch):
+    source = str(tmp_path / "images.tar")
+    with tarfile.open(source, "w") as archive:
+        for name in ["a.jpg", "b.jpg", "notes.txt", "c.png"]:
+            add_member(archive, name, name.encode())
+    extracted = []
+    extractfile = tarfile.TarFile.extractfile
+    monkeypatch.setattr(tarfile.TarFile, "extractfile",
+                        lambda self, member: extracted.append(member.name) or extractfile(self, member))
+    items = list(discover(source, done={f"{source}::a.jpg"}))
+    assert items == [(f"{source}::b.jpg", b"b.jpg"), (f"{source}::c.png", b"c.png")]
+    assert extracted == ["b.jpg", "c.png"]
+
+
+def test_directory_resume_skips_done_paths(tmp_path):
+    for name in ["a.jpg", "b.jpg"]:
+        (tmp_path / name).write_bytes(b"")
+    done = {str(tmp_path / "a.jpg")}
+    assert [item_id for item_id, _ in discover(str(tmp_path), done)] == [str(tmp_path / "b.jpg")]
+
+
+def test_checkpoint_drops_torn_line_and_can_retry_errors(tmp_path):
+    output = tmp_path / "predictions.jsonl"
+    output.write_text('{"id": "a"}\n{"id": "b", "error": "bad"}\n{"id": "c"')
+    assert load_checkpoint(str(output)) == {"a", "b"}
+    assert output.read_text().endswith('"bad"}\n')
+    assert load_checkpoint(str(output), retry_errors=True) == {"a"}
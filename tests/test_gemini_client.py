@@ -0,0 +1,8 @@
+import gemini_client
+from config import GEMINI_CALL_DEADLINE
+
+
+def test_request_options_leave_retries_to_resilient_caller():
+    options = gemini_client.request_options()
+    assert "retry" not in options
+    assert options["timeout"] <= GEMINI_CALL_DEADLINE
@@ -0,0 +1,65 @@
+import io
+import json
+import zipfile
+
+from PIL import Image
+
+from history import HistoryStore
+from report import AnimalReport, SafetyAssessment
+
+
+def png(color, size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_store(tmp_path):
+    return HistoryStore(str(tmp_path), str(tmp_path / "history.sqlite3"))
+
+
+def beagle():
+    return AnimalReport(animal="Dog", breed="Beagle", safety=SafetyAssessment(danger_level="Low"))
+
+
+def test_record_and_get(tmp_path):
+    store = make_store(tmp_path)
+    data = png((255, 0, 0))
+    image_hash = store.record(data, beagle(), "gemini", latency_ms=12.5, name="dog.png")
+    entry = store.get(image_hash)
+    assert (entry["animal"], entry["breed"], entry["danger_level"]) == ("Dog", "Beagle", "Low")
+    assert entry["report"]["breed"] == "Beagle"
+    assert store.image(image_hash) == data
+    assert Image.open(io.BytesIO(store.thumbnail(entry["thumbnail_hash"]))).format == "JPEG"
+
+
+def test_pages_are_newest_first_and_images_stored_once(tmp_path):
+    store = make_store(tmp_path)
+    first = store.record(png((255, 0, 0)), beagle(), "gemini")
+    second = store.record(png((0, 0, 255)), beagle().to_dict(), "local", confidence=0.8)
+    store.record(png((255, 0, 0)), beagle(), "gemini")
+    assert store.count() == 2
+    assert [entry["image_hash"] for entry in store.page(0, 10)] == [first, second]
+    assert [entry["image_hash"] for entry in store.page(1, 10)] == [second]
+
+
+def test_export_zip_has_images_and_results(tmp_path):
+    store = make_store(tmp_path)
+    image_hash = store.record(png((0, 255, 0)), beagle(), "gemini")
+    with zipfile.ZipFile(io.BytesIO(store.export_zip())) as archive:
+        (line,) = archive.read("results.jsonl").decode().splitlines()
+        entry = json.loads(line)
+        assert entry["image_hash"] == image_hash
+        assert archive.read(entry["file"]) == store.image(image_hash)
+    assert json.loads(store.export_jsonl())["breed"] == "Beagle"
+
+
+def test_rerun_keeps_first_entry(tmp_path):
+    store = make_store(tmp_path)
+    data = png((255, 0, 0))
+    image_hash = store.record(data, beagle(), "gemini", latency_ms=900.0, replace=False)
+    created_at = store.get(image_hash)["created_at"]
+    store.record(data, beagle(), "duplicate", latency_ms=3.0, replace=False)
+    entry = store.get(image_hash)
+    assert (entry["backend"], entry["latency_ms"], entry["created_at"]) == ("gemini", 900.0, created_at)
+    assert store.count() == 1
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from inference_server import MicroBatcher, QueueFullError
+
+
+class GatedModel:
+    """run_batch stand-in that blocks until released and records each batch size"""
+
+    def __init__(self):
+        self.sizes = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, items):
+        self.sizes.append(len(items))
+        self.started.set()
+        self.release.wait(timeout=5)
+        return [item * 2 for item in items]
+
+
+def test_queued_requests_run_as_one_batch():
+    model = GatedModel()
+    batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=50, max_queue_depth=16)
+    first = batcher.submit(0)
+    assert model.started.wait(timeout=5)
+    futures = [batcher.submit(i) for i in range(1, 5)]
+    model.release.set()
+    assert [future.result(timeout=5) for future in [first] + futures] == [0, 2, 4, 6, 8]
+    assert model.sizes == [1, 4]
+    stats = batcher.snapshot()
+    assert (stats["batches"], stats["items"], stats["max_batch"], stats["mean_batch"]) == (2, 5, 4, 2.5)
+
+
+def test_full_queue_rejects_instead_of_waiting():
+    model = GatedModel()
+    batcher = MicroBatcher(model, max_batch_size=2, max_wait_ms=1, max_queue_depth=2)
+    futures = [batcher.submit(0)]
+    assert model.started.wait(timeout=5)
+    futures += [batcher.submit(1), batcher.submit(2)]
+    with pytest.raises(QueueFullError):
+        batcher.submit(3)
+    assert batcher.snapshot()["rejected"] == 1
+    model.release.set()
+    assert [future.result(timeout=5) for future in futures] == [0, 2, 4]
+
+
+def test_rejections_from_many_threads_are_all_counted():
+    model = GatedModel()
+    batcher = MicroBatcher(model, max_batch_size=1, max_wait_ms=1, max_queue_depth=1)
+    batcher.submit(0)
+    assert model.started.wait(timeout=5)
+    batcher.submit(1)
+
+    def flood():
+        for _ in range(500):
+            try:
+                batcher.submit(2)
+            except QueueFullError:
+                pass
+
+    threads = [threading.Thread(target=flood) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert batcher.snapshot()["rejected"] == 4000
+    model.release.set()
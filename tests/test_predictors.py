@@ -0,0 +1,166 @@
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from predictors import (
+    EnsemblePredictor,
+    HybridPredictor,
+    LocalKerasPredictor,
+    in_process_format,
+    load_calibration,
+    temperature_scale,
+)
+from utils import image_array
+
+
+class FailingPredictor:
+    name = "gemini"
+
+    def predict(self, image):
+        raise ConnectionError("Gemini unavailable")
+
+
+class FixedPredictor:
+    """Predictor stand-in that returns a fixed confidence and counts calls"""
+
+    def __init__(self, name, confidence=None, threshold=None):
+        self.name = name
+        self.confidence = confidence
+        self.threshold = threshold
+        self.calls = 0
+
+    def predict(self, image):
+        self.calls += 1
+        return {"backend": self.name, "confidence": self.confidence, "top_k": [(self.name, self.confidence)]}
+
+
+def test_hybrid_keeps_confident_local_answer():
+    local, remote = FixedPredictor("local", 0.9), FixedPredictor("gemini")
+    assert HybridPredictor(local, remote, threshold=0.6).predict(None)["backend"] == "local"
+    assert remote.calls == 0
+
+
+def test_hybrid_escalates_unsure_answer_with_local_candidates():
+    local, remote = FixedPredictor("local", 0.3), FixedPredictor("gemini")
+    result = HybridPredictor(local, remote, threshold=0.6).predict(None)
+    assert result["backend"] == "gemini"
+    assert result["top_k"] == [("local", 0.3)]
+
+
+def test_hybrid_keeps_local_answer_when_escalation_fails():
+    local = FixedPredictor("local", 0.3)
+    assert HybridPredictor(local, FailingPredictor(), threshold=0.6).predict(None)["backend"] == "local"
+
+
+def test_hybrid_uses_calibrated_threshold_of_local_model():
+    local, remote = FixedPredictor("local", 0.3, threshold=0.25), FixedPredictor("gemini")
+    hybrid = HybridPredictor(local, remote)
+    assert hybrid.threshold == 0.25
+    assert hybrid.predict(None)["backend"] == "local"
+
+
+def test_hybrid_keeps_calibrated_zero_threshold():
+    local, remote = FixedPredictor("local", 0.01, threshold=0.0), FixedPredictor("gemini")
+    hybrid = HybridPredictor(local, remote)
+    assert hybrid.threshold == 0.0
+    assert hybrid.predict(None)["backend"] == "local"
+    assert remote.calls == 0
+
+
+class ArrayModel:
+    """Ensemble member stand-in with a fixed softmax row for every image"""
+
+    def __init__(self, probs, class_names=("a", "b", "c")):
+        self.probs = np.array(probs)
+        self.class_names = list(class_names)
+        self.breed_data = {}
+
+    def predict_arrays(self, arrays):
+        return np.tile(self.probs, (len(arrays), 1))
+
+
+def test_temperature_scale_keeps_ranking_and_softens():
+    probs = np.array([0.7, 0.2, 0.1])
+    np.testing.assert_allclose(temperature_scale(probs, 1.0), probs)
+    softened = temperature_scale(probs, 2.0)
+    assert softened.sum() == pytest.approx(1.0)
+    assert list(np.argsort(softened)) == list(np.argsort(probs))
+    assert softened.max() < probs.max()
+
+
+def test_ensemble_averages_members_then_scales():
+    members = [ArrayModel([0.6, 0.3, 0.1]), ArrayModel([0.2, 0.7, 0.1])]
+    ensemble = EnsemblePredictor(members, tta=True, calibration={"temperature": 1.5, "threshold": 0.4})
+    arrays = np.zeros((2, 4, 4, 3), dtype=np.uint8)
+    expected = temperature_scale(np.array([0.4, 0.5, 0.1]), 1.5)
+    np.testing.assert_allclose(ensemble.predict_arrays(arrays), [expected, expected], atol=1e-6)
+    assert ensemble.threshold == 0.4
+
+
+def test_ensemble_members_must_share_classes():
+    with pytest.raises(ValueError):
+        EnsemblePredictor([ArrayModel([1, 0, 0]), ArrayModel([1, 0, 0], class_names=("a", "b", "d"))],
+                          calibration={})
+
+
+def channel_means(batch):
+    return np.asarray(batch).mean(axis=(1, 2))
+
+
+def stub_predictor(preprocessing):
+    predictor = LocalKerasPredictor.__new__(LocalKerasPredictor)
+    predictor.preprocessing = preprocessing
+    predictor.run_model = channel_means
+    return predictor
+
+
+def test_predict_images_uses_member_preprocessing():
+    images = [Image.new("RGB", (300, 200), color) for color in [(255, 0, 0), (10, 120, 240), (0, 0, 0)]]
+    for preprocessing in ["resnet50", "mobilenet_v2"]:
+        predictor = stub_predictor(preprocessing)
+        batched = np.array(list(predictor.predict_images(images, batch_size=2)))
+        single = predictor.predict_arrays(np.stack([image_array(image) for image in images]))
+        np.testing.assert_allclose(batched, single, atol=1e-3)
+
+
+def write_calibration(path, **fields):
+    calibration = {"temperature": 1.5, "threshold": 0.7, "model_format": "keras", "ensemble": "", "tta": True}
+    calibration.update(fields)
+    path.write_text(json.dumps(calibration))
+    return str(path)
+
+
+def test_calibration_applies_to_matching_setup(tmp_path):
+    path = write_calibration(tmp_path / "calibration.json")
+    assert load_calibration(path, model_format="keras", ensemble="", tta=True)["temperature"] == 1.5
+
+
+def test_stale_calibration_is_ignored(tmp_path):
+    path = write_calibration(tmp_path / "calibration.json", ensemble="models/m.h5=mobilenet_v2")
+    assert load_calibration(path, model_format="keras", ensemble="", tta=True) == {}
+    assert load_calibration(path, model_format="keras", ensemble="models/m.h5=mobilenet_v2", tta=False) == {}
+    assert load_calibration(path, model_format="tflite", ensemble="models/m.h5=mobilenet_v2", tta=True) == {}
+    assert load_calibration(path, model_format="keras", ensemble=" models/m.h5=mobilenet_v2 ", tta=True)
+
+
+def test_missing_calibration(tmp_path):
+    assert load_calibration(str(tmp_path / "missing.json")) == {}
+
+
+def test_in_process_format_never_returns_server():
+    assert in_process_format("server") == "keras"
+    assert in_process_format("tflite") == "tflite"
+
+
+def test_predict_many_returns_prediction_dicts():
+    predictor = stub_predictor("resnet50")
+    predictor.class_names = ["blue", "green", "red"]
+    predictor.breed_data = {}
+    predictor.top_k = 2
+    images = [Image.new("RGB", (64, 64), (255, 0, 0)), Image.new("RGB", (64, 64), (0, 0, 255))]
+    predictions = list(predictor.predict_many(images, batch_size=4))
+    assert [p["top_k"][0][0] for p in predictions] == ["red", "blue"]
+    assert [p["report"].breed for p in predictions] == ["red", "blue"]
+    assert all(p["backend"] == "local" and len(p["top_k"]) == 2 for p in predictions)
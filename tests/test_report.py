@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from report import AnimalReport, parse_markdown_report, parse_report, section_complete
+
+REPORT = {
+    "is_animal": True,
+    "animal": "Dog",
+    "breed": "Beagle",
+    "physical_characteristics": ["Medium-sized hound"],
+    "temperament": ["Friendly"],
+    "care_requirements": ["Daily walks"],
+    "safety": {"danger_level": "low", "potential_risks": ["May nip during play"], "safety_precautions": []},
+    "additional_information": "Bred as scent hounds.",
+    "facts": ["Beagles have about 220 million scent receptors"],
+}
+
+LEGACY = """**Animal:** Dog
+**Breed:** Beagle
+
+**Physical Characteristics:**
+- Medium-sized hound
+
+**Safety Assessment:**
+- **Danger level:** Low
+- May nip during play
+
+**Additional Information:**
+Beagles were bred as scent hounds.
+"""
+
+STREAMED = """**Animal:** Dog
+**Breed:** Beagle
+
+**Physical Characteristics:**
+- Medium-sized hound
+
+**Safety Assessment:**
+- Danger level: Low
+
+**Potential Risks:**
+- May nip during play
+
+**Safety Precautions:**
+- Keep on a leash outdoors
+- Supervise around small pets
+
+**Additional Information:**
+Beagles were bred as scent hounds.
+"""
+
+
+def test_parse_report_from_json():
+    report = parse_report(json.dumps(REPORT))
+    assert (report.animal, report.breed, report.safety.danger_level) == ("Dog", "Beagle", "Low")
+    assert report.facts == REPORT["facts"]
+
+
+def test_parse_report_strips_json_fence():
+    assert parse_report(f"```json\n{json.dumps(REPORT)}\n```").breed == "Beagle"
+
+
+def test_report_round_trips_through_dict():
+    report = parse_report(REPORT)
+    assert AnimalReport.from_dict(report.to_dict()) == report
+    assert report.summary() == {"animal": "Dog", "breed": "Beagle", "danger_level": "Low"}
+
+
+def test_parse_report_reads_legacy_markdown():
+    report = parse_report(LEGACY)
+    assert (report.animal, report.breed) == ("Dog", "Beagle")
+    assert report.physical_characteristics == ["Medium-sized hound"]
+    assert report.safety.danger_level == "Low"
+    assert report.safety.potential_risks == ["May nip during play"]
+
+
+def test_parse_report_without_sections_is_not_an_animal():
+    report = parse_report("I can't see an animal in this image.")
+    assert not report.is_animal
+    assert report.additional_information == "I can't see an animal in this image."
+
+
+def test_section_complete_once_next_header_starts():
+    partial = LEGACY[:LEGACY.index("**Additional")]
+    assert section_complete(partial, "breed")
+    assert not section_complete(partial, "safety assessment")
+    assert section_complete(LEGACY, "safety assessment")
+
+
+def test_markdown_safety_sections_parse_into_their_own_fields():
+    safety = parse_markdown_report(STREAMED).safety
+    assert safety.danger_level == "Low"
+    assert safety.potential_risks == ["May nip during play"]
+    assert safety.safety_precautions == ["Keep on a leash outdoors", "Supervise around small pets"]
+
+
+def test_markdown_unlabeled_safety_bullets_are_risks():
+    text = "**Animal:** Cat\n\n**Safety Assessment:**\n- **Danger level:** Medium\n- May scratch\n"
+    safety = parse_markdown_report(text).safety
+    assert safety.danger_level == "Medium"
+    assert safety.potential_risks == ["May scratch"]
+    assert safety.safety_precautions == []
+
+
+def test_safety_section_complete_only_after_precautions():
+    partial = STREAMED[:STREAMED.index("- Supervise")]
+    assert not section_complete(partial, "safety assessment")
+    assert section_complete(STREAMED, "safety assessment")
+
+
+def test_parse_report_rejects_invalid_json_report():
+    with pytest.raises(ValueError):
+        parse_report('{"is_animal": "yes", "animal": "Dog"}')
+    with pytest.raises(ValueError):
+        parse_report('```json\n{"animal": "Dog", "temperament": {"calm": true}}\n```')
+
+
+def test_parse_report_falls_back_to_markdown_for_non_json():
+    assert parse_report(STREAMED).breed == "Beagle"
@@ -0,0 +1,195 @@
+import threading
+import time
+
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, ResilientCaller, hedged_call
+
+
+class CountingLimiter:
+    """Rate limiter stand-in that counts tokens; try_acquire succeeds while free tokens remain"""
+
+    def __init__(self, free=0):
+        self.free = free
+        self.acquired = 0
+        self.tried = 0
+        self.granted = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self.acquired += 1
+
+    def try_acquire(self):
+        with self._lock:
+            self.tried += 1
+            if self.free > 0:
+                self.free -= 1
+                self.granted += 1
+                return True
+            return False
+
+
+class Retryable(Exception):
+    code = 503
+
+
+def slow_then_fast(delay):
+    """fn whose first call sleeps for delay and whose later calls return at once"""
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            calls.append(None)
+            first = len(calls) == 1
+        if first:
+            time.sleep(delay)
+            return "slow"
+        return "fast"
+
+    return fn, calls
+
+
+def primed_caller(p95_seconds, **kwargs):
+    caller = ResilientCaller(hedge=True, **kwargs)
+    caller.latency.samples.extend([p95_seconds] * caller.latency.min_samples)
+    return caller
+
+
+# hedged_call
+
+def test_hedged_call_returns_result_without_hedging():
+    hedges = []
+    assert hedged_call(lambda x: x * 2, 21, timeout=1.0, hedge_after=0.5, on_hedge=lambda: hedges.append(1)) == 42
+    assert hedges == []
+
+
+def test_hedged_call_sends_duplicate_after_hedge_delay():
+    fn, calls = slow_then_fast(0.5)
+    assert hedged_call(fn, timeout=2.0, hedge_after=0.05) == "fast"
+    assert len(calls) == 2
+
+
+def test_hedged_call_skips_duplicate_when_on_hedge_refuses():
+    fn, calls = slow_then_fast(0.2)
+    assert hedged_call(fn, timeout=2.0, hedge_after=0.05, on_hedge=lambda: False) == "slow"
+    assert len(calls) == 1
+
+
+def test_hedged_call_raises_error_of_failed_call():
+    def fail():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        hedged_call(fail, timeout=1.0)
+
+
+def test_hedged_call_deadline():
+    with pytest.raises(DeadlineExceeded):
+        hedged_call(time.sleep, 0.5, timeout=0.05)
+
+
+# CircuitBreaker
+
+def test_breaker_trips_on_failure_rate():
+    breaker = CircuitBreaker(failure_rate=0.5, window=10, min_calls=4, cooldown=60)
+    for _ in range(2):
+        breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.trips == 1
+
+
+def test_breaker_waits_for_min_calls():
+    breaker = CircuitBreaker(failure_rate=0.5, window=10, min_calls=4, cooldown=60)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_half_open_allows_one_probe():
+    breaker = CircuitBreaker(failure_rate=0.5, window=10, min_calls=1, cooldown=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_reopens_when_probe_fails():
+    breaker = CircuitBreaker(failure_rate=0.5, window=10, min_calls=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 2
+
+
+def test_caller_rejects_while_open():
+    breaker = CircuitBreaker(min_calls=1, cooldown=60)
+    breaker.record_failure()
+    caller = ResilientCaller(breaker=breaker)
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        caller.call(calls.append, 1)
+    assert calls == []
+    assert caller.stats["rejected"] == 1
+
+
+# Token accounting
+
+def test_one_token_per_call_without_hedges():
+    limiter = CountingLimiter(free=100)
+    caller = primed_caller(p95_seconds=10.0)
+    for i in range(10):
+        assert caller.call(lambda x: x, i, rate_limiter=limiter) == (i, 1)
+    assert limiter.acquired == 10
+    assert limiter.granted == 0
+    assert caller.stats["hedged"] == 0
+
+
+def test_hedge_takes_a_token_when_sent():
+    limiter = CountingLimiter(free=1)
+    caller = primed_caller(p95_seconds=0.05)
+    fn, calls = slow_then_fast(0.5)
+    assert caller.call(fn, rate_limiter=limiter) == ("fast", 1)
+    assert len(calls) == 2
+    assert (limiter.acquired, limiter.granted) == (1, 1)
+    assert caller.stats["hedged"] == 1
+
+
+def test_hedge_skipped_without_free_token():
+    limiter = CountingLimiter(free=0)
+    caller = primed_caller(p95_seconds=0.05)
+    fn, calls = slow_then_fast(0.2)
+    assert caller.call(fn, rate_limiter=limiter) == ("slow", 1)
+    assert len(calls) == 1
+    assert limiter.tried == 1
+    assert caller.stats["hedged"] == 0
+
+
+def test_every_retry_takes_a_token(monkeypatch):
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: 0.0)
+    limiter = CountingLimiter()
+    caller = ResilientCaller(max_attempts=4)
+    outcomes = [Retryable(), Retryable(), "ok"]
+
+    def fn():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert caller.call(fn, rate_limiter=limiter) == ("ok", 3)
+    assert limiter.acquired == 3
+    assert caller.stats["retries"] == 2
@@ -0,0 +1,37 @@
+import numpy as np
+
+from similarity import EmbeddingIndex
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_search_returns_most_similar_first(tmp_path):
+    index = EmbeddingIndex(str(tmp_path))
+    for name, vector in [("x", unit(1, 0, 0)), ("y", unit(0, 1, 0)), ("xy", unit(1, 1, 0))]:
+        index.add(vector, {"name": name})
+    results = index.search(unit(1, 0.1, 0), k=2)
+    assert [metadata["name"] for _, metadata in results] == ["x", "xy"]
+    assert results[0][0] > results[1][0]
+
+
+def test_entries_survive_reopen(tmp_path):
+    index = EmbeddingIndex(str(tmp_path))
+    index.add(unit(0, 0, 1), {"name": "z"})
+    index.save()
+    reopened = EmbeddingIndex(str(tmp_path))
+    assert len(reopened) == 1
+    assert reopened.search(unit(0, 0, 1), k=1)[0][1]["name"] == "z"
+
+
+def test_torn_write_is_truncated_on_open(tmp_path):
+    index = EmbeddingIndex(str(tmp_path))
+    index.add(unit(1, 0, 0), {"name": "x"})
+    with open(index.vectors_path, 'ab') as f:
+        f.write(unit(0, 1, 0).tobytes())
+    reopened = EmbeddingIndex(str(tmp_path))
+    assert len(reopened) == 1
+    reopened.add(unit(0, 1, 0), {"name": "y"})
+    assert EmbeddingIndex(str(tmp_path)).search(unit(0, 1, 0), k=1)[0][1]["name"] == "y"
@@ -0,0 +1,36 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from utils import iter_preprocessed_batches, predict_batches, preprocess_image
+
+
+def jpeg(color, size=(640, 480)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_batches_have_fixed_size_and_real_row_count():
+    images = [Image.new("RGB", (300, 200), (i * 40, 0, 0)) for i in range(5)]
+    shapes, counts = [], []
+    for batch, count in iter_preprocessed_batches(images, batch_size=2):
+        shapes.append(batch.shape)
+        counts.append(count)
+        assert not batch[count:].any()
+    assert counts == [2, 2, 1]
+    assert len(set(shapes)) == 1 and shapes[0][0] == 2
+
+
+def test_predict_batches_matches_single_image_preprocessing():
+    images = [Image.new("RGB", (300, 200), color) for color in [(255, 0, 0), (10, 120, 240), (0, 0, 0)]]
+    rows = list(predict_batches(lambda batch: batch.mean(axis=(1, 2)), images, batch_size=2))
+    expected = [preprocess_image(image)[0].mean(axis=(0, 1)) for image in images]
+    np.testing.assert_allclose(rows, expected, atol=1e-3)
+
+
+def test_encoded_images_are_decoded():
+    (batch, count), = iter_preprocessed_batches([jpeg((200, 100, 50)), jpeg((0, 0, 0))], batch_size=2)
+    assert count == 2
+    assert batch[0].mean() > batch[1].mean()
@@ -1,16 +1,20 @@
 # Complete training script for Oxford-IIIT Pets dataset
 import tensorflow as tf
 from tensorflow.keras.applications import ResNet50
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
+from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout, Input
 from tensorflow.keras.models import Model
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 import numpy as np
+import argparse
+import hashlib
 import pickle
 import json
 import os
+import shutil
 import sys
+import tempfile
+import time
 
 # Add the parent directory to the path so we can import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -21,40 +25,245 @@ from utils import generate_breed_info
 tf.random.set_seed(42)
 np.random.seed(42)
 
-def load_and_preprocess_data():
+AUTOTUNE = tf.data.AUTOTUNE
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def cpu_supports_bfloat16():
+    """True when the CPU has native bfloat16 instructions (AVX512-BF16 or AMX)"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+def configure_runtime(intra_op_threads=TRAIN_INTRA_OP_THREADS, inter_op_threads=TRAIN_INTER_OP_THREADS,
+                      mixed_precision=TRAIN_MIXED_PRECISION):
+    """Set the thread pools and dtype policy; must run before TensorFlow executes any op"""
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    if mixed_precision:
+        # Without native support bfloat16 is emulated and slower than float32
+        if cpu_supports_bfloat16():
+            tf.keras.mixed_precision.set_global_policy("mixed_bfloat16")
+            print("Training with mixed_bfloat16 precision")
+        else:
+            print("This CPU has no native bfloat16 support (AVX512-BF16/AMX), training in float32")
+
+def get_strategy(name=TRAIN_STRATEGY):
+    """The default single-process strategy, or MultiWorkerMirroredStrategy over the TF_CONFIG cluster"""
+    if name == "multi_worker":
+        return tf.distribute.MultiWorkerMirroredStrategy()
+    if name != "default":
+        raise ValueError(f"Unknown training strategy: {name}")
+    return tf.distribute.get_strategy()
+
+def worker_info(strategy):
+    """Return (rank, number of workers, is_chief) for this process; the chief has rank 0"""
+    if not isinstance(strategy, tf.distribute.MultiWorkerMirroredStrategy):
+        return 0, 1, True
+    resolver = strategy.cluster_resolver
+    cluster = resolver.cluster_spec().as_dict()
+    roles = cluster.get("chief", []) + cluster.get("worker", [])
+    if not roles:
+        return 0, 1, True
+    # Workers are numbered after the chief; without a chief, worker 0 acts as chief
+    offset = len(cluster.get("chief", [])) if resolver.task_type == "worker" else 0
+    rank = resolver.task_id + offset
+    return rank, len(roles), rank == 0
+
+def list_image_files(images_dir=IMAGES_DIR, validation_split=0.2, seed=42):
+    """List images per class subdirectory and split them once, deterministically"""
+    class_names = sorted(
+        name for name in os.listdir(images_dir) if os.path.isdir(os.path.join(images_dir, name))
+    )
+    paths, labels = [], []
+    for index, name in enumerate(class_names):
+        class_dir = os.path.join(images_dir, name)
+        for filename in sorted(os.listdir(class_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(class_dir, filename))
+                labels.append(index)
+    
+    # A seeded permutation gives the same split on every run without listing the directory twice
+    order = np.random.default_rng(seed).permutation(len(paths))
+    paths = np.array(paths)[order]
+    labels = np.array(labels)[order]
+    split = int(len(paths) * (1 - validation_split))
+    return (paths[:split], labels[:split]), (paths[split:], labels[split:]), class_names
+
+def decode_image(path, label):
+    """Read, decode and resize one image; kept as uint8 so the on-disk cache stays small"""
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, IMG_SIZE)
+    image = tf.cast(tf.clip_by_value(image, 0, 255), tf.uint8)
+    return image, tf.one_hot(label, NUM_CLASSES)
+
+def build_augmentation():
+    """Vectorized augmentation layers applied to whole batches"""
+    return tf.keras.Sequential([
+        tf.keras.layers.RandomFlip("horizontal"),
+        tf.keras.layers.RandomZoom(0.2),
+        tf.keras.layers.RandomRotation(0.05),
+    ], name="augmentation")
+
+def build_dataset(paths, labels, cache_name, training, seed=42):
+    """Parallel decode -> disk cache -> shuffle -> batch -> augment -> preprocess -> prefetch"""
+    # tf.data replays a cache file without checking its source, so the file list and image size
+    # are part of the name; a changed dataset, split or worker count gets a fresh cache
+    fingerprint = hashlib.sha256(
+        "\n".join(f"{path}\t{label}" for path, label in zip(paths, labels)).encode()
+        + str(IMG_SIZE).encode()
+    ).hexdigest()[:16]
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    dataset = dataset.map(decode_image, num_parallel_calls=AUTOTUNE)
+    dataset = dataset.cache(os.path.join(TF_CACHE_DIR, f"{cache_name}_{fingerprint}"))
+    if training:
+        dataset = dataset.shuffle(2048, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(BATCH_SIZE, num_parallel_calls=AUTOTUNE)
+    
+    augmentation = build_augmentation() if training else None
+    
+    def preprocess(images, labels):
+        images = tf.cast(images, tf.float32)
+        if augmentation is not None:
+            images = augmentation(images, training=True)
+        # Same preprocessing as utils.preprocess_image uses at inference time
+        return tf.keras.applications.resnet50.preprocess_input(images), labels
+    
+    dataset = dataset.map(preprocess, num_parallel_calls=AUTOTUNE)
+    return dataset.prefetch(AUTOTUNE)
+
+def shard(paths, labels, rank, num_workers):
+    """This worker's slice of the files, equal in size on every worker so step counts match"""
+    per_worker = len(paths) // num_workers
+    return paths[rank::num_workers][:per_worker], labels[rank::num_workers][:per_worker]
+
+def load_and_preprocess_data(rank=0, num_workers=1, seed=42):
     """Load and preprocess the Oxford-IIIT Pets dataset"""
     print("Loading and preprocessing data...")
     
-    # Create data generators
-    train_datagen = ImageDataGenerator(
-        rescale=1./255,
-        shear_range=0.2,
-        zoom_range=0.2,
-        horizontal_flip=True,
-        validation_split=0.2  # Use 20% for validation
-    )
+    (train_paths, train_labels), (val_paths, val_labels), class_names = list_image_files()
+    print(f"Found {len(train_paths)} training and {len(val_paths)} validation images "
+          f"in {len(class_names)} classes")
     
-    # Load images from directory
-    train_generator = train_datagen.flow_from_directory(
-        IMAGES_DIR,
-        target_size=IMG_SIZE,
-        batch_size=BATCH_SIZE,
-        class_mode='categorical',
-        subset='training'
-    )
+    suffix = ""
+    if num_workers > 1:
+        # Each worker decodes and caches only its own files instead of reading all and discarding most
+        train_paths, train_labels = shard(train_paths, train_labels, rank, num_workers)
+        val_paths, val_labels = shard(val_paths, val_labels, rank, num_workers)
+        suffix = f"_worker{rank}"
+        print(f"Worker {rank} of {num_workers}: {len(train_paths)} training images")
     
-    validation_generator = train_datagen.flow_from_directory(
-        IMAGES_DIR,
-        target_size=IMG_SIZE,
-        batch_size=BATCH_SIZE,
-        class_mode='categorical',
-        subset='validation'
-    )
+    train_dataset = build_dataset(train_paths, train_labels, "train" + suffix, training=True, seed=seed)
+    validation_dataset = build_dataset(val_paths, val_labels, "validation" + suffix, training=False)
     
-    # Get class names
-    class_names = list(train_generator.class_indices.keys())
+    if num_workers > 1:
+        options = tf.data.Options()
+        options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+        train_dataset = train_dataset.with_options(options)
+        validation_dataset = validation_dataset.with_options(options)
     
-    return train_generator, validation_generator, class_names
+    return train_dataset, validation_dataset, class_names
+
+def measure_throughput(dataset, max_batches=None):
+    """Iterate a dataset once and return images/sec"""
+    images = 0
+    started = time.perf_counter()
+    for batch_images, _ in dataset.take(max_batches or -1):
+        images += int(batch_images.shape[0])
+    return images / (time.perf_counter() - started)
+
+def benchmark_input_pipeline(epochs=2, max_batches=None):
+    """Report input pipeline images/sec; the first epoch fills the cache, later ones read from it"""
+    train_dataset, _, _ = load_and_preprocess_data()
+    for epoch in range(1, epochs + 1):
+        print(f"Epoch {epoch}: {measure_throughput(train_dataset, max_batches):.1f} images/sec")
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """Log training images/sec at the end of every epoch"""
+    
+    def __init__(self, num_images):
+        super().__init__()
+        self.num_images = num_images
+    
+    def on_epoch_begin(self, epoch, logs=None):
+        self.started = time.perf_counter()
+    
+    def on_epoch_end(self, epoch, logs=None):
+        images_per_sec = self.num_images / (time.perf_counter() - self.started)
+        if logs is not None:
+            logs["images_per_sec"] = images_per_sec
+        print(f" - {images_per_sec:.1f} images/sec")
+
+# Callback fields that carry progress across epochs: best metric value and patience counters
+CALLBACK_STATE = ("best", "wait", "cooldown_counter", "best_epoch")
+
+def callback_state_variable(callbacks):
+    """Checkpointable float64 matrix of CALLBACK_STATE per callback; NaN means nothing saved yet"""
+    return tf.Variable(np.full((len(callbacks), len(CALLBACK_STATE)), np.nan))
+
+class ResumableCheckpoint(tf.keras.callbacks.Callback):
+    """Save model, optimizer, epoch, RNG and callback state in TF checkpoint format after every epoch
+
+    Keras callbacks start every fit() with best=inf and zero patience, so a resumed run would
+    overwrite the best weights with its first epoch. The state of the `tracked` callbacks is kept
+    in checkpoint.callback_state and put back when training starts. List this callback after them.
+    """
+    
+    def __init__(self, checkpoint, directory, tracked=(), max_to_keep=CHECKPOINT_MAX_TO_KEEP):
+        super().__init__()
+        self.checkpoint = checkpoint
+        self.tracked = list(tracked)
+        self.manager = tf.train.CheckpointManager(checkpoint, directory, max_to_keep=max_to_keep)
+    
+    def on_train_begin(self, logs=None):
+        # Runs after the tracked callbacks have reset themselves
+        for callback, values in zip(self.tracked, self.checkpoint.callback_state.numpy()):
+            for name, value in zip(CALLBACK_STATE, values):
+                if hasattr(callback, name) and not np.isnan(value):
+                    setattr(callback, name, float(value) if name == "best" else int(value))
+    
+    def on_epoch_end(self, epoch, logs=None):
+        self.checkpoint.callback_state.assign([
+            [float(getattr(callback, name, np.nan)) for name in CALLBACK_STATE] for callback in self.tracked
+        ])
+        self.checkpoint.epoch.assign(epoch + 1)
+        path = self.manager.save(checkpoint_number=epoch + 1)
+        print(f" - checkpoint saved to {path}")
+
+def restore_checkpoint(checkpoint, directory=CHECKPOINT_DIR):
+    """Restore the latest checkpoint in directory, returning the epoch to resume from"""
+    latest = tf.train.latest_checkpoint(directory)
+    if latest is None:
+        return 0
+    # Optimizer slot variables do not exist yet; their values are restored when first created
+    checkpoint.restore(latest)
+    print(f"Resuming from {latest} at epoch {int(checkpoint.epoch)}")
+    return int(checkpoint.epoch)
+
+def _float32_config(config):
+    """Copy of a model config with every layer dtype policy replaced by float32"""
+    if isinstance(config, dict):
+        return {key: "float32" if key == "dtype" and value is not None else _float32_config(value)
+                for key, value in config.items()}
+    if isinstance(config, list):
+        return [_float32_config(item) for item in config]
+    return config
+
+def export_float32(model):
+    """Return a float32 copy of a mixed precision model, so inference does not depend on bfloat16"""
+    policy = tf.keras.mixed_precision.global_policy()
+    if policy.name == "float32":
+        return model
+    tf.keras.mixed_precision.set_global_policy("float32")
+    try:
+        exported = tf.keras.Model.from_config(_float32_config(model.get_config()))
+    finally:
+        tf.keras.mixed_precision.set_global_policy(policy)
+    # Mixed precision keeps variables in float32, so the weights copy over unchanged
+    exported.set_weights(model.get_weights())
+    return exported
 
 def create_model():
     """Create the model architecture"""
@@ -72,7 +281,8 @@ def create_model():
     x = GlobalAveragePooling2D()(x)
     x = Dense(1024, activation='relu')(x)
     x = Dropout(0.5)(x)
-    predictions = Dense(NUM_CLASSES, activation='softmax')(x)
+    # The softmax stays float32 under mixed precision so the loss is numerically stable
+    predictions = Dense(NUM_CLASSES, activation='softmax', dtype='float32')(x)
     
     # Create the model
     model = Model(inputs=base_model.input, outputs=predictions)
@@ -86,33 +296,129 @@ def create_model():
     
     return model
 
-def train_model():
-    """Train the model"""
-    print("Starting model training...")
+def create_feature_extractor():
+    """Frozen ResNet50 backbone ending in the same GlobalAveragePooling2D as create_model"""
+    base_model = ResNet50(weights='imagenet', include_top=False, input_shape=(IMG_SIZE[0], IMG_SIZE[1], 3))
+    base_model.trainable = False
+    features = GlobalAveragePooling2D()(base_model.output)
+    return Model(inputs=base_model.input, outputs=features), base_model
+
+def create_head(feature_dim):
+    """The Dense/Dropout classifier head from create_model, taking pooled features as input"""
+    inputs = Input(shape=(feature_dim,))
+    x = Dense(1024, activation='relu')(inputs)
+    x = Dropout(0.5)(x)
+    predictions = Dense(NUM_CLASSES, activation='softmax', dtype='float32')(x)
+    head = Model(inputs=inputs, outputs=predictions, name="head")
+    head.compile(
+        optimizer=Adam(learning_rate=0.001),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    return head
+
+def extract_features(extractor, paths, labels, name):
+    """Run the frozen backbone once and store embeddings in a memory-mapped .npy file
+
+    Reuses the stored features when they were computed for exactly the same file list.
+    """
+    features_path = os.path.join(FEATURES_DIR, f"{name}_features.npy")
+    labels_path = os.path.join(FEATURES_DIR, f"{name}_labels.npy")
+    meta_path = os.path.join(FEATURES_DIR, f"{name}_meta.json")
+    fingerprint = hashlib.sha256("\n".join(paths).encode()).hexdigest()
     
-    # Load data
-    train_generator, validation_generator, class_names = load_and_preprocess_data()
+    if os.path.exists(meta_path) and os.path.exists(features_path):
+        with open(meta_path) as f:
+            if json.load(f).get("fingerprint") == fingerprint:
+                print(f"Using cached {name} features from {features_path}")
+                return np.load(features_path, mmap_mode='r'), np.load(labels_path, mmap_mode='r')
     
-    # Create model
-    model = create_model()
+    print(f"Extracting {name} features for {len(paths)} images...")
+    feature_dim = extractor.output_shape[-1]
+    features = np.lib.format.open_memmap(features_path, mode='w+', dtype=np.float32,
+                                         shape=(len(paths), feature_dim))
+    dataset = build_dataset(paths, labels, name, training=False)
+    offset = 0
+    started = time.perf_counter()
+    for images, _ in dataset:
+        batch_features = extractor(images, training=False).numpy()
+        features[offset:offset + len(batch_features)] = batch_features
+        offset += len(batch_features)
+    features.flush()
+    print(f"Extracted {offset} embeddings ({offset / (time.perf_counter() - started):.1f} images/sec)")
     
-    # Callbacks
-    callbacks = [
-        EarlyStopping(patience=10, restore_best_weights=True),
-        ModelCheckpoint(MODEL_PATH, save_best_only=True),
-        ReduceLROnPlateau(factor=0.2, patience=5)
-    ]
+    np.save(labels_path, tf.one_hot(labels, NUM_CLASSES).numpy())
+    # Written last, so an interrupted extraction is never mistaken for a complete one
+    with open(meta_path, 'w') as f:
+        json.dump({"fingerprint": fingerprint, "count": len(paths)}, f)
+    return np.load(features_path, mmap_mode='r'), np.load(labels_path, mmap_mode='r')
+
+def fine_tune(model, base_model, train_dataset, validation_dataset, epochs):
+    """Unfreeze the last ResNet50 stage (conv5) and train end to end with a low learning rate"""
+    print(f"Fine-tuning the top backbone blocks for {epochs} epochs...")
+    base_model.trainable = True
+    for layer in base_model.layers:
+        # BatchNormalization stays frozen so its running statistics are not disturbed
+        layer.trainable = layer.name.startswith("conv5_") and not isinstance(
+            layer, tf.keras.layers.BatchNormalization)
+    model.compile(
+        optimizer=Adam(learning_rate=FINE_TUNE_LEARNING_RATE),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    model.fit(
+        train_dataset,
+        epochs=epochs,
+        validation_data=validation_dataset,
+        callbacks=[
+            EarlyStopping(patience=3, restore_best_weights=True),
+            ThroughputLogger(int(train_dataset.cardinality()) * BATCH_SIZE)
+        ],
+        verbose=1
+    )
+
+def train_with_feature_cache(fine_tune_epochs=0):
+    """Train only the head on precomputed backbone features, optionally fine-tuning afterwards"""
+    print("Starting feature-cache training...")
     
-    # Train the model
-    history = model.fit(
-        train_generator,
+    (train_paths, train_labels), (val_paths, val_labels), class_names = list_image_files()
+    extractor, base_model = create_feature_extractor()
+    train_features, train_onehot = extract_features(extractor, train_paths, train_labels, "train")
+    val_features, val_onehot = extract_features(extractor, val_paths, val_labels, "validation")
+    
+    head = create_head(train_features.shape[1])
+    head.fit(
+        train_features,
+        train_onehot,
+        batch_size=BATCH_SIZE,
         epochs=EPOCHS,
-        validation_data=validation_generator,
-        callbacks=callbacks,
-        verbose=1
+        shuffle=True,
+        validation_data=(val_features, val_onehot),
+        callbacks=[
+            EarlyStopping(patience=10, restore_best_weights=True),
+            ReduceLROnPlateau(factor=0.2, patience=5)
+        ],
+        verbose=2
+    )
+    
+    # Stack the trained head on the backbone so the saved model takes images like create_model's
+    model = Model(inputs=extractor.input, outputs=head(extractor.output))
+    model.compile(
+        optimizer=Adam(learning_rate=0.001),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
     )
     
-    # Save class names
+    if fine_tune_epochs > 0:
+        train_dataset = build_dataset(train_paths, train_labels, "train", training=True)
+        validation_dataset = build_dataset(val_paths, val_labels, "validation", training=False)
+        fine_tune(model, base_model, train_dataset, validation_dataset, fine_tune_epochs)
+    
+    export_float32(model).save(MODEL_PATH)
+    save_artifacts(class_names)
+
+def save_artifacts(class_names):
+    """Save class names and breed info next to a freshly trained model"""
     with open(CLASS_NAMES_PATH, 'wb') as f:
         pickle.dump(class_names, f)
     
@@ -124,9 +430,101 @@ def train_model():
     print(f"Model saved to: {MODEL_PATH}")
     print(f"Class names saved to: {CLASS_NAMES_PATH}")
 
+def train_model(strategy=None, fresh=False):
+    """Train the model, resuming from the last epoch checkpoint of an interrupted run"""
+    print("Starting model training...")
+    strategy = strategy or tf.distribute.get_strategy()
+    rank, num_workers, is_chief = worker_info(strategy)
+    
+    # Create model; variables are mirrored across workers when distributed
+    with strategy.scope():
+        model = create_model()
+    
+    if fresh and is_chief:
+        shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
+    
+    # Every worker takes part in saving mirrored variables, but only the chief's files are kept
+    checkpoint_dir = CHECKPOINT_DIR if is_chief else tempfile.mkdtemp(prefix="checkpoints_")
+    best_weights_path = os.path.join(checkpoint_dir, "best.weights.h5")
+    
+    # Their best val_loss and patience are checkpointed, so a resumed run keeps the earlier best weights
+    tracked_callbacks = [
+        EarlyStopping(patience=10, restore_best_weights=True),
+        ModelCheckpoint(best_weights_path, save_best_only=True, save_weights_only=True),
+        ReduceLROnPlateau(factor=0.2, patience=5),
+    ]
+    checkpoint = tf.train.Checkpoint(model=model, optimizer=model.optimizer,
+                                     epoch=tf.Variable(0, dtype=tf.int64),
+                                     rng=tf.random.Generator.from_seed(42),
+                                     callback_state=callback_state_variable(tracked_callbacks))
+    initial_epoch = 0 if fresh else restore_checkpoint(checkpoint)
+    
+    # Seeds come from the checkpointed generator, so a resumed run does not replay the first epochs
+    seed = int(checkpoint.rng.make_seeds(1)[0, 0]) % 2**31
+    tf.random.set_seed(seed)
+    
+    # Load data
+    train_dataset, validation_dataset, class_names = load_and_preprocess_data(rank, num_workers, seed)
+    
+    # Callbacks
+    callbacks = [
+        *tracked_callbacks,
+        ThroughputLogger(int(train_dataset.cardinality()) * BATCH_SIZE * num_workers),
+        ResumableCheckpoint(checkpoint, checkpoint_dir, tracked=tracked_callbacks)
+    ]
+    
+    # Train the model
+    history = model.fit(
+        train_dataset,
+        epochs=EPOCHS,
+        initial_epoch=initial_epoch,
+        validation_data=validation_dataset,
+        callbacks=callbacks,
+        verbose=1 if is_chief else 0
+    )
+    
+    if os.path.exists(best_weights_path):
+        model.load_weights(best_weights_path)
+    if not is_chief:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        return
+    export_float32(model).save(MODEL_PATH)
+    save_artifacts(class_names)
+    # A finished run must not be picked up as an interrupted one by the next
+    shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the breed classifier")
+    parser.add_argument("--mode", choices=["full", "features"], default="full",
+                        help="'features' runs the frozen backbone once and trains only the head")
+    parser.add_argument("--fine-tune-epochs", type=int, default=0,
+                        help="in features mode, fine-tune the top backbone blocks for this many epochs")
+    parser.add_argument("--benchmark-input", action="store_true",
+                        help="only measure input pipeline throughput in images/sec")
+    parser.add_argument("--benchmark-batches", type=int, default=None,
+                        help="limit the input benchmark to this many batches per epoch")
+    parser.add_argument("--intra-op-threads", type=int, default=TRAIN_INTRA_OP_THREADS,
+                        help="threads used within one op (0 = all cores)")
+    parser.add_argument("--inter-op-threads", type=int, default=TRAIN_INTER_OP_THREADS,
+                        help="independent ops run in parallel (0 = TensorFlow default)")
+    parser.add_argument("--mixed-precision", action="store_true", default=TRAIN_MIXED_PRECISION,
+                        help="train in bfloat16 on CPUs with AVX512-BF16 or AMX")
+    parser.add_argument("--strategy", choices=["default", "multi_worker"], default=TRAIN_STRATEGY,
+                        help="'multi_worker' trains across the processes listed in TF_CONFIG (full mode)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="delete checkpoints of an interrupted run instead of resuming it")
+    args = parser.parse_args()
+    
+    # Thread pools, precision and the cluster must be set up before TensorFlow runs any op
+    configure_runtime(args.intra_op_threads, args.inter_op_threads, args.mixed_precision)
+    strategy = get_strategy(args.strategy) if args.mode == "full" and not args.benchmark_input else None
+    
     # Check if dataset is downloaded
     if not os.path.exists(IMAGES_DIR) or len(os.listdir(IMAGES_DIR)) == 0:
         print("Please download the dataset first by running: python data/download_data.py")
+    elif args.benchmark_input:
+        benchmark_input_pipeline(max_batches=args.benchmark_batches)
+    elif args.mode == "features":
+        train_with_feature_cache(fine_tune_epochs=args.fine_tune_epochs)
     else:
-        train_model()
\ No newline at end of file
+        train_model(strategy, fresh=args.fresh)
\ No newline at end of file
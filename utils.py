@@ -1,100 +1,120 @@
-import json
-import pickle
+import io
 import numpy as np
 from PIL import Image
-import tensorflow as tf
-from tensorflow.keras.preprocessing import image
+from concurrent.futures import ThreadPoolExecutor
 import sys
 import os
 
 # Add the parent directory to the path so we can import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import IMG_SIZE
+from config import BATCH_SIZE, IMG_SIZE, TTA_CROP
+from metrics import span
+from breed_store import DEFAULT_FEATURES, BreedStore, generate_breed_info, get_breed_store
+
+# ImageNet channel means in BGR order, as used by resnet50.preprocess_input ("caffe" mode)
+IMAGENET_BGR_MEAN = np.array([103.939, 116.779, 123.68], dtype=np.float32)
 
 def load_breed_info(file_path):
-    """Load breed information from JSON file"""
-    try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return generate_breed_info()
-
-def generate_breed_info():
-    """Generate breed information for Oxford-IIIT Pets dataset"""
-    # These are the 37 breeds in the Oxford-IIIT Pets dataset
-    breeds = [
-        'Abyssinian', 'American Bulldog', 'American Pit Bull Terrier', 'Basset Hound',
-        'Beagle', 'Bengal', 'Birman', 'Bombay', 'Boxer', 'British Shorthair',
-        'Chihuahua', 'Egyptian Mau', 'English Cocker Spaniel', 'English Setter',
-        'German Shorthaired', 'Great Pyrenees', 'Havanese', 'Japanese Chin', 'Keeshond',
-        'Leonberger', 'Maine Coon', 'Miniature Pinscher', 'Newfoundland', 'Persian',
-        'Pomeranian', 'Pug', 'Ragdoll', 'Russian Blue', 'Saint Bernard', 'Samoyed',
-        'Scottish Terrier', 'Shiba Inu', 'Siamese', 'Sphynx', 'Staffordshire Bull Terrier',
-        'Wheaten Terrier', 'Yorkshire Terrier'
-    ]
-    
-    breed_info = {}
-    for breed in breeds:
-        # Determine if it's a cat or dog
-        animal_type = "Cat" if breed in [
-            'Abyssinian', 'Bengal', 'Birman', 'Bombay', 'British Shorthair',
-            'Egyptian Mau', 'Maine Coon', 'Persian', 'Ragdoll', 'Russian Blue',
-            'Siamese', 'Sphynx'
-        ] else "Dog"
-        
-        breed_info[breed] = {
-            "animal_type": animal_type,
-            "origin": "Various",
-            "size": "Medium" if animal_type == "Cat" else "Varies",
-            "lifespan": "12-15 years" if animal_type == "Cat" else "10-13 years",
-            "coat": "Short" if breed in ['Bombay', 'Russian Blue', 'Sphynx'] else "Medium to Long",
-            "colors": "Varies",
-            "distinctive_features": "Varies by breed",
-            "physical_traits": ["Varies by breed"],
-            "temperament": ["Varies by breed"],
-            "care_requirements": ["Regular grooming", "Balanced diet", "Veterinary check-ups"],
-            "danger_level": "Low",
-            "potential_risks": ["Scratches", "Bites if provoked", "Allergies"],
-            "safety_precautions": ["Proper socialization", "Supervision with children", "Training"],
-            "description": f"The {breed} is a {'cat' if animal_type == 'Cat' else 'dog'} breed with unique characteristics."
-        }
-    
-    # Save the generated info
-    with open('data/breed_info.json', 'w') as f:
-        json.dump(breed_info, f, indent=4)
-    
-    return breed_info
+    """Return the indexed breed store for a breed information JSON file"""
+    return get_breed_store(file_path)
 
 def get_animal_features(breed_name, breed_data):
-    """Extract features from breed data"""
-    default_features = {
-        'animal_type': 'Unknown',
-        'origin': 'Not specified',
-        'size': 'Not specified',
-        'lifespan': 'Not specified',
-        'coat': 'Not specified',
-        'colors': 'Not specified',
-        'distinctive_features': 'Not specified',
-        'physical_traits': [],
-        'temperament': ['Information not available'],
-        'care_requirements': ['Information not available'],
-        'danger_level': 'Unknown',
-        'potential_risks': ['Information not available'],
-        'safety_precautions': ['Information not available']
-    }
-    
-    # Update with actual data if available
-    if breed_data and breed_name in breed_data:
-        for key in default_features:
-            if key in breed_data[breed_name]:
-                default_features[key] = breed_data[breed_name][key]
-    
-    return default_features
+    """Extract features from breed data, matching aliases and free-text labels"""
+    if isinstance(breed_data, BreedStore):
+        return breed_data.features(breed_name)
+    # Plain {breed: record} dicts, e.g. loaded by older callers
+    record = (breed_data or {}).get(breed_name, {})
+    return {key: record.get(key, value) for key, value in DEFAULT_FEATURES.items()}
+
+def _fill_slot(buffer, index, item, bgr=True):
+    """Decode and resize one image straight into a row of the batch buffer, flipping RGB to BGR"""
+    if isinstance(item, (bytes, bytearray, str)):
+        item = Image.open(io.BytesIO(item) if isinstance(item, (bytes, bytearray)) else item)
+        # Let the JPEG decoder downscale by 1/2..1/8 while decoding instead of after
+        item.draft("RGB", IMG_SIZE)
+    img = item.convert("RGB").resize(IMG_SIZE)
+    pixels = np.asarray(img)
+    np.copyto(buffer[index], pixels[..., ::-1] if bgr else pixels, casting='unsafe')
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def preprocess_arrays(arrays):
+    """NumPy equivalent of resnet50.preprocess_input for uint8 RGB arrays, without TensorFlow"""
+    batch = np.asarray(arrays, dtype=np.float32)[..., ::-1]
+    return np.ascontiguousarray(batch - IMAGENET_BGR_MEAN)
+
+def preprocess_arrays_mobilenet(arrays):
+    """NumPy equivalent of mobilenet_v2.preprocess_input: uint8 RGB scaled to [-1, 1]"""
+    return np.asarray(arrays, dtype=np.float32) / 127.5 - 1.0
+
+# Input preprocessing per backbone, so ensembles can mix models
+PREPROCESSORS = {"resnet50": preprocess_arrays, "mobilenet_v2": preprocess_arrays_mobilenet}
+
+def image_array(img, size=IMG_SIZE):
+    """uint8 RGB array of an image resized to size, the input predict_arrays expects"""
+    return np.asarray(img.convert("RGB").resize(size))
+
+def tta_arrays(img, crop=TTA_CROP):
+    """uint8 batch of test-time views of one image: the full frame and a center crop, each also mirrored"""
+    width, height = IMG_SIZE
+    full = image_array(img)
+    # Resizing once to the crop's enlarged frame makes the center crop a plain slice
+    large = image_array(img, (round(width / crop), round(height / crop)))
+    top, left = (large.shape[0] - height) // 2, (large.shape[1] - width) // 2
+    views = np.stack([full, large[top:top + height, left:left + width]])
+    return np.concatenate([views, views[:, :, ::-1]])
 
 def preprocess_image(img):
     """Preprocess image for model prediction"""
-    img = img.resize(IMG_SIZE)
-    img_array = image.img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    img_array = tf.keras.applications.resnet50.preprocess_input(img_array)
-    return img_array
\ No newline at end of file
+    with span("preprocess"):
+        buffer = np.empty((1, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+        _fill_slot(buffer, 0, img)
+        buffer -= IMAGENET_BGR_MEAN
+    return buffer
+
+def iter_preprocessed_batches(images, batch_size=BATCH_SIZE, workers=None, preprocess=None):
+    """Yield (batch, count) for PIL images, raw bytes or file paths
+
+    Images are decoded and resized in a thread pool straight into one of two preallocated
+    float32 NHWC buffers, so the next batch is prepared while the caller runs the current one.
+    Every batch has exactly batch_size rows; only the first `count` are real images. A yielded
+    buffer is reused two batches later, so copy anything that must outlive the next iteration.
+    Rows get ResNet50 preprocessing unless preprocess, one of PREPROCESSORS, is given.
+    """
+    shape = (batch_size, IMG_SIZE[1], IMG_SIZE[0], 3)
+    buffers = [np.zeros(shape, dtype=np.float32), np.zeros(shape, dtype=np.float32)]
+
+    def finish(buffer, futures):
+        for future in futures:
+            future.result()
+        count = len(futures)
+        if preprocess is None:
+            buffer[:count] -= IMAGENET_BGR_MEAN
+        else:
+            buffer[:count] = preprocess(buffer[:count])
+        buffer[count:] = 0
+        return buffer, count
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = None
+        for index, chunk in enumerate(_chunks(images, batch_size)):
+            buffer = buffers[index % 2]
+            futures = [pool.submit(_fill_slot, buffer, i, entry, preprocess is None) for i, entry in enumerate(chunk)]
+            if pending is not None:
+                yield finish(*pending)
+            pending = (buffer, futures)
+        if pending is not None:
+            yield finish(*pending)
+
+def predict_batches(run_model, images, batch_size=BATCH_SIZE, workers=None, preprocess=None):
+    """Yield one softmax row per image, running the model on fixed-size preprocessed batches"""
+    for batch, count in iter_preprocessed_batches(images, batch_size, workers, preprocess):
+        yield from np.array(run_model(batch)[:count])